@@ -0,0 +1,166 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AsyncCall:
+    """
+    一次异步调用的句柄
+
+    cancel 之后，尚未开始的后台任务会被取消，已完成的结果也不再回调。
+    """
+
+    def __init__(self):
+        self.cancelled = False
+        self._futures = []
+
+    def cancel(self):
+        """取消调用"""
+        self.cancelled = True
+        for future in self._futures:
+            future.cancel()
+
+
+class AsyncTaskManager:
+    """
+    事务管理器的异步外观
+
+    磁盘读取在线程池中执行，结果通过队列交回 Tk 主线程，
+    再由 root.after 轮询执行回调，回调中可以直接操作界面。
+    只有存在未完成的调用时才轮询队列。
+    """
+
+    def __init__(self, task_manager, root, max_workers=4, poll_ms=20):
+        """
+        初始化异步外观
+
+        Args:
+            task_manager: 事务管理器
+            root: Tk 根窗口，用于在主线程执行回调
+            max_workers: 线程池大小
+            poll_ms: 轮询结果队列的间隔（毫秒）
+        """
+        self.task_manager = task_manager
+        self.root = root
+        self.poll_ms = poll_ms
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='task-io')
+        self._results = queue.Queue()
+        self._lock = threading.Lock()
+        self._outstanding = 0
+        self._poll_id = None
+
+    def _begin(self):
+        """登记一个未完成的调用，必要时开始轮询（主线程调用）"""
+        with self._lock:
+            self._outstanding += 1
+        if self._poll_id is None:
+            self._poll_id = self.root.after(self.poll_ms, self._drain)
+
+    def _finish(self, handle, callback, *args):
+        """后台线程完成后，把回调放入结果队列"""
+        self._results.put((handle, callback, args))
+
+    def _drain(self):
+        """在主线程执行已完成调用的回调
+
+        单个回调出错只打印错误，不影响队列中的其他结果，轮询也总会按需重新设置。
+        """
+        self._poll_id = None
+        try:
+            while True:
+                try:
+                    handle, callback, args = self._results.get_nowait()
+                except queue.Empty:
+                    break
+                with self._lock:
+                    self._outstanding -= 1
+                if not handle.cancelled and callback:
+                    try:
+                        callback(*args)
+                    except Exception as e:
+                        print(f"异步回调执行失败：{str(e)}")
+        finally:
+            with self._lock:
+                outstanding = self._outstanding
+            if outstanding > 0:
+                self._poll_id = self.root.after(self.poll_ms, self._drain)
+
+    def submit(self, func, *args, callback=None, errback=None):
+        """在线程池中执行函数
+
+        Args:
+            func: 要执行的函数
+            args: 函数参数
+            callback: 成功时在主线程调用，参数为函数返回值
+            errback: 失败时在主线程调用，参数为异常对象
+
+        Returns:
+            AsyncCall: 调用句柄
+        """
+        handle = AsyncCall()
+        self._begin()
+
+        def _done(future):
+            if future.cancelled():
+                self._finish(handle, None)
+            elif future.exception() is not None:
+                self._finish(handle, errback, future.exception())
+            else:
+                self._finish(handle, callback, future.result())
+
+        future = self._executor.submit(func, *args)
+        handle._futures.append(future)
+        future.add_done_callback(_done)
+        return handle
+
+    def load_days(self, dates, callback, errback=None):
+        """并行读取多天的任务
+
+        Args:
+            dates: 日期列表
+            callback: 全部读取完成后在主线程调用，参数为按 dates 顺序排列的
+                      [(日期, 任务列表)]，跳过没有任务的日期
+            errback: 任意一天读取失败时在主线程调用，参数为异常对象
+
+        Returns:
+            AsyncCall: 调用句柄
+        """
+        handle = AsyncCall()
+        self._begin()
+        if not dates:
+            self._finish(handle, callback, [])
+            return handle
+
+        results = [None] * len(dates)
+        state = {'remaining': len(dates), 'error': None}
+        state_lock = threading.Lock()
+
+        def _done(index, future):
+            with state_lock:
+                if future.cancelled():
+                    state['error'] = state['error'] or 'cancelled'
+                elif future.exception() is not None:
+                    state['error'] = future.exception()
+                else:
+                    results[index] = (dates[index], future.result())
+                state['remaining'] -= 1
+                if state['remaining']:
+                    return
+            if state['error'] == 'cancelled':
+                self._finish(handle, None)
+            elif state['error'] is not None:
+                self._finish(handle, errback, state['error'])
+            else:
+                self._finish(handle, callback, [item for item in results if item[1]])
+
+        for index, date in enumerate(dates):
+            future = self._executor.submit(self.task_manager.get_tasks, date)
+            handle._futures.append(future)
+            future.add_done_callback(lambda f, i=index: _done(i, f))
+        return handle
+
+    def shutdown(self):
+        """关闭线程池，取消所有尚未开始的任务"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
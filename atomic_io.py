@@ -0,0 +1,191 @@
+import os
+import json
+import tempfile
+import threading
+
+# 支持的落盘策略
+FSYNC_POLICIES = ('always', 'batch', 'exit')
+
+
+def _fsync_path(path):
+    """对已存在的文件执行fsync（Windows下需要可写句柄）"""
+    try:
+        fd = os.open(path, os.O_RDWR)
+    except FileNotFoundError:
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _fsync_dir(dir_path):
+    """对目录执行fsync，使重命名落盘（仅POSIX）"""
+    if os.name == 'nt':
+        return
+    fd = os.open(dir_path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def read_jsonl(path):
+    """读取每行一条JSON记录的日志文件
+
+    无法解析的行（写入中途断电留下的半行）会被跳过，不影响之后的记录。
+
+    Returns:
+        list: 记录列表，文件不存在时为空
+    """
+    records = []
+    try:
+        f = open(path, 'r', encoding='utf-8')
+    except FileNotFoundError:
+        return records
+    with f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return records
+
+
+def repair_tail(path):
+    """截掉日志末尾不完整的一行
+
+    写入中途断电时日志可能不以换行结尾，直接追加会把新记录接在半行后面，
+    重放时新记录也无法解析。首次追加前截断到最后一个换行符之后。
+    """
+    try:
+        f = open(path, 'rb+')
+    except FileNotFoundError:
+        return
+    with f:
+        end = f.seek(0, os.SEEK_END)
+        if end == 0:
+            return
+        f.seek(end - 1)
+        if f.read(1) == b'\n':
+            return
+        pos = end
+        while pos > 0:
+            size = min(4096, pos)
+            pos -= size
+            f.seek(pos)
+            index = f.read(size).rfind(b'\n')
+            if index >= 0:
+                f.truncate(pos + index + 1)
+                return
+        f.truncate(0)
+
+
+class DurableWriter:
+    """
+    崩溃安全的文件写入器
+
+    所有整文件写入都采用"临时文件 + fsync + 重命名"，临时文件在重命名前
+    总是先落盘，进程崩溃或断电后目标文件要么是旧内容、要么是完整的新内容。
+    落盘策略只决定目录项（重命名本身）和追加写入的 fsync 时机：
+    - 'always': 每次写入都 fsync，断电也不丢数据，写入最慢
+    - 'batch': 每隔 interval_ms 毫秒统一 fsync 一次期间写过的目录和追加的文件
+    - 'exit': 只在 close 时 fsync，写入最快
+    """
+
+    def __init__(self, policy='batch', interval_ms=200):
+        """
+        初始化写入器
+
+        Args:
+            policy: 落盘策略，见 FSYNC_POLICIES
+            interval_ms: 'batch' 策略下的 fsync 间隔（毫秒）
+        """
+        if policy not in FSYNC_POLICIES:
+            raise ValueError(f"未知的落盘策略：{policy}")
+        self.policy = policy
+        self.interval_ms = interval_ms
+
+        self._lock = threading.Lock()
+        # 已追加但尚未 fsync 的文件路径
+        self._dirty = set()
+        # 有重命名尚未 fsync 的目录
+        self._dirty_dirs = set()
+        self._timer = None
+
+    def _mark_dirty(self, path=None, dir_path=None):
+        """登记待 fsync 的文件或目录"""
+        with self._lock:
+            if path is not None:
+                self._dirty.add(path)
+            if dir_path is not None:
+                self._dirty_dirs.add(dir_path)
+            if self.policy == 'batch' and self._timer is None:
+                self._timer = threading.Timer(self.interval_ms / 1000, self.sync)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def write_atomic(self, path, text, backup=False):
+        """原子地替换整个文件内容
+
+        Args:
+            path: 目标文件路径
+            text: 文件内容
+            backup: 是否把原文件保留为 <path>.bak，供目标文件无法读取时恢复
+        """
+        dir_path = os.path.dirname(path)
+        fd, tmp_path = tempfile.mkstemp(dir=dir_path,
+                                        prefix=os.path.basename(path) + '.',
+                                        suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+            if backup and os.path.exists(path):
+                os.replace(path, path + '.bak')
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        if self.policy == 'always':
+            _fsync_dir(dir_path)
+        else:
+            self._mark_dirty(dir_path=dir_path)
+
+    def append(self, path, text):
+        """向文件末尾追加内容
+
+        Args:
+            path: 目标文件路径
+            text: 追加的内容
+        """
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(text)
+            if self.policy == 'always':
+                f.flush()
+                os.fsync(f.fileno())
+        if self.policy != 'always':
+            self._mark_dirty(path=path)
+
+    def sync(self):
+        """立即 fsync 所有已写入的文件"""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            dirty_dirs, self._dirty_dirs = self._dirty_dirs, set()
+            if self._timer:
+                self._timer.cancel()
+            self._timer = None
+        for path in dirty:
+            _fsync_path(path)
+        for dir_path in dirty_dirs | {os.path.dirname(path) for path in dirty}:
+            _fsync_dir(dir_path)
+
+    def close(self):
+        """关闭写入器，确保所有数据落盘"""
+        self.sync()
@@ -0,0 +1,195 @@
+class BallView:
+    """
+    悬浮球窗口接口
+
+    状态机只通过这三个方法读写窗口，测试时可以替换为记录坐标的实现。
+    """
+
+    def position(self):
+        """获取窗口左上角坐标
+
+        Returns:
+            tuple: (x, y)
+        """
+        raise NotImplementedError
+
+    def move_to(self, x, y):
+        """移动窗口左上角到指定坐标"""
+        raise NotImplementedError
+
+    def set_alpha(self, alpha):
+        """设置窗口透明度（0 为完全透明）"""
+        raise NotImplementedError
+
+
+class TkBallView(BallView):
+    """Tk 窗口适配器，只调用传入窗口的方法，本模块不导入 tkinter"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def position(self):
+        return self.root.winfo_x(), self.root.winfo_y()
+
+    def move_to(self, x, y):
+        self.root.geometry(f"+{x}+{y}")
+
+    def set_alpha(self, alpha):
+        self.root.attributes('-alpha', alpha)
+
+
+class BallStateMachine:
+    """
+    悬浮球贴边与隐藏状态机
+
+    状态依次为 'shown'（完全显示）、'semi'（半隐藏，露出 peek_width 像素）
+    和 'hidden'（完全隐藏，透明度为0）。悬浮球贴靠中心所在一侧的屏幕边缘。
+    鼠标离开或拖拽结束后延迟半隐藏，半隐藏一段时间后完全隐藏，
+    鼠标进入或到达屏幕边缘时重新显示。
+
+    窗口和定时都通过注入的对象完成（BallView 和 TimerScheduler），
+    不依赖 Tk 和 pywin32，可以用模拟时钟在无界面环境中测试。
+    """
+
+    SHOWN = 'shown'
+    SEMI = 'semi'
+    HIDDEN = 'hidden'
+
+    def __init__(self, view, timers, screen_width, screen_height,
+                 ball_width=80, peek_width=40, shown_alpha=0.9,
+                 leave_delay_ms=1000, release_delay_ms=500, full_hide_delay_ms=3000,
+                 on_hidden=None, on_shown=None):
+        """
+        初始化状态机
+
+        Args:
+            view: 悬浮球窗口（BallView）
+            timers: 定时器调度器（TimerScheduler），使用 semi_hide 和 full_hide 两个槽位
+            screen_width: 屏幕宽度
+            screen_height: 屏幕高度
+            ball_width: 悬浮球宽度
+            peek_width: 半隐藏时露出的宽度
+            shown_alpha: 显示时的透明度
+            leave_delay_ms: 鼠标离开后多久半隐藏（毫秒）
+            release_delay_ms: 拖拽结束后多久半隐藏（毫秒）
+            full_hide_delay_ms: 半隐藏后多久完全隐藏（毫秒）
+            on_hidden: 完全隐藏后的回调（如开始检测屏幕边缘）
+            on_shown: 重新显示后的回调（如停止检测屏幕边缘）
+        """
+        self.view = view
+        self.timers = timers
+        self.screen_width = screen_width
+        self.screen_height = screen_height
+        self.ball_width = ball_width
+        self.peek_width = peek_width
+        self.shown_alpha = shown_alpha
+        self.leave_delay_ms = leave_delay_ms
+        self.release_delay_ms = release_delay_ms
+        self.full_hide_delay_ms = full_hide_delay_ms
+        self.on_hidden = on_hidden
+        self.on_shown = on_shown
+
+        self.state = self.SHOWN
+        self.dragging = False
+        self._press = (0, 0)
+        # 状态切换次数，用于测试
+        self.transitions = 0
+
+    @property
+    def is_hidden(self):
+        """是否处于半隐藏或完全隐藏状态"""
+        return self.state != self.SHOWN
+
+    @property
+    def fully_hidden(self):
+        """是否完全隐藏"""
+        return self.state == self.HIDDEN
+
+    def snap_left(self, x):
+        """窗口在屏幕左半边时贴靠左边缘，否则贴靠右边缘"""
+        return x < self.screen_width // 2
+
+    def docked_x(self, left, visible_width):
+        """贴边时窗口的横坐标
+
+        Args:
+            left: 是否贴靠左边缘
+            visible_width: 露在屏幕内的宽度
+        """
+        if left:
+            return visible_width - self.ball_width
+        return self.screen_width - visible_width
+
+    def start(self, delay_ms=1000):
+        """放到屏幕右侧中间，并在延迟后半隐藏"""
+        self.view.move_to(self.screen_width - 30, self.screen_height // 2)
+        self.timers.schedule('semi_hide', delay_ms, self.semi_hide)
+
+    def _set_state(self, state):
+        if state != self.state:
+            self.state = state
+            self.transitions += 1
+
+    def press(self, x, y):
+        """按下鼠标：开始拖拽并取消待执行的隐藏
+
+        Args:
+            x, y: 鼠标相对窗口的坐标
+        """
+        self.dragging = True
+        self._press = (x, y)
+        self.timers.cancel('semi_hide')
+        self.timers.cancel('full_hide')
+
+    def drag(self, x, y):
+        """拖拽：按鼠标相对按下时的位移移动窗口"""
+        if not self.dragging:
+            return
+        left, top = self.view.position()
+        self.view.move_to(left + x - self._press[0], top + y - self._press[1])
+
+    def release(self):
+        """松开鼠标：结束拖拽，延迟后半隐藏"""
+        self.dragging = False
+        self.timers.schedule('semi_hide', self.release_delay_ms, self.semi_hide)
+
+    def enter(self):
+        """鼠标进入：取消半隐藏和完全隐藏，完全隐藏时重新显示"""
+        self.timers.cancel('semi_hide')
+        self.timers.cancel('full_hide')
+        if self.fully_hidden:
+            self.show()
+
+    def leave(self):
+        """鼠标离开：不在拖拽时延迟后半隐藏"""
+        if not self.dragging:
+            self.timers.schedule('semi_hide', self.leave_delay_ms, self.semi_hide)
+
+    def semi_hide(self):
+        """贴边半隐藏，并在延迟后完全隐藏"""
+        if self.dragging:
+            return
+        x, y = self.view.position()
+        self.view.move_to(self.docked_x(self.snap_left(x), self.peek_width), y)
+        self._set_state(self.SEMI)
+        self.timers.schedule('full_hide', self.full_hide_delay_ms, self.full_hide)
+
+    def full_hide(self):
+        """半隐藏状态下完全隐藏"""
+        if self.dragging or self.state != self.SEMI:
+            return
+        self._set_state(self.HIDDEN)
+        self.view.set_alpha(0)
+        if self.on_hidden:
+            self.on_hidden()
+
+    def show(self):
+        """贴边完全显示"""
+        if self.dragging:
+            return
+        x, y = self.view.position()
+        self.view.move_to(self.docked_x(self.snap_left(x), self.ball_width), y)
+        self._set_state(self.SHOWN)
+        self.view.set_alpha(self.shown_alpha)
+        if self.on_shown:
+            self.on_shown()
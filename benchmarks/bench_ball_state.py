@@ -0,0 +1,155 @@
+"""悬浮球状态机测试
+
+用模拟时钟和记录坐标的窗口驱动 BallStateMachine，无需界面和 pywin32：
+- 按脚本检查贴边、半隐藏、完全隐藏和重新显示的坐标与状态
+- 模拟鼠标反复进出悬浮球，统计待执行定时器的峰值和每个事件的耗时
+- 在子进程中测量状态机模块与 tkinter 的导入耗时
+
+用法：
+    python benchmarks/bench_ball_state.py
+"""
+import os
+import sys
+import time
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ball_state import BallStateMachine, BallView
+from timer_slots import TimerScheduler
+from bench_edge_reveal import FakeClock
+
+SCREEN = (1920, 1080)
+
+
+class RecordingView(BallView):
+    """记录坐标和透明度的窗口"""
+
+    def __init__(self):
+        self.x, self.y = 0, 0
+        self.alpha = 0.9
+
+    def position(self):
+        return self.x, self.y
+
+    def move_to(self, x, y):
+        self.x, self.y = x, y
+
+    def set_alpha(self, alpha):
+        self.alpha = alpha
+
+
+def make_ball():
+    """创建使用模拟时钟的状态机"""
+    clock = FakeClock()
+    timers = TimerScheduler(clock.after, clock.after_cancel, clock=lambda: clock.now / 1000)
+    view = RecordingView()
+    events = []
+    ball = BallStateMachine(view, timers, *SCREEN,
+                            on_hidden=lambda: events.append('hidden'),
+                            on_shown=lambda: events.append('shown'))
+    return clock, timers, view, ball, events
+
+
+def check_script():
+    """按脚本检查状态和坐标，返回不符合预期的步骤"""
+    clock, timers, view, ball, events = make_ball()
+    width = SCREEN[0]
+    failures = []
+
+    def expect(label, state, x, alpha):
+        actual = (ball.state, view.x, view.alpha)
+        if actual != (state, x, alpha):
+            failures.append(f"{label}：期望 {(state, x, alpha)}，实际 {actual}")
+
+    ball.start()
+    expect('启动', 'shown', width - 30, 0.9)
+    clock.run_until(1000)
+    expect('1秒后半隐藏', 'semi', width - 40, 0.9)
+    clock.run_until(4000)
+    expect('再3秒后完全隐藏', 'hidden', width - 40, 0)
+
+    ball.enter()
+    expect('鼠标进入后显示', 'shown', width - 80, 0.9)
+    ball.press(10, 10)
+    ball.drag(-1000, 10)
+    ball.release()
+    clock.run_until(4400)
+    expect('拖到左半边后仍显示', 'shown', width - 80 - 1010, 0.9)
+    clock.run_until(4500)
+    expect('松开500毫秒后贴左边半隐藏', 'semi', -40, 0.9)
+
+    ball.enter()
+    ball.leave()
+    clock.run_until(5400)
+    ball.enter()
+    ball.leave()
+    clock.run_until(7500)
+    expect('反复进出只在最后一次离开后计时', 'semi', -40, 0.9)
+    clock.run_until(9500)
+    expect('完全隐藏', 'hidden', -40, 0)
+    ball.show()
+    expect('边缘唤出后贴左边显示', 'shown', 0, 0.9)
+
+    if events != ['hidden', 'shown', 'hidden', 'shown']:
+        failures.append(f"回调顺序不符：{events}")
+    if timers.stats()['pending']:
+        failures.append(f"仍有待执行定时器：{timers.pending()}")
+    return failures
+
+
+def hover_storm(cycles=10000, interval_ms=200):
+    """鼠标每 interval_ms 毫秒进出一次，统计定时器峰值和每个事件的平均耗时"""
+    clock, timers, view, ball, events = make_ball()
+    ball.start()
+    peak_slots = peak_underlying = 0
+    elapsed = 0.0
+    for i in range(cycles):
+        start = time.perf_counter()
+        ball.enter() if i % 2 else ball.leave()
+        elapsed += time.perf_counter() - start
+        clock.run_until(clock.now + interval_ms)
+        peak_slots = max(peak_slots, len(timers.pending()))
+        live = sum(1 for timer in clock._timers if timer[1] not in clock._cancelled)
+        peak_underlying = max(peak_underlying, live)
+    return {
+        'events': cycles,
+        'us_per_event': elapsed / cycles * 1e6,
+        'peak_slots': peak_slots,
+        'peak_underlying': peak_underlying,
+        'stats': timers.stats(),
+    }
+
+
+def import_time(statement):
+    """在子进程中测量导入耗时（毫秒）"""
+    code = f"import time; t = time.perf_counter(); {statement}; print((time.perf_counter() - t) * 1000)"
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True)
+    return float(result.stdout) if result.returncode == 0 else None
+
+
+def main():
+    """主函数"""
+    failures = check_script()
+    print("状态脚本：" + ("全部通过" if not failures else "失败"))
+    for failure in failures:
+        print(f"  {failure}")
+
+    storm = hover_storm()
+    print(f"\n鼠标反复进出 {storm['events']} 次：")
+    print(f"  每个事件耗时 {storm['us_per_event']:.2f} 微秒")
+    print(f"  待执行槽位峰值 {storm['peak_slots']} 个，底层定时器峰值 {storm['peak_underlying']} 个")
+    print(f"  调度统计 {storm['stats']}")
+
+    print("\n导入耗时（毫秒）：")
+    for label, statement in (('ball_state + timer_slots', 'import ball_state, timer_slots'),
+                             ('tkinter', 'import tkinter')):
+        ms = import_time(statement)
+        print(f"  {label:<26}{ms:.1f}" if ms is not None else f"  {label:<26}导入失败")
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
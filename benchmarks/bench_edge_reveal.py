@@ -0,0 +1,103 @@
+"""屏幕边缘唤出检测的唤醒次数测试
+
+用模拟时钟和按脚本移动的鼠标来源驱动 EdgeRevealDetector，无需界面和 pywin32，
+统计悬浮球显示、隐藏后鼠标静止、隐藏后鼠标移动等场景下每分钟的唤醒次数，
+并与原来固定每50毫秒检查一次的方式对比。
+
+用法：
+    python benchmarks/bench_edge_reveal.py
+"""
+import os
+import sys
+import heapq
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from edge_reveal import CursorSource, EdgeRevealDetector
+
+SCREEN_WIDTH = 1920
+
+MINUTE_MS = 60 * 1000
+
+
+class FakeClock:
+    """模拟 root.after / root.after_cancel 的定时器"""
+
+    def __init__(self):
+        self.now = 0
+        self._timers = []
+        self._cancelled = set()
+        self._next_id = 0
+
+    def after(self, ms, func):
+        self._next_id += 1
+        heapq.heappush(self._timers, (self.now + ms, self._next_id, func))
+        return self._next_id
+
+    def after_cancel(self, timer_id):
+        self._cancelled.add(timer_id)
+
+    def run_until(self, end):
+        """执行截止时间之前到期的所有定时器"""
+        while self._timers and self._timers[0][0] <= end:
+            when, timer_id, func = heapq.heappop(self._timers)
+            if timer_id in self._cancelled:
+                continue
+            self.now = when
+            func()
+        self.now = end
+
+
+class ScriptedCursor(CursorSource):
+    """按时间返回预设位置的鼠标来源"""
+
+    def __init__(self, clock, path):
+        self.clock = clock
+        self.path = path
+
+    def position(self):
+        return self.path(self.clock.now), 500
+
+
+def idle(now):
+    """鼠标停在屏幕中间"""
+    return SCREEN_WIDTH // 2
+
+
+def moving(now):
+    """鼠标在屏幕中间来回移动"""
+    return SCREEN_WIDTH // 2 + (now // 10) % 400
+
+
+def occasional(now):
+    """每10秒移动1秒，其余时间静止"""
+    return moving(now) if now % 10000 < 1000 else SCREEN_WIDTH // 2
+
+
+def measure(path, armed=True):
+    """统计一分钟内的唤醒次数"""
+    clock = FakeClock()
+    detector = EdgeRevealDetector(ScriptedCursor(clock, path), SCREEN_WIDTH, lambda: None,
+                                  clock.after, clock.after_cancel)
+    if armed:
+        detector.arm()
+    clock.run_until(MINUTE_MS)
+    return detector.wakeups
+
+
+def main():
+    """主函数"""
+    fixed = MINUTE_MS // 50
+    scenarios = [
+        ('悬浮球显示中', idle, False),
+        ('完全隐藏，鼠标静止', idle, True),
+        ('完全隐藏，偶尔移动', occasional, True),
+        ('完全隐藏，持续移动', moving, True),
+    ]
+    print(f"{'场景':<16}{'原方式':>8}{'自适应':>8}  （每分钟唤醒次数）")
+    for name, path, armed in scenarios:
+        print(f"{name:<16}{fixed:>8}{measure(path, armed):>8}")
+
+
+if __name__ == '__main__':
+    main()
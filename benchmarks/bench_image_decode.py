@@ -0,0 +1,95 @@
+"""主题图片解码性能测试
+
+分别以全尺寸解码、原方式（thumbnail 默认参数）和降低分辨率解码的方式处理图片，
+统计解码耗时和进程内存峰值。每种方式在独立的子进程中运行，互不影响内存峰值。
+
+用法：
+    python benchmarks/bench_image_decode.py [图片目录] [宽度] [高度]
+"""
+import os
+import sys
+import time
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+REPEAT = 5
+
+
+def decode_full(image_path, max_size):
+    """全尺寸解码后直接 LANCZOS 缩放"""
+    img = Image.open(image_path)
+    img.load()
+    img.thumbnail(max_size, Image.Resampling.LANCZOS, reducing_gap=None)
+    return img
+
+
+def decode_thumbnail(image_path, max_size):
+    """原方式：Pillow thumbnail 默认参数（JPEG 按两倍尺寸 draft）"""
+    img = Image.open(image_path)
+    img.thumbnail(max_size, Image.Resampling.LANCZOS)
+    return img
+
+
+METHODS = (('full', '全尺寸解码'), ('thumbnail', '原方式'), ('scaled', '降低分辨率'))
+
+
+def peak_rss_mb():
+    """当前进程的内存峰值（MB），不支持的平台返回None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 以字节为单位，Linux 以KB为单位
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_case(method, image_path, max_size):
+    """子进程入口：用指定方式解码一张图片并输出耗时和内存峰值"""
+    from image_manager import decode_scaled
+    decode = {'full': decode_full, 'thumbnail': decode_thumbnail, 'scaled': decode_scaled}[method]
+
+    base_rss = peak_rss_mb()
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        img = decode(image_path, max_size)
+    elapsed = (time.perf_counter() - start) * 1000 / REPEAT
+    peak = peak_rss_mb()
+
+    rss = f"{peak - base_rss:.1f} MB" if peak is not None else "不支持"
+    print(f"{elapsed:.1f} ms  {rss}  {img.size[0]}x{img.size[1]}")
+
+
+def main():
+    """主函数"""
+    if len(sys.argv) > 1 and sys.argv[1] == '--case':
+        method, image_path, width, height = sys.argv[2:6]
+        run_case(method, image_path, (int(width), int(height)))
+        return
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    images_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.join(root, 'daily_images')
+    width = sys.argv[2] if len(sys.argv) > 2 else '1536'
+    height = sys.argv[3] if len(sys.argv) > 3 else '864'
+
+    print(f"目标尺寸 {width}x{height}，每张解码 {REPEAT} 次取平均，内存为相对启动时的峰值增量\n")
+    for filename in sorted(os.listdir(images_dir)):
+        if not filename.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        image_path = os.path.join(images_dir, filename)
+        with Image.open(image_path) as img:
+            print(f"{filename}（{img.format} {img.size[0]}x{img.size[1]}）")
+        for method, label in METHODS:
+            result = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--case', method, image_path, width, height],
+                capture_output=True, text=True, check=True)
+            print(f"  {label}：{result.stdout.strip()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""历史任务全文搜索性能测试
+
+生成指定数量的随机中文任务，建立索引后统计典型查询的耗时。
+
+用法：
+    python benchmarks/bench_search.py [任务数量]
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from atomic_io import DurableWriter
+from search_index import SearchIndex
+
+WORDS = ['开会', '写周报', '买菜', '健身', '读书', '整理文档', '回复邮件', '项目评审',
+         '修复问题', '打电话', '学习英语', '散步', '准备演讲', '代码审查', '做饭', 'Review']
+
+QUERIES = ['周报', '买菜 健身', '项目评审', '代码', 'review', '不存在的内容']
+
+
+def make_source(total, per_day=100):
+    """生成随机任务数据源"""
+    rng = random.Random(0)
+
+    def source():
+        for day in range(total // per_day):
+            date = f"{2000 + day // 365:04d}-{day % 12 + 1:02d}-{day % 28 + 1:02d}"
+            tasks = [{
+                'id': i + 1,
+                'content': ''.join(rng.sample(WORDS, 3)),
+                'completed': rng.random() < 0.5
+            } for i in range(per_day)]
+            yield date, tasks
+    return source
+
+
+def main():
+    """主函数"""
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    index_dir = tempfile.mkdtemp(prefix='bench_search_')
+    try:
+        index = SearchIndex(index_dir, DurableWriter('exit'), make_source(total))
+
+        start = time.perf_counter()
+        index.load()
+        print(f"建立 {total} 条任务的索引：{(time.perf_counter() - start) * 1000:.0f} ms")
+
+        start = time.perf_counter()
+        index.compact()
+        print(f"写入快照：{(time.perf_counter() - start) * 1000:.0f} ms")
+
+        reloaded = SearchIndex(index_dir, DurableWriter('exit'), make_source(0))
+        start = time.perf_counter()
+        reloaded.load()
+        print(f"加载快照：{(time.perf_counter() - start) * 1000:.0f} ms\n")
+
+        for query in QUERIES:
+            start = time.perf_counter()
+            results = reloaded.search(query, limit=50)
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"{query:<12} {len(results):>3} 条  {elapsed:.2f} ms")
+    finally:
+        shutil.rmtree(index_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""耗时追踪的开销测试
+
+比较普通函数、未启用追踪的 traced 函数 / span，以及启用追踪（写入临时文件）时
+每次调用的耗时，并验证追踪文件按大小滚动、汇总结果可读。
+
+用法：
+    python benchmarks/bench_tracing.py
+"""
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tracing
+from trace_summary import load_records, summarize
+
+CALLS = 200000
+
+
+def plain(x):
+    return x + 1
+
+
+@tracing.traced()
+def decorated(x):
+    return x + 1
+
+
+def with_span(x):
+    with tracing.span('with_span'):
+        return x + 1
+
+
+def per_call_ns(func, calls=CALLS):
+    """平均每次调用的耗时（纳秒）"""
+    start = time.perf_counter()
+    for i in range(calls):
+        func(i)
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+def main():
+    """主函数"""
+    print(f"{'方式':<24}{'每次调用(ns)':>14}")
+    for label, func in (('普通函数', plain), ('traced（未启用）', decorated),
+                        ('span（未启用）', with_span)):
+        print(f"{label:<24}{per_call_ns(func):>14.0f}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'trace.jsonl')
+        tracing.enable(path, max_bytes=256 * 1024)
+        for label, func in (('traced（启用）', decorated), ('span（启用）', with_span)):
+            print(f"{label:<24}{per_call_ns(func, CALLS // 10):>14.0f}")
+        tracing.disable()
+
+        sizes = [os.path.getsize(p) for p in (path, f"{path}.1") if os.path.exists(p)]
+        print(f"\n追踪文件大小（上限 256 KB，保留1个历史文件）：{[f'{s // 1024} KB' for s in sizes]}")
+        summary = summarize(load_records([f"{path}.1", path]))
+        for name, stats in sorted(summary.items()):
+            print(f"{name}: {stats['count']} 条，p50 {stats['p50']:.3f} ms，p95 {stats['p95']:.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
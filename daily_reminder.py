@@ -1,13 +1,21 @@
+from startup_timing import STARTUP
+import tracing
+from tracing import traced
 import os
 import sys
+import json
+import queue
+import threading
+import argparse
 import tkinter as tk
-from tkinter import messagebox
-import win32gui
-import win32con
-import win32api
-from PIL import Image, ImageTk
-from image_manager import ImageManager
-from task_manager import TaskManager
+from datetime import datetime, timedelta
+from tkinter import messagebox, filedialog
+from edge_reveal import EdgeRevealDetector, Win32CursorSource, Win32HookCursorSource
+from timer_slots import TimerScheduler
+from ball_state import BallStateMachine, TkBallView
+
+# 图片管理器（含 PIL）和事务管理器在首次使用时才导入，先让悬浮球尽快显示
+STARTUP.mark('imports')
 
 class FloatingBall:
     """
@@ -26,6 +34,24 @@ class FloatingBall:
     - theme_window: 主题图片显示窗口
     """
     
+    # 历史记录每页渲染的行数
+    HISTORY_PAGE_LINES = 200
+    
+    # 历史记录搜索最多显示的结果数
+    HISTORY_SEARCH_LIMIT = 200
+    
+    # 提前多少秒预取明天的主题图片
+    NEXT_DAY_PREFETCH_LEAD = 5 * 60
+    
+    # 检查并淘汰长时间未使用的缓存图片的间隔（毫秒）
+    IMAGE_IDLE_CHECK_MS = 60 * 1000
+    
+    # 完全隐藏后是否用低级鼠标钩子检测边缘（否则自适应轮询鼠标位置）
+    EDGE_REVEAL_USE_HOOK = False
+    
+    # 悬浮球显示后多久在后台创建图片管理器并开始同步（毫秒），避开登录时的繁忙期
+    IMAGE_WARM_UP_DELAY_MS = 10 * 1000
+    
     def __init__(self):
         """初始化悬浮球应用
         
@@ -71,125 +97,148 @@ class FloatingBall:
             button.bind('<Enter>', self.on_enter)    # 鼠标进入
             button.bind('<Leave>', self.on_leave)    # 鼠标离开
         
-        # 设置初始位置（屏幕右侧中间）
         self.screen_width = self.root.winfo_screenwidth()
         self.screen_height = self.root.winfo_screenheight()
-        self.root.geometry(f"+{self.screen_width-30}+{self.screen_height//2}")
         
         # 主题窗口引用（初始为None）
         self.theme_window = None
+        # 长图的分块显示器（仅在显示长图时存在）
+        self.tiled_viewer = None
         
-        # 初始化图片管理器
-        self.image_manager = ImageManager()
-        
-        # 初始化事务管理器
-        self.task_manager = TaskManager()
+        # 图片管理器和事务管理器在首次使用时创建（见 image_manager / task_manager 属性）
+        self._image_manager = None
+        self._task_manager = None
+        self._task_async = None
         
         # 事务窗口引用
         self.task_window = None
         
-        # 自动隐藏相关变量
-        self.is_hidden = False      # 是否处于隐藏状态
-        self.hide_timer = None      # 隐藏定时器
-        self.show_timer = None      # 显示定时器
-        self.last_x = 0            # 上次鼠标X坐标
-        self.last_y = 0            # 上次鼠标Y坐标
-        self.dragging = False      # 是否正在拖拽
-        self.fully_hidden = False  # 是否完全隐藏
-        
-        # 设置检测区域大小
-        self.detection_range = 50  
-        
-        # 初始状态设为半隐藏
-        self.root.after(1000, self.semi_hide_ball)
+        # 悬浮球的所有延迟动作：每种动作一个命名槽位，共用一个 Tk 定时器
+        self.timers = TimerScheduler(self.root.after, self.root.after_cancel)
+        
+        # 屏幕边缘唤出检测：只在完全隐藏时检测鼠标位置
+        self._ui_calls = queue.SimpleQueue()
+        self.root.bind('<<RunPosted>>', self._run_posted)
+        use_hook = self.EDGE_REVEAL_USE_HOOK and Win32HookCursorSource.available()
+        self.edge_detector = EdgeRevealDetector(
+            Win32HookCursorSource() if use_hook else Win32CursorSource(),
+            self.screen_width, lambda: self.ball.show(),
+            lambda ms, func: self.timers.schedule('edge_poll', ms, func),
+            lambda _: self.timers.cancel('edge_poll'),
+            post=self.post_to_ui)
+        
+        # 贴边与自动隐藏状态机：完全隐藏后开始检测屏幕边缘，显示后停止
+        self.ball = BallStateMachine(
+            TkBallView(self.root), self.timers, self.screen_width, self.screen_height,
+            on_hidden=self.edge_detector.arm, on_shown=self.edge_detector.disarm)
+        # 初始位置在屏幕右侧中间，稍后半隐藏
+        self.ball.start()
+        STARTUP.mark('init')
+    
+    @property
+    def image_manager(self):
+        """图片管理器，首次使用时才导入 PIL 并创建"""
+        if self._image_manager is None:
+            from image_manager import ImageManager
+            self._start_image_manager(ImageManager())
+        return self._image_manager
+    
+    @property
+    def task_manager(self):
+        """事务管理器（追加写日志模式，勾选任务不再重写整个文件），首次使用时创建"""
+        if self._task_manager is None:
+            from task_manager import TaskManager
+            self._task_manager = TaskManager(storage_mode='journal',
+                                             carry_over=self.load_settings().get('carry_over', False))
+        return self._task_manager
+    
+    @property
+    def task_async(self):
+        """事务管理器的异步外观，历史记录等磁盘读取在线程池中进行"""
+        if self._task_async is None:
+            from async_tasks import AsyncTaskManager
+            self._task_async = AsyncTaskManager(self.task_manager, self.root)
+        return self._task_async
+    
+    def _start_image_manager(self, manager):
+        """启用图片管理器：开始后台同步、生成显示缓存和扫描图片文件夹（Tk 线程调用）"""
+        self._image_manager = manager
+        # 在后台增量同步自带的图片
+        manager.sync_async(self.get_images_folder(), force=True)
+        # 同步完成后在后台为当前分辨率生成缩放好的图片缓存
+        manager.prepare_display_cache_async(self.get_display_size())
+        # 后台定期扫描登记的图片文件夹
+        manager.start_scanner()
+        # 定期淘汰长时间未使用的缓存图片
+        self.timers.schedule('image_idle', self.IMAGE_IDLE_CHECK_MS, self.check_image_idle)
+    
+    def warm_up_images(self):
+        """在工作线程中导入 PIL 并创建图片管理器，界面线程不等待；
+        创建完成后回到 Tk 线程启用它，并安排午夜前预取明天的主题图片"""
+        def _build():
+            try:
+                from image_manager import ImageManager
+                manager = ImageManager()
+            except Exception as e:
+                print(f"创建图片管理器失败：{str(e)}")
+                return
+            self.post_to_ui(lambda: self._on_image_manager_built(manager))
         
-        # 启动鼠标位置监测
-        self.check_mouse_position()
+        threading.Thread(target=_build, daemon=True).start()
+    
+    def _on_image_manager_built(self, manager):
+        """后台创建的图片管理器就绪（Tk 线程调用）"""
+        if self._image_manager is None:
+            self._start_image_manager(manager)
+        else:
+            # 期间用户已打开主题窗口，按需创建了图片管理器
+            manager.cleanup()
+        STARTUP.mark('warm_up')
+        self.schedule_next_day_prefetch()
         
     def on_click(self, event):
-        """处理鼠标点击事件
-        
-        - 记录拖拽状态和初始位置
-        - 取消可能存在的隐藏/显示定时器
-        """
-        self.dragging = True
-        self.last_x = event.x
-        self.last_y = event.y
-        if self.hide_timer:
-            self.root.after_cancel(self.hide_timer)
-        if self.show_timer:
-            self.root.after_cancel(self.show_timer)
+        """处理鼠标点击事件：开始拖拽并取消待执行的隐藏"""
+        self.ball.press(event.x, event.y)
             
     def on_move(self, event):
-        """处理拖拽移动事件
-        
-        计算鼠标移动距离，更新窗口位置
-        """
-        if not self.dragging:
-            return
-        deltax = event.x - self.last_x
-        deltay = event.y - self.last_y
-        x = self.root.winfo_x() + deltax
-        y = self.root.winfo_y() + deltay
-        self.root.geometry(f"+{x}+{y}")
+        """处理拖拽移动事件：按鼠标移动距离更新窗口位置"""
+        self.ball.drag(event.x, event.y)
         
     def on_enter(self, event):
-        """处理鼠标进入事件
-        
-        取消隐藏定时器，显示完整悬浮球
-        """
-        if self.hide_timer:
-            self.root.after_cancel(self.hide_timer)
-        if self.fully_hidden:
-            self.show_ball()
+        """处理鼠标进入事件：取消隐藏定时器，显示完整悬浮球"""
+        self.ball.enter()
             
     def on_leave(self, event):
-        """处理鼠标离开事件
-        
-        如果不在拖拽状态，启动隐藏定时器
-        """
-        if not self.dragging:
-            self.hide_timer = self.root.after(1000, self.semi_hide_ball)
-            
-    def semi_hide_ball(self):
-        """半隐藏悬浮球
+        """处理鼠标离开事件：不在拖拽状态时启动隐藏定时器"""
+        self.ball.leave()
+    
+    def post_to_ui(self, func):
+        """从任意线程把回调投递到 Tk 线程执行"""
+        self._ui_calls.put(func)
+        self.root.event_generate('<<RunPosted>>', when='tail')
+    
+    def _run_posted(self, event=None):
+        """在 Tk 线程执行已投递的回调，单个回调出错不影响之后的回调"""
+        while True:
+            try:
+                func = self._ui_calls.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                func()
+            except Exception as e:
+                print(f"界面回调执行失败：{str(e)}")
         
-        根据悬浮球在屏幕的位置（左/右），将其隐藏一半
-        """
-        if self.dragging:
+    def refresh_theme_images(self):
+        """后台同步完成后：主题窗口仍打开且今日图片有变化时重新显示"""
+        if not (self.theme_window and self.theme_window.winfo_exists()):
             return
-            
-        x = self.root.winfo_x()
-        if x < self.screen_width // 2:
-            target_x = -40  # 左边只隐藏一半
-        else:
-            target_x = self.screen_width - 40  # 右边只隐藏一半
-            
-        self.root.geometry(f"+{target_x}+{self.root.winfo_y()}")
-        self.is_hidden = True
-        
-        # 启动完全隐藏计时器
-        self.root.after(3000, self.fully_hide_ball)
-        
-    def show_ball(self):
-        """完全显示悬浮球
-        
-        根据悬浮球在屏幕的位置（左/右），将其完全显示
-        """
-        if self.dragging:
+        images = self.image_manager.get_today_images()
+        if images == self.available_images and images:
             return
-            
-        x = self.root.winfo_x()
-        if x < self.screen_width // 2:
-            target_x = 0
-        else:
-            target_x = self.screen_width - 80
-            
-        self.root.geometry(f"+{target_x}+{self.root.winfo_y()}")
-        self.is_hidden = False
-        self.fully_hidden = False
-        self.root.attributes('-alpha', 0.9)
-        
+        self.close_theme_window()
+        self.show_theme()
+    
     def show_prev_image(self):
         """显示上一张图片"""
         if self.total_images > 1:
@@ -202,23 +251,130 @@ class FloatingBall:
             self.current_image_index = (self.current_image_index + 1) % self.total_images
             self.update_theme_image()
     
-    def update_theme_image(self):
-        """更新当前显示的图片"""
+    def get_display_size(self):
+        """获取主题图片的最大显示尺寸（屏幕的80%）"""
         screen_width = self.root.winfo_screenwidth()
         screen_height = self.root.winfo_screenheight()
-        display_size = (int(screen_width * 0.8), int(screen_height * 0.8))
+        return (int(screen_width * 0.8), int(screen_height * 0.8))
+    
+    @traced()
+    def update_theme_image(self):
+        """更新当前显示的图片
         
-        # 加载新图片
-        img = Image.open(self.available_images[self.current_image_index])
-        img.thumbnail(display_size, Image.Resampling.LANCZOS)
-        photo = ImageTk.PhotoImage(img)
+        普通图片整张缩放后显示在标签中；长图按宽度缩放后分块显示，
+        只转换可见区域的图片块。
+        
+        Returns:
+            tuple: 图片内容的显示尺寸 (width, height)
+        """
+        display_size = self.get_display_size()
+        image_path = self.available_images[self.current_image_index]
+        
+        if self.tiled_viewer:
+            self.tiled_viewer.destroy()
+            self.tiled_viewer = None
+        
+        tiled_size = self.image_manager.get_tiled_size(image_path, display_size)
+        if tiled_size:
+            from tiled_viewer import TiledImageViewer
+            # 隐藏标签并释放其图片，改为在画布上分块显示
+            self.theme_canvas.itemconfigure(self.image_frame_item, state='hidden')
+            self.image_label.configure(image='')
+            self.image_label.image = None
+            self.tiled_viewer = TiledImageViewer(self.theme_canvas, self.image_manager,
+                                                 image_path, tiled_size)
+            content_size = tiled_size
+        else:
+            # 通过图片缓存加载，切换回看过的图片时无需重新解码
+            photo = self.image_manager.get_photo_image(image_path, display_size)
+            self.theme_canvas.itemconfigure(self.image_frame_item, state='normal')
+            self.image_label.configure(image=photo)
+            self.image_label.image = photo
+            content_size = (photo.width() + 20, photo.height() + 20)
         
-        # 更新显示
-        self.image_label.configure(image=photo)
-        self.image_label.image = photo
         if hasattr(self, 'image_counter'):
             self.image_counter.configure(text=f"{self.current_image_index + 1}/{self.total_images}")
+        
+        # 预取新的相邻图片，下次切换直接命中缓存
+        self.image_manager.prefetch_adjacent(self.current_image_index, display_size)
+        return content_size
+    
+    def schedule_next_day_prefetch(self):
+        """在午夜前 NEXT_DAY_PREFETCH_LEAD 秒预取明天的图片，之后每天重复"""
+        now = datetime.now()
+        midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+        delay = (midnight - now).total_seconds() - self.NEXT_DAY_PREFETCH_LEAD
+        if delay <= 0:
+            # 已在预取窗口内：立即预取，下一次安排在明天午夜前
+            self.image_manager.prefetch_next_day(self.get_display_size())
+            delay += 24 * 3600
+        self.timers.schedule('next_day_prefetch', int(delay * 1000), self.schedule_next_day_prefetch)
+    
+    def check_image_idle(self):
+        """淘汰超时未使用的缓存图片，并安排下一次检查"""
+        self.image_manager.evict_idle()
+        self.timers.schedule('image_idle', self.IMAGE_IDLE_CHECK_MS, self.check_image_idle)
+    
+    @traced()
+    def close_theme_window(self):
+        """关闭主题窗口并释放图片占用的内存"""
+        if self.tiled_viewer:
+            self.tiled_viewer.destroy()
+            self.tiled_viewer = None
+        if self.theme_window:
+            self.theme_window.unbind_all("<MouseWheel>")
+            self.theme_window.destroy()
+            self.theme_window = None
+        self.image_label = None
+        self.image_manager.release_memory()
+    
+    def show_status_report(self):
+        """显示图片相关的内存占用、待执行的定时器和启动耗时"""
+        report = self.image_manager.memory_report()
+        timers = self.timers.stats()
+        shown_ms = STARTUP.elapsed('shown')
+        pending = "、".join(f"{name} {ms / 1000:.1f}秒"
+                           for name, ms in self.timers.pending().items()) or "无"
+        
+        def _mb(size):
+            return f"{size / (1 << 20):.1f} MB" if size is not None else "未知"
+        
+        messagebox.showinfo("运行状态", (
+            f"缓存图片：{report['entries']} 张\n"
+            f"解码图片：{_mb(report['image_bytes'])}\n"
+            f"PhotoImage：{_mb(report['photo_bytes'])}\n"
+            f"待释放 PhotoImage：{report['pending_photos']} 个\n"
+            f"进程常驻内存：{_mb(report['rss'])}（启动时 {_mb(report['baseline_rss'])}）\n"
+            f"待执行定时器：{timers['pending']} 个（{pending}）\n"
+            f"累计安排 {timers['scheduled']} 次，替换 {timers['replaced']} 次，"
+            f"取消 {timers['cancelled']} 次，执行 {timers['fired']} 次\n"
+            f"启动耗时：导入 {STARTUP.elapsed('imports'):.0f} 毫秒，"
+            f"显示悬浮球 {shown_ms or 0:.0f} 毫秒"))
     
+    def get_source_folders(self):
+        """获取登记的图片文件夹，直接读取 image_sources.json，不为此创建图片管理器"""
+        from image_catalog import read_source_folders
+        return read_source_folders(
+            os.path.join(os.getenv('APPDATA'), '每日主题', 'image_sources.json'))
+    
+    def get_images_folder(self):
+        """获取程序自带的 daily_images 图片目录路径"""
+        # 获取程序运行路径
+        if getattr(sys, 'frozen', False):
+            # 如果是打包后的exe
+            application_path = os.path.dirname(sys.executable)
+            # 检查exe所在目录是否有daily_images文件夹
+            if not os.path.exists(os.path.join(application_path, "daily_images")):
+                # 如果没有，尝试在上一级目录查找
+                parent_path = os.path.dirname(application_path)
+                if os.path.exists(os.path.join(parent_path, "daily_images")):
+                    application_path = parent_path
+        else:
+            # 开发环境
+            application_path = os.path.dirname(os.path.abspath(__file__))
+        return os.path.join(application_path, "daily_images")
+    
+    @traced()
     def show_theme(self):
         """显示每日主题图片
         
@@ -229,12 +385,13 @@ class FloatingBall:
         4. 处理各种异常情况
         """
         if self.theme_window and self.theme_window.winfo_exists():
-            self.theme_window.destroy()
-            self.theme_window = None
+            self.close_theme_window()
             return
             
         self.theme_window = tk.Toplevel(self.root)
         self.theme_window.title("每日主题")
+        # 点击关闭按钮时同样释放图片内存
+        self.theme_window.protocol("WM_DELETE_WINDOW", self.close_theme_window)
         self.theme_window.attributes('-topmost', True)
         
         # 设置主题窗口为普通窗口（有边框和最小化按钮）
@@ -242,62 +399,61 @@ class FloatingBall:
         self.theme_window.wm_attributes('-toolwindow', False)
         
         try:
-            # 获取程序运行路径
-            if getattr(sys, 'frozen', False):
-                # 如果是打包后的exe
-                application_path = os.path.dirname(sys.executable)
-                # 检查exe所在目录是否有daily_images文件夹
-                if not os.path.exists(os.path.join(application_path, "daily_images")):
-                    # 如果没有，尝试在上一级目录查找
-                    parent_path = os.path.dirname(application_path)
-                    if os.path.exists(os.path.join(parent_path, "daily_images")):
-                        application_path = parent_path
-            else:
-                # 开发环境
-                application_path = os.path.dirname(os.path.abspath(__file__))
-            
-            # 复制图片到用户数据目录
-            images_folder = os.path.join(application_path, "daily_images")
-            if os.path.exists(images_folder):
-                self.image_manager.copy_images_from(images_folder)
+            # 源目录有文件增删时在后台增量同步，窗口打开不等待复制；
+            # 同步进行中时先显示已有的图片，同步完成后再按新的图片列表重新显示
+            self.image_manager.sync_async(self.get_images_folder())
+            syncing = self.image_manager.on_sync_done(
+                lambda: self.post_to_ui(self.refresh_theme_images))
             
             # 创建图片显示窗口
             screen_width = self.root.winfo_screenwidth()
             screen_height = self.root.winfo_screenheight()
-            display_size = (int(screen_width * 0.8), int(screen_height * 0.8))
             
-            # 加载并显示图片
-            photo, error_msg = self.image_manager.create_photo_image(self.theme_window, display_size)
-            if error_msg:
-                messagebox.showerror("错误", error_msg)
-                self.theme_window.destroy()
-                return
-                
             # 获取所有可用图片
             self.current_image_index = 0
             self.available_images = self.image_manager.get_today_images()
             self.total_images = len(self.available_images)
+            if not self.available_images and syncing:
+                # 首次运行时图片可能还在同步中
+                tk.Label(self.theme_window, text="正在同步图片...", padx=40, pady=30).pack()
+                return
+            if not self.available_images:
+                names = ', '.join(self.image_manager._get_today_image_names())
+                messagebox.showerror("错误", f"无法加载图片，请确保以下文件之一存在：\n{names}")
+                self.theme_window.destroy()
+                return
             
             # 创建滚动区域
             canvas = tk.Canvas(self.theme_window, highlightthickness=0)
-            scrollbar = tk.Scrollbar(self.theme_window, orient="vertical", command=canvas.yview)
             scrollable_frame = tk.Frame(canvas)
+            self.theme_canvas = canvas
+            self.tiled_viewer = None
+
+            # 拖动滚动条后更新长图的可见图片块
+            def _on_scrollbar(*args):
+                canvas.yview(*args)
+                if self.tiled_viewer:
+                    self.tiled_viewer.render_visible()
+            scrollbar = tk.Scrollbar(self.theme_window, orient="vertical", command=_on_scrollbar)
 
             # 配置滚动区域
             canvas.configure(yscrollcommand=scrollbar.set)
-            canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
+            self.image_frame_item = canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
 
             # 创建并保存图片标签，添加边距
-            self.image_label = tk.Label(scrollable_frame, image=photo)
-            self.image_label.image = photo
+            self.image_label = tk.Label(scrollable_frame)
             self.image_label.pack(padx=10, pady=10)
 
-            # 更新滚动区域大小
+            # 更新滚动区域大小（分块显示时由分块显示器设置）
             def _configure_scroll_region(event):
-                canvas.configure(scrollregion=canvas.bbox("all"))
+                if self.tiled_viewer is None:
+                    canvas.configure(scrollregion=canvas.bbox("all"))
                 # 确保内容居中
                 canvas.configure(width=event.width)
             scrollable_frame.bind("<Configure>", _configure_scroll_region)
+            
+            # 加载并显示图片，同时在后台预取相邻图片
+            content_width, content_height = self.update_theme_image()
 
             # 创建导航栏（始终显示）
             nav_frame = tk.Frame(self.theme_window)
@@ -328,10 +484,10 @@ class FloatingBall:
                 self.theme_window.bind('<Right>', lambda e: self.show_next_image())
             
             # 设置窗口大小和位置
-            window_width = min(photo.width() + 40, screen_width * 0.9)  # 考虑滚动条宽度
+            window_width = min(content_width + 20, screen_width * 0.9)  # 考虑滚动条宽度
             # 为导航栏预留足够的空间
             nav_height = 40 if self.total_images > 1 else 0
-            window_height = min(photo.height() + 20 + nav_height, screen_height * 0.9)
+            window_height = min(content_height + nav_height, screen_height * 0.9)
             x = (screen_width - window_width) // 2
             y = (screen_height - window_height) // 2
             self.theme_window.geometry(f"{int(window_width)}x{int(window_height)}+{x}+{y}")
@@ -339,6 +495,9 @@ class FloatingBall:
             # 绑定鼠标滚轮事件
             def _on_mousewheel(event):
                 canvas.yview_scroll(int(-1*(event.delta/120)), "units")
+                # 长图滚动后加载新进入可见区域的图片块
+                if self.tiled_viewer:
+                    self.tiled_viewer.render_visible()
             self.theme_window.bind_all("<MouseWheel>", _on_mousewheel)
             
         except Exception as e:
@@ -381,14 +540,8 @@ class FloatingBall:
             messagebox.showerror("错误", f"无法添加到开机启动项：{str(e)}")
                 
     def on_release(self, event):
-        """处理鼠标释放事件
-        
-        当鼠标释放时：
-        1. 结束拖拽状态
-        2. 延迟500ms后自动半隐藏悬浮球
-        """
-        self.dragging = False
-        self.root.after(500, self.semi_hide_ball)
+        """处理鼠标释放事件：结束拖拽，延迟500ms后自动半隐藏悬浮球"""
+        self.ball.release()
             
     def check_startup_status(self):
         """检查开机启动状态
@@ -419,6 +572,50 @@ class FloatingBall:
         else:
             self.add_to_startup()
 
+    def _settings_path(self):
+        """事务设置文件路径（与任务数据放在同一目录）"""
+        return os.path.join(os.getenv('APPDATA'), '每日事务', 'settings.json')
+    
+    def load_settings(self):
+        """读取事务设置，不存在或已损坏时返回空字典"""
+        try:
+            with open(self._settings_path(), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+    
+    def toggle_carry_over(self, enabled):
+        """切换是否把未完成的事务转入第二天，保存设置并立即应用到已创建的事务管理器"""
+        settings = self.load_settings()
+        settings['carry_over'] = bool(enabled)
+        path = self._settings_path()
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(settings, f, ensure_ascii=False, indent=4)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            messagebox.showerror("错误", f"无法保存设置：{str(e)}")
+            return
+        if self._task_manager:
+            self._task_manager.carry_over = bool(enabled)
+    
+    def add_image_folder(self):
+        """选择一个本地图片文件夹作为主题来源
+        
+        文件夹中（含子目录）以 MM-DD 开头命名的图片会在对应日期显示，不会复制到应用目录
+        """
+        folder = filedialog.askdirectory(title="选择图片文件夹")
+        if not folder:
+            return
+        try:
+            self.image_manager.add_source_folder(folder)
+            messagebox.showinfo("提示", f"已添加图片文件夹：\n{folder}")
+        except Exception as e:
+            messagebox.showerror("错误", f"无法添加图片文件夹：{str(e)}")
+
+    @traced()
     def show_task_window(self):
         """显示事务记录窗口
         
@@ -486,6 +683,7 @@ class FloatingBall:
         y = (self.screen_height - window_height) // 2
         self.task_window.geometry(f"{window_width}x{window_height}+{x}+{y}")
         
+    @traced()
     def show_history_window(self):
         """显示历史记录窗口
         
@@ -506,21 +704,16 @@ class FloatingBall:
         date_frame = tk.Frame(history_window)
         date_frame.pack(fill=tk.X, padx=10, pady=5)
         
-        dates = self.task_manager.get_history_dates()
-        if not dates:
-            tk.Label(history_window, text="暂无历史记录").pack(pady=20)
-            return
-            
-        # 创建开始日期选择
+        # 创建开始日期选择（日期列表在后台加载完成后填充）
         tk.Label(date_frame, text="开始日期：").pack(side=tk.LEFT)
-        start_var = tk.StringVar(value=dates[-1])
-        start_menu = tk.OptionMenu(date_frame, start_var, *dates)
+        start_var = tk.StringVar()
+        start_menu = tk.OptionMenu(date_frame, start_var, '')
         start_menu.pack(side=tk.LEFT, padx=5)
         
         # 创建结束日期选择
         tk.Label(date_frame, text="结束日期：").pack(side=tk.LEFT)
-        end_var = tk.StringVar(value=dates[0])
-        end_menu = tk.OptionMenu(date_frame, end_var, *dates)
+        end_var = tk.StringVar()
+        end_menu = tk.OptionMenu(date_frame, end_var, '')
         end_menu.pack(side=tk.LEFT, padx=5)
         
         # 创建历史记录列表
@@ -529,39 +722,163 @@ class FloatingBall:
         
         history_text = tk.Text(history_frame, wrap=tk.WORD, width=50, height=20)
         history_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        history_text.insert(tk.END, "加载中...")
         
         # 添加滚动条
         scrollbar = tk.Scrollbar(history_frame)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
-        history_text.config(yscrollcommand=scrollbar.set)
         scrollbar.config(command=history_text.yview)
         
+        # 分页渲染状态：
+        # - dates: 尚未渲染的 (日期, 任务数) 列表，None表示已全部渲染
+        # - load: 正在进行的后台读取，切换日期范围时取消
+        page_state = {'dates': None, 'load': None}
+        
+        def cancel_load():
+            """取消正在进行的后台读取"""
+            if page_state['load']:
+                page_state['load'].cancel()
+                page_state['load'] = None
+        
+        def on_page_loaded(day_tasks):
+            """后台读取完成，在文本框末尾追加一页"""
+            page_state['load'] = None
+            lines = []
+            for date, tasks in day_tasks:
+                lines.append(f"=== {date} ===\n")
+                for task in tasks:
+                    status = "[√]" if task['completed'] else "[ ]"
+                    lines.append(f"{status} {task['content']}\n")
+                lines.append("\n")
+            if lines:
+                history_text.insert(tk.END, ''.join(lines))
+        
+        def on_load_error(error):
+            """后台读取失败"""
+            page_state['load'] = None
+            page_state['dates'] = None
+            history_text.insert(tk.END, f"读取历史记录失败：{str(error)}\n")
+        
+        def render_next_page():
+            """在后台并行读取下一页（约 HISTORY_PAGE_LINES 行）的日期"""
+            dates = page_state['dates']
+            if not dates or page_state['load']:
+                return
+            
+            page_dates = []
+            lines = 0
+            while dates and lines < self.HISTORY_PAGE_LINES:
+                date, count = dates.pop(0)
+                page_dates.append(date)
+                lines += count + 2
+            if not dates:
+                page_state['dates'] = None
+            
+            page_state['load'] = self.task_async.load_days(
+                page_dates, on_page_loaded, on_load_error)
+        
+        def on_history_scroll(first, last):
+            """滚动接近底部时加载下一页"""
+            scrollbar.set(first, last)
+            if page_state['dates'] and not page_state['load'] and float(last) > 0.9:
+                history_window.after_idle(render_next_page)
+        
+        history_text.config(yscrollcommand=on_history_scroll)
+        
         def update_history_display():
-            """更新历史记录显示"""
+            """更新历史记录显示
+            
+            先在后台读取摘要确定范围内有任务的日期，
+            只渲染第一页，其余内容在滚动到底部附近时逐页加载
+            """
             start_date = start_var.get()
             end_date = end_var.get()
             
-            # 清空文本框
+            # 取消上一次尚未完成的读取，清空文本框
+            cancel_load()
+            page_state['dates'] = None
             history_text.delete('1.0', tk.END)
             
-            # 获取历史记录
-            history_tasks = self.task_manager.get_tasks_by_date_range(start_date, end_date)
+            def on_summary_loaded(summary):
+                page_state['load'] = None
+                page_state['dates'] = [
+                    (date, summary[date]['count'])
+                    for date in sorted(summary, reverse=True)
+                    if summary[date]['count'] and start_date <= date <= end_date
+                ]
+                render_next_page()
             
-            # 显示历史记录
-            for date in sorted(history_tasks.keys(), reverse=True):
-                history_text.insert(tk.END, f"=== {date} ===\n")
-                for task in history_tasks[date]:
-                    status = "[√]" if task['completed'] else "[ ]"
-                    history_text.insert(tk.END, f"{status} {task['content']}\n")
-                history_text.insert(tk.END, "\n")
+            page_state['load'] = self.task_async.submit(
+                self.task_manager.get_history_summary,
+                callback=on_summary_loaded, errback=on_load_error)
+        
+        def on_dates_loaded(dates):
+            """历史日期列表加载完成，填充日期选择框"""
+            page_state['load'] = None
+            history_text.delete('1.0', tk.END)
+            if not dates:
+                history_text.insert(tk.END, "暂无历史记录")
+                return
+            
+            for menu, var in ((start_menu, start_var), (end_menu, end_var)):
+                options = menu['menu']
+                options.delete(0, tk.END)
+                for date in dates:
+                    options.add_command(label=date, command=tk._setit(var, date))
+            start_var.set(dates[-1])
+            end_var.set(dates[0])
+            
+            # 初始显示历史记录
+            update_history_display()
         
         # 创建更新按钮
         update_button = tk.Button(date_frame, text="更新", command=update_history_display)
         update_button.pack(side=tk.LEFT, padx=10)
         
-        # 初始显示历史记录
-        update_history_display()
+        def search_history(event=None):
+            """搜索历史任务，关键词为空时恢复按日期显示"""
+            query = search_entry.get().strip()
+            if not query:
+                update_history_display()
+                return
+            
+            def on_search_done(results):
+                page_state['load'] = None
+                history_text.delete('1.0', tk.END)
+                lines = [f"=== 搜索“{query}”：{len(results)} 条 ===\n"]
+                for task in results:
+                    status = "[√]" if task['completed'] else "[ ]"
+                    lines.append(f"{task['date']} {status} {task['content']}\n")
+                history_text.insert(tk.END, ''.join(lines))
+            
+            cancel_load()
+            page_state['dates'] = None
+            page_state['load'] = self.task_async.submit(
+                self.task_manager.search, query, self.HISTORY_SEARCH_LIMIT,
+                callback=on_search_done, errback=on_load_error)
+        
+        # 创建搜索框
+        search_frame = tk.Frame(history_window)
+        search_frame.pack(fill=tk.X, padx=10, pady=(0, 5), before=history_frame)
+        
+        search_entry = tk.Entry(search_frame)
+        search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        search_entry.bind('<Return>', search_history)
+        
+        search_button = tk.Button(search_frame, text="搜索", command=search_history)
+        search_button.pack(side=tk.LEFT, padx=5)
+        
+        # 后台预先加载搜索索引
+        self.task_manager.search_index.load_async()
+        
+        # 后台加载历史日期列表
+        page_state['load'] = self.task_async.submit(
+            self.task_manager.get_history_dates,
+            callback=on_dates_loaded, errback=on_load_error)
+        
+        # 窗口关闭时取消尚未完成的读取
+        history_window.bind('<Destroy>', lambda e: cancel_load() if e.widget is history_window else None)
         
         # 设置窗口位置和大小
         window_width = 500
@@ -570,6 +887,7 @@ class FloatingBall:
         y = (self.screen_height - window_height) // 2
         history_window.geometry(f"{window_width}x{window_height}+{x}+{y}")
     
+    @traced()
     def add_task(self):
         """添加新事务"""
         content = self.task_entry.get().strip()
@@ -578,6 +896,7 @@ class FloatingBall:
             self.task_entry.delete(0, tk.END)
             self.update_task_list()
     
+    @traced()
     def update_task_list(self):
         """更新事务列表显示"""
         self.task_listbox.delete(0, tk.END)
@@ -612,42 +931,32 @@ class FloatingBall:
                 self.task_manager.delete_task(task_id)
                 self.update_task_list()
     
-    def fully_hide_ball(self):
-        """完全隐藏悬浮球
-        
-        将悬浮球完全隐藏（透明度设为0）
-        """
-        if not self.dragging and self.is_hidden:
-            self.fully_hidden = True
-            self.root.attributes('-alpha', 0)
-    
-    def check_mouse_position(self):
-        """检查鼠标位置
-        
-        定期检查鼠标位置，当鼠标靠近屏幕边缘时显示悬浮球
-        """
-        if self.fully_hidden:
-            mouse_x = win32api.GetCursorPos()[0]
-            screen_edge = 2
-            
-            # 检查鼠标是否在屏幕边缘
-            if mouse_x <= screen_edge or mouse_x >= self.screen_width - screen_edge:
-                self.show_ball()
-        
-        # 每50毫秒检查一次鼠标位置
-        self.root.after(50, self.check_mouse_position)
-    
-    def run(self):
+    def run(self, startup_report=None, startup_budget=None):
         """运行应用程序
         
         主要功能：
         1. 创建右键菜单，包含开机启动选项和退出选项
         2. 绑定鼠标右键和左键释放事件
         3. 启动主循环
+        
+        Args:
+            startup_report: 启动耗时报告的输出文件（见 on_shown）
+            startup_budget: 显示悬浮球的耗时预算（毫秒）
+        
+        Returns:
+            int: 退出码
         """
         menu = tk.Menu(self.root, tearoff=0)
         startup_var = tk.BooleanVar(value=self.check_startup_status())
         menu.add_checkbutton(label="开机启动", variable=startup_var, command=self.toggle_startup)
+        carry_over_var = tk.BooleanVar(value=self.load_settings().get('carry_over', False))
+        menu.add_checkbutton(label="未完成事务转入第二天", variable=carry_over_var,
+                             command=lambda: self.toggle_carry_over(carry_over_var.get()))
+        menu.add_separator()
+        menu.add_command(label="添加图片文件夹...", command=self.add_image_folder)
+        folders_menu = tk.Menu(menu, tearoff=0)
+        menu.add_cascade(label="移除图片文件夹", menu=folders_menu)
+        menu.add_command(label="运行状态", command=self.show_status_report)
         menu.add_separator()
         menu.add_command(label="退出", command=self.root.quit)
 
@@ -657,14 +966,80 @@ class FloatingBall:
             更新开机启动状态并显示菜单
             """
             startup_var.set(self.check_startup_status())  # 更新复选框状态
+            
+            # 更新已登记的图片文件夹列表
+            folders_menu.delete(0, tk.END)
+            folders = self.get_source_folders()
+            for folder in folders:
+                folders_menu.add_command(
+                    label=folder,
+                    command=lambda f=folder: self.image_manager.remove_source_folder(f))
+            menu.entryconfigure("移除图片文件夹", state=tk.NORMAL if folders else tk.DISABLED)
             menu.post(event.x_root, event.y_root)
             
         for button in [self.theme_button, self.task_button]:
             button.bind('<Button-3>', show_menu)
             button.bind('<ButtonRelease-1>', self.on_release)
         
+        self.exit_code = 0
+        self.root.after_idle(self.on_shown, startup_report, startup_budget)
         self.root.mainloop()
+        self.timers.cancel_all()
+        
+        # 退出前合并事务日志（只处理已经创建的管理器）
+        if self._task_async:
+            self._task_async.shutdown()
+        if self._task_manager:
+            self._task_manager.close()
+        if self._image_manager:
+            self._image_manager.cleanup()
+        return self.exit_code
+    
+    def on_shown(self, startup_report=None, startup_budget=None):
+        """悬浮球首次显示后：记录启动耗时，延迟创建图片管理器
+        
+        Args:
+            startup_report: 启动耗时报告的输出文件，'-' 为标准输出，None 表示不输出
+            startup_budget: 显示悬浮球的耗时预算（毫秒），超出时退出码为1
+        """
+        STARTUP.mark('shown')
+        for phase in STARTUP.report()['phases']:
+            tracing.record(f"startup.{phase['name']}", phase['ms'])
+        if startup_report is None:
+            self.timers.schedule('warm_up', self.IMAGE_WARM_UP_DELAY_MS, self.warm_up_images)
+            return
+        
+        report = STARTUP.report()
+        if startup_budget is not None:
+            report['budget_ms'] = startup_budget
+            report['over_budget'] = report['total_ms'] > startup_budget
+            self.exit_code = 1 if report['over_budget'] else 0
+        text = json.dumps(report, ensure_ascii=False, indent=2)
+        if startup_report == '-':
+            print(text)
+        else:
+            with open(startup_report, 'w', encoding='utf-8') as f:
+                f.write(text)
+        self.root.quit()
 
-if __name__ == "__main__":
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='每日主题悬浮球')
+    parser.add_argument('--startup-report', nargs='?', const='-', metavar='FILE',
+                        help='显示悬浮球后输出启动耗时报告（JSON）并退出，默认输出到标准输出')
+    parser.add_argument('--startup-budget', type=float, metavar='MS',
+                        help='显示悬浮球的耗时预算（毫秒），超出时退出码为1')
+    parser.add_argument('--trace', nargs='?', const=tracing.default_path(), metavar='FILE',
+                        help='把各操作的耗时写入追踪文件（JSON lines），默认为应用数据目录下的 trace.jsonl')
+    args, _ = parser.parse_known_args()
+    
+    if args.trace:
+        tracing.enable(args.trace)
+    else:
+        tracing.enable_from_env()
+    
     app = FloatingBall()
-    app.run()
+    return app.run(args.startup_report, args.startup_budget)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,245 @@
+import sys
+import threading
+
+
+class CursorSource:
+    """
+    鼠标位置来源
+
+    position 返回当前鼠标的屏幕坐标。支持事件推送的来源重写 start_events，
+    在鼠标移动时（可能在其他线程中）回调 on_move(x, y)，此时不再需要轮询。
+    测试时可以替换为按脚本返回坐标的实现。
+    """
+
+    def position(self):
+        """获取鼠标位置
+
+        Returns:
+            tuple: (x, y)
+        """
+        raise NotImplementedError
+
+    def start_events(self, on_move):
+        """开始推送鼠标移动事件
+
+        Returns:
+            bool: 是否支持事件推送，不支持时由调用方轮询
+        """
+        return False
+
+    def stop_events(self):
+        """停止推送鼠标移动事件"""
+
+
+class Win32CursorSource(CursorSource):
+    """通过 GetCursorPos 读取鼠标位置（首次使用时才导入 pywin32）"""
+
+    def position(self):
+        import win32api
+        return win32api.GetCursorPos()
+
+
+class Win32HookCursorSource(Win32CursorSource):
+    """
+    低级鼠标钩子（WH_MOUSE_LL）推送鼠标位置
+
+    钩子安装在独立线程的消息循环中，只在 start_events 与 stop_events 之间存在，
+    悬浮球显示时系统中不保留任何钩子。
+    """
+
+    WH_MOUSE_LL = 14
+    WM_MOUSEMOVE = 0x0200
+    WM_QUIT = 0x0012
+
+    def __init__(self):
+        self._thread = None
+        self._thread_id = None
+
+    @staticmethod
+    def available():
+        """当前平台是否支持低级鼠标钩子"""
+        return sys.platform == 'win32'
+
+    def start_events(self, on_move):
+        if not self.available():
+            return False
+        if self._thread and self._thread.is_alive():
+            return True
+
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(on_move, ready), daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self._thread_id is not None
+
+    def _run(self, on_move, ready):
+        """钩子线程：安装钩子并运行消息循环"""
+        import ctypes
+        from ctypes import wintypes
+
+        user32 = ctypes.windll.user32
+        kernel32 = ctypes.windll.kernel32
+
+        class MSLLHOOKSTRUCT(ctypes.Structure):
+            _fields_ = [('pt', wintypes.POINT), ('mouseData', wintypes.DWORD),
+                        ('flags', wintypes.DWORD), ('time', wintypes.DWORD),
+                        ('dwExtraInfo', ctypes.c_size_t)]
+
+        HOOKPROC = ctypes.WINFUNCTYPE(ctypes.c_ssize_t, ctypes.c_int,
+                                      wintypes.WPARAM, wintypes.LPARAM)
+        user32.CallNextHookEx.argtypes = [wintypes.HHOOK, ctypes.c_int,
+                                          wintypes.WPARAM, wintypes.LPARAM]
+        user32.CallNextHookEx.restype = ctypes.c_ssize_t
+
+        def _hook(code, wparam, lparam):
+            if code >= 0 and wparam == self.WM_MOUSEMOVE:
+                info = ctypes.cast(lparam, ctypes.POINTER(MSLLHOOKSTRUCT)).contents
+                on_move(info.pt.x, info.pt.y)
+            return user32.CallNextHookEx(None, code, wparam, lparam)
+
+        proc = HOOKPROC(_hook)
+        hook = user32.SetWindowsHookExW(self.WH_MOUSE_LL, proc, kernel32.GetModuleHandleW(None), 0)
+        if not hook:
+            ready.set()
+            return
+        self._thread_id = kernel32.GetCurrentThreadId()
+        ready.set()
+
+        msg = wintypes.MSG()
+        while user32.GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+            user32.TranslateMessage(ctypes.byref(msg))
+            user32.DispatchMessageW(ctypes.byref(msg))
+        user32.UnhookWindowsHookEx(hook)
+        self._thread_id = None
+
+    def stop_events(self):
+        if self._thread_id is not None:
+            import ctypes
+            ctypes.windll.user32.PostThreadMessageW(self._thread_id, self.WM_QUIT, 0, 0)
+        self._thread = None
+
+
+class EdgeRevealDetector:
+    """
+    屏幕边缘唤出检测
+
+    只在悬浮球完全隐藏后（arm）才开始检测，显示后（disarm）立即停止。
+    鼠标来源支持事件推送时不轮询；否则自适应轮询：鼠标移动时按最短间隔检查，
+    鼠标静止时间隔按 backoff 倍数逐步拉长到最长间隔。
+    定时和跨线程投递都通过注入的函数完成，可以用模拟时钟在无界面环境中统计唤醒次数。
+    """
+
+    def __init__(self, source, screen_width, on_reveal, after, after_cancel, post=None,
+                 edge=2, min_interval_ms=50, max_interval_ms=500, backoff=2.0):
+        """
+        初始化检测器
+
+        Args:
+            source: 鼠标位置来源（CursorSource）
+            screen_width: 屏幕宽度
+            on_reveal: 鼠标到达屏幕边缘时的回调
+            after: 定时函数 after(毫秒, 回调)，返回定时器ID（如 root.after）
+            after_cancel: 取消定时器的函数（如 root.after_cancel）
+            post: 把回调投递到界面线程的线程安全函数，使用事件推送时必需
+            edge: 距离屏幕边缘多少像素内算作到达边缘
+            min_interval_ms: 鼠标移动时的轮询间隔（毫秒）
+            max_interval_ms: 鼠标静止时的最长轮询间隔（毫秒）
+            backoff: 鼠标静止时每次轮询间隔的增长倍数
+        """
+        self.source = source
+        self.screen_width = screen_width
+        self.on_reveal = on_reveal
+        self.after = after
+        self.after_cancel = after_cancel
+        self.post = post
+        self.edge = edge
+        self.min_interval_ms = min_interval_ms
+        self.max_interval_ms = max_interval_ms
+        self.backoff = backoff
+
+        self.armed = False
+        self.mode = None
+        self.interval_ms = min_interval_ms
+        # 轮询唤醒次数，用于评估耗电
+        self.wakeups = 0
+
+        self._timer = None
+        self._last_pos = None
+
+    def at_edge(self, x):
+        """判断横坐标是否在屏幕左右边缘"""
+        return x <= self.edge or x >= self.screen_width - self.edge
+
+    def arm(self):
+        """开始检测（悬浮球完全隐藏时调用）"""
+        if self.armed:
+            return
+        self.armed = True
+        if self.post is not None and self.source.start_events(self._on_event):
+            self.mode = 'events'
+            return
+        self.mode = 'poll'
+        self._last_pos = None
+        self.interval_ms = self.min_interval_ms
+        self._timer = self.after(self.interval_ms, self._poll)
+
+    def disarm(self):
+        """停止检测（悬浮球显示时调用）"""
+        if not self.armed:
+            return
+        self.armed = False
+        if self.mode == 'events':
+            self.source.stop_events()
+        if self._timer is not None:
+            self.after_cancel(self._timer)
+            self._timer = None
+        self.mode = None
+
+    def _reveal(self):
+        """鼠标到达边缘：停止检测并显示悬浮球"""
+        if not self.armed:
+            return
+        self.disarm()
+        self.on_reveal()
+
+    def _poll(self):
+        """轮询一次鼠标位置，并按鼠标是否移动调整下一次间隔"""
+        self._timer = None
+        if not self.armed:
+            return
+        self.wakeups += 1
+        try:
+            pos = self.source.position()
+        except Exception:
+            # 工作站锁定、切换桌面时 GetCursorPos 会失败，按最长间隔稍后重试
+            self.interval_ms = self.max_interval_ms
+            self._timer = self.after(self.interval_ms, self._poll)
+            return
+        if self.at_edge(pos[0]):
+            self._reveal()
+            return
+
+        if pos == self._last_pos:
+            self.interval_ms = min(int(self.interval_ms * self.backoff), self.max_interval_ms)
+        else:
+            self.interval_ms = self.min_interval_ms
+        self._last_pos = pos
+        self._timer = self.after(self.interval_ms, self._poll)
+
+    def _on_event(self, x, y):
+        """事件推送回调（可能在钩子线程中调用），到达边缘时投递到界面线程"""
+        if self.armed and self.at_edge(x):
+            self.post(self._reveal)
+
+    def stats(self):
+        """获取检测状态
+
+        Returns:
+            dict: 是否在检测、检测方式、当前轮询间隔和累计唤醒次数
+        """
+        return {
+            'armed': self.armed,
+            'mode': self.mode,
+            'interval_ms': self.interval_ms,
+            'wakeups': self.wakeups
+        }
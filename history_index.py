@@ -0,0 +1,240 @@
+import os
+import json
+import hashlib
+import threading
+from task_storage import WriteBehindFlusher
+
+
+def _date_of(filename):
+    """从任务文件名中取出日期，非任务文件返回None
+
+    任务文件形如 <date>.json、<date>.jsonl、<date>.jsonl.compacting，
+    写入中的临时文件（.tmp）和快照的上一版本（.bak）不计入。
+    """
+    if filename.endswith(('.tmp', '.bak')):
+        return None
+    date, _, ext = filename.partition('.')
+    if len(date) != 10 or not ext.startswith('json'):
+        return None
+    return date
+
+
+def content_hash(tasks):
+    """计算任务列表的内容哈希"""
+    text = json.dumps(tasks, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class HistoryIndex:
+    """
+    历史记录摘要索引
+
+    在单个索引文件中保存每个日期的任务数、完成数、文件大小、修改时间和内容哈希，
+    打开历史记录时只需读取这一个文件。每次写盘后按本次的操作记录增量更新对应日期的计数，
+    索引文件延迟合并写入（或在 close 时写入）；任务目录的 mtime 与索引记录不一致时
+    （如外部修改、后台合并），只重新解析大小或修改时间发生变化的日期。
+    增量更新的条目不计算内容哈希（为 None），重新解析时才计算。
+    """
+
+    VERSION = 1
+
+    def __init__(self, index_path, storage, writer, save_delay=5.0, max_save_delay=30.0):
+        """
+        初始化索引
+
+        Args:
+            index_path: 索引文件路径（不应位于任务目录内）
+            storage: 任务存储，用于重新解析变化的日期
+            writer: 文件写入器（DurableWriter）
+            save_delay: 索引文件的延迟写入时间（秒）
+            max_save_delay: 首次修改到写入索引文件的最长延迟（秒）
+        """
+        self.index_path = index_path
+        self.storage = storage
+        self.writer = writer
+
+        self._lock = threading.Lock()
+        self._days = None
+        self._dir_mtime = None
+        # 本次运行中增量更新过的日期：{日期: [{任务ID: 是否完成}, 完成数]}
+        self._live = {}
+        self._dirty = False
+        self._flusher = WriteBehindFlusher(self.save, save_delay, max_save_delay)
+
+    def _dir_stat(self):
+        """获取任务目录的 mtime"""
+        return os.stat(self.storage.tasks_dir).st_mtime_ns
+
+    def _scan(self):
+        """扫描任务目录，返回 {日期: (总大小, 最新修改时间)}"""
+        stats = {}
+        with os.scandir(self.storage.tasks_dir) as entries:
+            for entry in entries:
+                date = _date_of(entry.name)
+                if date is None or not entry.is_file():
+                    continue
+                st = entry.stat()
+                size, mtime = stats.get(date, (0, 0))
+                stats[date] = (size + st.st_size, max(mtime, st.st_mtime_ns))
+        return stats
+
+    def _stat_date(self, date):
+        """获取单个日期所有任务文件的 (总大小, 最新修改时间)"""
+        size, mtime = 0, 0
+        for suffix in ('.json', '.jsonl', '.jsonl.compacting'):
+            try:
+                st = os.stat(os.path.join(self.storage.tasks_dir, date + suffix))
+            except FileNotFoundError:
+                continue
+            size += st.st_size
+            mtime = max(mtime, st.st_mtime_ns)
+        return size, mtime
+
+    @staticmethod
+    def _make_entry(tasks, size, mtime):
+        """生成单个日期的索引条目"""
+        return {
+            'count': len(tasks),
+            'completed': sum(1 for task in tasks if task['completed']),
+            'size': size,
+            'mtime': mtime,
+            'hash': content_hash(tasks)
+        }
+
+    def _read(self):
+        """读取索引文件，不存在或已损坏时返回空索引"""
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}, None
+        if data.get('version') != self.VERSION:
+            return {}, None
+        return data['days'], data['dir_mtime']
+
+    def _save(self):
+        """写入索引文件（需持有锁）"""
+        self.writer.write_atomic(self.index_path, json.dumps({
+            'version': self.VERSION,
+            'dir_mtime': self._dir_mtime,
+            'days': self._days
+        }, ensure_ascii=False))
+        self._dirty = False
+
+    def save(self):
+        """有未写入的修改时写入索引文件"""
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    def _ensure_loaded(self):
+        """首次使用时加载索引，必要时刷新（需持有锁）"""
+        if self._days is not None:
+            return
+        self._days, self._dir_mtime = self._read()
+        if self._dir_mtime != self._dir_stat():
+            self._refresh()
+
+    def _refresh(self):
+        """按目录扫描结果增量重建索引（需持有锁）"""
+        dir_mtime = self._dir_stat()
+        stats = self._scan()
+        days = {}
+        for date, (size, mtime) in stats.items():
+            entry = self._days.get(date)
+            if entry and entry['size'] == size and entry['mtime'] == mtime:
+                days[date] = entry
+            else:
+                days[date] = self._make_entry(self.storage.load_tasks(date), size, mtime)
+                self._live.pop(date, None)
+        self._days = days
+        self._dir_mtime = dir_mtime
+        self._save()
+
+    def refresh(self):
+        """目录发生变化时重建索引（未变化时只需一次 os.stat）"""
+        with self._lock:
+            if self._days is None:
+                self._ensure_loaded()
+            elif self._dir_mtime != self._dir_stat():
+                self._refresh()
+
+    def in_sync(self):
+        """写盘前调用：任务目录自上次刷新以来是否没有被其他写入者修改过"""
+        with self._lock:
+            self._ensure_loaded()
+            return self._dir_mtime == self._dir_stat()
+
+    def update(self, date, ops, tasks, dir_in_sync=False):
+        """某个日期写盘后增量更新索引
+
+        本次运行中首次更新某个日期时以 tasks 为基准，之后只按操作记录更新计数，
+        开销与当天任务数和历史天数无关。索引文件延迟写入。
+
+        只有写盘前目录与索引一致时才记录新的目录 mtime；否则说明期间有外部修改
+        （如漫游配置同步新增的文件），保留旧值让下次 refresh 重新扫描。
+
+        Args:
+            date: 日期字符串（YYYY-MM-DD）
+            ops: 本次写盘的操作记录
+            tasks: 写盘后的完整任务列表
+            dir_in_sync: 写盘前 in_sync() 的结果
+        """
+        with self._lock:
+            self._ensure_loaded()
+            live = self._live.get(date)
+            if live is None:
+                states = {task['id']: bool(task['completed']) for task in tasks}
+                live = self._live[date] = [states, sum(states.values())]
+            else:
+                for op in ops:
+                    self._apply_op(live, op)
+
+            size, mtime = self._stat_date(date)
+            self._days[date] = {
+                'count': len(live[0]),
+                'completed': live[1],
+                'size': size,
+                'mtime': mtime,
+                'hash': None
+            }
+            if dir_in_sync:
+                self._dir_mtime = self._dir_stat()
+            self._dirty = True
+        self._flusher.schedule()
+
+    @staticmethod
+    def _apply_op(live, op):
+        """按一条操作记录更新 [{任务ID: 是否完成}, 完成数]"""
+        states = live[0]
+        kind = op['op']
+        if kind == 'add':
+            task = op['task']
+            live[1] += bool(task['completed']) - states.get(task['id'], False)
+            states[task['id']] = bool(task['completed'])
+        elif kind == 'update':
+            if op['id'] in states and 'completed' in op['fields']:
+                completed = bool(op['fields']['completed'])
+                live[1] += completed - states[op['id']]
+                states[op['id']] = completed
+        elif kind == 'delete':
+            live[1] -= states.pop(op['id'], False)
+        elif kind == 'reset':
+            states.clear()
+            states.update((task['id'], bool(task['completed'])) for task in op['tasks'])
+            live[1] = sum(states.values())
+
+    def summaries(self):
+        """获取所有日期的摘要
+
+        Returns:
+            dict: {日期: {'count': 任务数, 'completed': 完成数}}
+        """
+        with self._lock:
+            self._ensure_loaded()
+            return {date: {'count': entry['count'], 'completed': entry['completed']}
+                    for date, entry in self._days.items()}
+
+    def close(self):
+        """立即写入未保存的修改"""
+        self._flusher.flush()
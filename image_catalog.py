@@ -0,0 +1,302 @@
+import os
+import re
+import json
+import threading
+
+# 支持的图片扩展名
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+# 文件名以月-日开头，后面不能紧跟数字：02-27.png、02-27_2.jpg、02-27 海边.png
+_DAY_PATTERN = re.compile(r'^(\d{2}-\d{2})(?!\d)')
+
+# 同一天内的排序：文件名主干相同时 .png 在 .jpg 之前
+_EXTENSION_ORDER = {ext: rank for rank, ext in enumerate(IMAGE_EXTENSIONS)}
+
+
+def day_of(name):
+    """从图片文件名中取出月-日（MM-DD），不按日期命名时返回None"""
+    match = _DAY_PATTERN.match(name)
+    return match.group(1) if match else None
+
+
+def sort_key(name):
+    """同一天内图片的排序键"""
+    stem, ext = os.path.splitext(name)
+    return stem, _EXTENSION_ORDER.get(ext.lower(), len(_EXTENSION_ORDER)), name
+
+
+def read_source_folders(sources_path):
+    """读取登记的图片文件夹列表（image_sources.json），不存在或已损坏时返回空列表
+
+    不依赖 ImageManager，右键菜单可以在图片管理器创建前列出文件夹。
+    """
+    try:
+        with open(sources_path, 'r', encoding='utf-8') as f:
+            return json.load(f)['folders']
+    except (FileNotFoundError, json.JSONDecodeError, KeyError):
+        return []
+
+
+def _scan_tree(root, old_tree):
+    """扫描一个来源目录（含子目录），返回新的快照
+
+    快照为 {目录路径: {'mtime': 目录修改时间, 'files': {文件名: [大小, 修改时间]},
+    'dirs': [子目录名]}}。目录的 mtime 与旧快照一致时（没有文件增删）不再列出
+    该目录，只对旧快照中的文件逐个 stat，以发现原地修改的文件（不改变目录 mtime）。
+
+    Args:
+        root: 来源根目录
+        old_tree: 上一次的快照
+
+    Returns:
+        dict: 新的快照，根目录不存在时为空
+    """
+    tree = {}
+    pending = [root]
+    while pending:
+        dir_path = pending.pop()
+        try:
+            mtime = os.stat(dir_path).st_mtime_ns
+        except OSError:
+            continue
+
+        node = old_tree.get(dir_path)
+        if node is None or node['mtime'] != mtime:
+            files, dirs = {}, []
+            try:
+                with os.scandir(dir_path) as it:
+                    for entry in it:
+                        if entry.is_dir():
+                            dirs.append(entry.name)
+                        elif entry.name.lower().endswith(IMAGE_EXTENSIONS) and entry.is_file():
+                            st = entry.stat()
+                            files[entry.name] = [st.st_size, st.st_mtime_ns]
+            except OSError:
+                continue
+            node = {'mtime': mtime, 'files': files, 'dirs': dirs}
+        else:
+            files = {}
+            for name in node['files']:
+                try:
+                    st = os.stat(os.path.join(dir_path, name))
+                except OSError:
+                    continue
+                files[name] = [st.st_size, st.st_mtime_ns]
+            node = {'mtime': mtime, 'files': files, 'dirs': node['dirs']}
+
+        tree[dir_path] = node
+        pending.extend(os.path.join(dir_path, name) for name in node['dirs'])
+    return tree
+
+
+def _tree_files(tree):
+    """展开快照为 {文件路径: [大小, 修改时间]}"""
+    return {os.path.join(dir_path, name): stat
+            for dir_path, node in tree.items()
+            for name, stat in node['files'].items()}
+
+
+def diff_snapshots(old_tree, new_tree):
+    """比较两次快照
+
+    Returns:
+        tuple: (新增路径集合, 删除路径集合, 大小或修改时间变化的路径集合)
+    """
+    old_files, new_files = _tree_files(old_tree), _tree_files(new_tree)
+    added = new_files.keys() - old_files.keys()
+    removed = old_files.keys() - new_files.keys()
+    modified = {path for path in new_files.keys() & old_files.keys()
+                if new_files[path] != old_files[path]}
+    return added, removed, modified
+
+
+class ImageCatalog:
+    """
+    主题图片目录索引
+
+    以月-日（MM-DD）为键合并应用数据目录和用户登记的多个图片文件夹
+    （含子目录）中的图片，一天可以有任意多张，图片直接从原位置读取。
+    每个来源保存一份按目录的 mtime/大小快照（image_catalog.json），
+    刷新时只重新列出 mtime 变化的目录，并按快照差异增删索引。
+    查询只做字典查找，刷新由后台扫描线程或同步完成后触发。
+    """
+
+    VERSION = 2
+
+    def __init__(self, images_dir, catalog_path, default_image, folders=()):
+        """
+        初始化索引
+
+        Args:
+            images_dir: 应用数据目录中的图片目录（第一个来源）
+            catalog_path: 索引文件路径（不应位于任何来源目录内）
+            default_image: 每天都显示的默认图片文件名（位于 images_dir）
+            folders: 用户登记的图片文件夹列表
+        """
+        self.images_dir = images_dir
+        self.catalog_path = catalog_path
+        self.default_image = default_image
+
+        self._lock = threading.Lock()
+        # 同一时间只允许一次刷新
+        self._scan_lock = threading.Lock()
+        self._sources = self._make_sources(folders)
+        # 来源根目录 -> 快照，None 表示尚未加载
+        self._trees = None
+        # 月-日 -> [(来源序号, 排序键, 文件路径)]
+        self._by_day = {}
+
+    def _read(self):
+        """读取索引文件，不存在或已损坏时返回空快照"""
+        try:
+            with open(self.catalog_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        if data.get('version') != self.VERSION:
+            return {}
+        return data['sources']
+
+    def _save(self):
+        """写入索引文件（需持有锁）"""
+        tmp_path = f"{self.catalog_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': self.VERSION, 'sources': self._trees}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.catalog_path)
+
+    def _rebuild(self):
+        """按所有来源的快照重建日期索引（需持有锁）"""
+        self._by_day = {}
+        for root in self._sources:
+            for path in _tree_files(self._trees.get(root, {})):
+                self._add(root, path)
+
+    def _add(self, root, path):
+        """把图片加入日期索引（需持有锁）"""
+        name = os.path.basename(path)
+        day = day_of(name)
+        if day:
+            items = self._by_day.setdefault(day, [])
+            items.append((self._sources.index(root), sort_key(name), path))
+            items.sort()
+
+    def _remove(self, path):
+        """把图片从日期索引中移除（需持有锁）"""
+        day = day_of(os.path.basename(path))
+        if day:
+            items = [item for item in self._by_day.get(day, []) if item[2] != path]
+            if items:
+                self._by_day[day] = items
+            else:
+                self._by_day.pop(day, None)
+
+    def _ensure_loaded(self):
+        """首次使用时读取索引文件，没有任何快照时同步扫描一次
+
+        后台扫描正在进行时不等待，直接使用当前（可能为空的）索引，避免阻塞界面线程。
+        """
+        with self._lock:
+            if self._trees is None:
+                self._trees = self._read()
+                self._rebuild()
+            loaded = any(root in self._trees for root in self._sources)
+        if not loaded:
+            self.refresh(blocking=False)
+
+    def _make_sources(self, folders):
+        """生成来源列表：应用数据目录在前，登记的文件夹去重后按顺序排列"""
+        sources = [self.images_dir]
+        for folder in folders:
+            folder = os.path.normpath(os.path.abspath(folder))
+            if folder not in sources:
+                sources.append(folder)
+        return sources
+
+    def set_sources(self, folders):
+        """设置用户登记的图片文件夹（应用数据目录始终是第一个来源）
+
+        移除的来源立即从索引中去掉，新增的来源在下一次 refresh 时扫描。
+
+        Args:
+            folders: 图片文件夹路径列表
+        """
+        sources = self._make_sources(folders)
+        self._ensure_loaded()
+        with self._lock:
+            self._sources = sources
+            self._trees = {root: tree for root, tree in self._trees.items() if root in sources}
+            self._rebuild()
+            self._save()
+
+    def refresh(self, blocking=True):
+        """重新扫描所有来源，按快照差异更新索引
+
+        扫描在锁外进行，扫描期间查询不受影响。
+
+        Args:
+            blocking: 已有扫描在进行时是否等待它完成后再扫描；为False时直接返回0
+
+        Returns:
+            int: 新增、删除和修改的图片总数
+        """
+        if not self._scan_lock.acquire(blocking):
+            return 0
+        try:
+            with self._lock:
+                sources = list(self._sources)
+                old_trees = dict(self._trees or {})
+
+            new_trees = {root: _scan_tree(root, old_trees.get(root, {})) for root in sources}
+
+            changes = 0
+            # 目录 mtime 变化但图片未变时也要保存快照，下次不必再列出该目录
+            dirty = False
+            with self._lock:
+                if self._trees is None:
+                    self._trees = {}
+                for root, tree in new_trees.items():
+                    if root not in self._sources:
+                        continue
+                    added, removed, modified = diff_snapshots(self._trees.get(root, {}), tree)
+                    for path in removed:
+                        self._remove(path)
+                    for path in added:
+                        self._add(root, path)
+                    changes += len(added) + len(removed) + len(modified)
+                    if tree != self._trees.get(root):
+                        self._trees[root] = tree
+                        dirty = True
+                if dirty:
+                    self._save()
+            return changes
+        finally:
+            self._scan_lock.release()
+
+    def images_for(self, month_day):
+        """获取某一天的所有图片路径，默认图片排在最后
+
+        Args:
+            month_day: 月-日字符串（MM-DD）
+
+        Returns:
+            list: 图片文件路径列表
+        """
+        self._ensure_loaded()
+        with self._lock:
+            paths = [item[2] for item in self._by_day.get(month_day, [])]
+            primary = self._trees.get(self.images_dir, {}).get(self.images_dir)
+            if primary and self.default_image in primary['files']:
+                paths.append(os.path.join(self.images_dir, self.default_image))
+        return paths
+
+    def all_images(self, source=None):
+        """获取所有来源（或指定来源）中的所有图片路径
+
+        Args:
+            source: 来源根目录，默认为所有来源
+        """
+        self._ensure_loaded()
+        with self._lock:
+            roots = [source] if source else self._sources
+            return sorted(path for root in roots
+                          for path in _tree_files(self._trees.get(root, {})))
@@ -0,0 +1,251 @@
+"""主题图片库整理工具
+
+查找并清理图片目录中的重复图片，可选把过大的图片重新编码到最大显示分辨率：
+- 完全相同（内容哈希一致）且属于同一天的图片只保留一张
+- 近似重复（感知哈希相近，如同一张图的不同分辨率、格式）且属于同一天的图片只保留分辨率最高的一张
+- 属于不同日期的重复图片各自承担当天的显示，只报告不删除
+
+默认只预览，加 --apply 才会修改文件。整理默认的 daily_images 后会立即同步到应用数据目录，
+其中已删除或重新编码的图片的副本随之删除或更新。
+
+用法：
+    python image_compact.py [图片目录 ...] [--apply] [--max-size 1920x1080] [--threshold 6]
+"""
+import io
+import os
+import argparse
+from PIL import Image
+from image_catalog import IMAGE_EXTENSIONS, day_of, sort_key
+from image_manager import ImageManager, decode_scaled, file_hash
+
+# 感知哈希的边长（8x8 共64位）
+HASH_SIZE = 8
+
+
+def perceptual_hash(image_path):
+    """计算图片的差值哈希（dHash）
+
+    缩小为 9x8 的灰度图后比较每行相邻像素的明暗，对缩放、重新编码和轻微调色不敏感。
+
+    Returns:
+        int: 64位哈希值
+    """
+    with Image.open(image_path) as img:
+        img.draft('L', (HASH_SIZE * 8, HASH_SIZE * 8))
+        pixels = img.convert('L').resize((HASH_SIZE + 1, HASH_SIZE),
+                                         Image.Resampling.LANCZOS).tobytes()
+    value = 0
+    for row in range(HASH_SIZE):
+        for col in range(HASH_SIZE):
+            left = pixels[row * (HASH_SIZE + 1) + col]
+            right = pixels[row * (HASH_SIZE + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def hamming(a, b):
+    """两个哈希值不同的位数"""
+    return bin(a ^ b).count('1')
+
+
+def _group_key(path):
+    """图片所属的显示分组：按日期命名的图片为月-日，其他图片各自一组"""
+    return day_of(os.path.basename(path)) or path
+
+
+def _describe(path):
+    """读取图片的像素数和文件大小"""
+    with Image.open(path) as img:
+        width, height = img.size
+    return {'path': path, 'pixels': width * height, 'size': os.path.getsize(path)}
+
+
+def find_duplicates(image_paths, threshold=6):
+    """查找重复图片
+
+    Args:
+        image_paths: 图片路径列表
+        threshold: 感知哈希最多相差的位数，超过则不算近似重复
+
+    Returns:
+        dict: {
+            'exact': [(保留路径, 重复路径)]，同一天内内容完全相同,
+            'near': [(保留路径, 重复路径)]，同一天内近似重复,
+            'cross_day': [(路径, 路径)]，不同日期之间的完全或近似重复
+        }
+    """
+    exact, near, cross_day = [], [], []
+
+    # 完全相同：按内容哈希分组，同一天的保留文件名排序最靠前的一张
+    by_hash = {}
+    for path in image_paths:
+        by_hash.setdefault(file_hash(path), []).append(path)
+    unique = []
+    for paths in by_hash.values():
+        paths.sort(key=lambda path: sort_key(os.path.basename(path)))
+        kept = {}
+        for path in paths:
+            group = _group_key(path)
+            if group in kept:
+                exact.append((kept[group], path))
+            else:
+                kept[group] = path
+                unique.append(path)
+        kept_paths = list(kept.values())
+        cross_day.extend((kept_paths[0], path) for path in kept_paths[1:])
+
+    # 近似重复：按分辨率从高到低，与已保留的图片比较感知哈希
+    infos = []
+    for path in unique:
+        try:
+            info = _describe(path)
+            info['phash'] = perceptual_hash(path)
+        except OSError as e:
+            print(f"无法读取图片 {path}：{str(e)}")
+            continue
+        infos.append(info)
+    infos.sort(key=lambda info: (-info['pixels'], info['size']))
+
+    reported = [set(pair) for pair in cross_day]
+    kept = []
+    for info in infos:
+        match = None
+        for other in kept:
+            if hamming(info['phash'], other['phash']) <= threshold:
+                if _group_key(info['path']) == _group_key(other['path']):
+                    match = other
+                    break
+                if {other['path'], info['path']} not in reported:
+                    cross_day.append((other['path'], info['path']))
+        if match:
+            near.append((match['path'], info['path']))
+        else:
+            kept.append(info)
+
+    return {'exact': exact, 'near': near, 'cross_day': cross_day}
+
+
+def reencode(image_path, max_size, apply=False):
+    """把超过最大显示分辨率的图片缩小后按原格式重新编码
+
+    新文件比原文件小时才替换。原图的 EXIF 和 ICC 色彩配置一并写入新文件。
+
+    Args:
+        image_path: 图片路径
+        max_size: 最大尺寸元组 (width, height)
+        apply: 是否真正替换文件
+
+    Returns:
+        int: 节省的字节数，无需处理时为0
+    """
+    with Image.open(image_path) as img:
+        if img.width <= max_size[0] and img.height <= max_size[1]:
+            return 0
+        image_format = img.format
+        metadata = {key: img.info[key] for key in ('exif', 'icc_profile') if img.info.get(key)}
+
+    # 先在内存中编码以计算节省的字节数，预览时不在图片目录中写任何文件
+    img = decode_scaled(image_path, max_size)
+    buffer = io.BytesIO()
+    if image_format == 'JPEG':
+        img.convert('RGB').save(buffer, 'JPEG', quality=90, optimize=True, **metadata)
+    else:
+        img.save(buffer, image_format, optimize=True, **metadata)
+
+    saved = os.path.getsize(image_path) - buffer.tell()
+    if saved > 0 and apply:
+        tmp_path = image_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(buffer.getvalue())
+        os.replace(tmp_path, image_path)
+    return max(saved, 0)
+
+
+def compact_images(image_dirs, apply=False, max_size=None, threshold=6):
+    """整理图片目录
+
+    Args:
+        image_dirs: 图片目录列表（不含子目录）
+        apply: 是否真正删除和替换文件，否则只预览
+        max_size: 重新编码的最大尺寸元组 (width, height)，None 表示不重新编码
+        threshold: 近似重复的感知哈希阈值
+
+    Returns:
+        dict: 重复图片列表（见 find_duplicates）、'reencoded' 重新编码的图片、
+              'skipped' 无法重新编码而跳过的图片及原因、'reclaimed' 回收的字节数
+    """
+    image_paths = [os.path.join(image_dir, name)
+                   for image_dir in image_dirs
+                   for name in sorted(os.listdir(image_dir))
+                   if name.lower().endswith(IMAGE_EXTENSIONS)]
+    report = find_duplicates(image_paths, threshold)
+
+    reclaimed = 0
+    removed = set()
+    for _, path in report['exact'] + report['near']:
+        reclaimed += os.path.getsize(path)
+        removed.add(path)
+        if apply:
+            os.remove(path)
+
+    report['reencoded'] = []
+    report['skipped'] = []
+    if max_size:
+        for path in image_paths:
+            if path in removed:
+                continue
+            try:
+                saved = reencode(path, max_size, apply)
+            except (OSError, ValueError) as e:
+                report['skipped'].append((path, str(e)))
+                continue
+            if saved:
+                report['reencoded'].append((path, saved))
+                reclaimed += saved
+
+    report['reclaimed'] = reclaimed
+    return report
+
+
+def _format_bytes(size):
+    """格式化字节数"""
+    return f"{size / 1024:.1f} KB" if size < 1 << 20 else f"{size / (1 << 20):.2f} MB"
+
+
+def main():
+    """主函数"""
+    default_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'daily_images')
+
+    parser = argparse.ArgumentParser(description='查找并清理重复或过大的主题图片')
+    parser.add_argument('dirs', nargs='*', default=[default_dir], help='图片目录，默认为 daily_images')
+    parser.add_argument('--apply', action='store_true', help='删除重复图片并替换重新编码的图片')
+    parser.add_argument('--max-size', help='重新编码的最大分辨率，如 1920x1080')
+    parser.add_argument('--threshold', type=int, default=6, help='近似重复的感知哈希阈值（0-64）')
+    args = parser.parse_args()
+
+    max_size = tuple(int(value) for value in args.max_size.split('x')) if args.max_size else None
+    report = compact_images(args.dirs, args.apply, max_size, args.threshold)
+
+    for title, key in (('完全相同', 'exact'), ('近似重复', 'near')):
+        for kept, path in report[key]:
+            print(f"[{title}] 删除 {path}（保留 {kept}）")
+    for path, saved in report['reencoded']:
+        print(f"[重新编码] {path}，节省 {_format_bytes(saved)}")
+    for path, error in report['skipped']:
+        print(f"[跳过] {path} 无法重新编码：{error}")
+    for a, b in report['cross_day']:
+        print(f"[不同日期] {a} 与 {b} 重复，未处理")
+
+    action = '已回收' if args.apply else '可回收'
+    print(f"\n{action} {_format_bytes(report['reclaimed'])}")
+    if not args.apply:
+        print("加 --apply 执行整理")
+
+    # 默认目录整理后同步到应用数据目录，删除或更新已过期的副本
+    if args.apply and args.dirs == [default_dir] and os.getenv('APPDATA'):
+        changed = ImageManager().sync_images_from(default_dir)
+        print(f"已同步应用数据目录（{changed} 个文件）")
+
+
+if __name__ == '__main__':
+    main()
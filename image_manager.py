@@ -1,10 +1,391 @@
 import os
+import json
 import shutil
-from datetime import datetime
+import hashlib
+import gc
+import sys
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from PIL import Image, ImageTk
+from image_catalog import ImageCatalog, IMAGE_EXTENSIONS, read_source_folders
+from tracing import span, traced
 import tkinter as tk
 from tkinter import messagebox
 
+def image_nbytes(img):
+    """估算解码后图片占用的内存字节数"""
+    return img.width * img.height * len(img.getbands())
+
+class ImageCache:
+    """解码图片缓存
+    
+    按最近最少使用（LRU）淘汰，以解码后的字节数计算占用，
+    总占用超过内存预算时淘汰最久未使用的条目（至少保留一条）。
+    每个条目同时缓存 PIL 图片和转换后的 Tk PhotoImage。
+    
+    PhotoImage 只能在 Tk 线程中销毁，后台线程淘汰的条目中的 PhotoImage
+    先放入待释放列表，由 Tk 线程调用 release_photos 统一释放。
+    """
+    
+    def __init__(self, budget_bytes):
+        """初始化缓存
+        
+        Args:
+            budget_bytes: 内存预算（字节）
+        """
+        self.budget_bytes = budget_bytes
+        self._lock = threading.RLock()
+        # 缓存键 -> [PIL图片, PhotoImage或None, 占用字节数, 最近使用时间]
+        self._entries = OrderedDict()
+        self._bytes = 0
+        # 已淘汰、等待在 Tk 线程中释放的 PhotoImage
+        self._released_photos = []
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, key):
+        """查找条目并标记为最近使用
+        
+        Returns:
+            list: [PIL图片, PhotoImage或None, 占用字节数, 最近使用时间]，未命中返回None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            entry[3] = time.monotonic()
+            self.hits += 1
+            return entry
+    
+    def peek(self, key):
+        """判断条目是否已缓存，不影响淘汰顺序和命中统计"""
+        with self._lock:
+            return key in self._entries
+    
+    def put(self, key, img):
+        """加入解码后的图片"""
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old:
+                self._drop(old)
+            nbytes = image_nbytes(img)
+            self._entries[key] = [img, None, nbytes, time.monotonic()]
+            self._bytes += nbytes
+            self._evict()
+    
+    def set_photo(self, key, photo):
+        """为已缓存的图片加入 PhotoImage（Tk 内部另存一份像素，按同样大小计入）"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] is not None:
+                return
+            entry[1] = photo
+            extra = photo.width() * photo.height() * 4
+            entry[2] += extra
+            self._bytes += extra
+            self._evict()
+    
+    def _drop(self, entry):
+        """移除条目后扣除占用，PhotoImage 留待 Tk 线程释放（需持有锁）"""
+        self._bytes -= entry[2]
+        if entry[1] is not None:
+            self._released_photos.append(entry[1])
+    
+    def _evict(self):
+        """淘汰最久未使用的条目直到不超过预算（需持有锁）"""
+        while self._bytes > self.budget_bytes and len(self._entries) > 1:
+            _, entry = self._entries.popitem(last=False)
+            self._drop(entry)
+            self.evictions += 1
+    
+    def evict_idle(self, max_idle):
+        """淘汰超过 max_idle 秒未使用的条目
+        
+        Returns:
+            int: 淘汰的条目数
+        """
+        deadline = time.monotonic() - max_idle
+        with self._lock:
+            idle = [key for key, entry in self._entries.items() if entry[3] < deadline]
+            for key in idle:
+                self._drop(self._entries.pop(key))
+            self.evictions += len(idle)
+            return len(idle)
+    
+    def release_photos(self):
+        """释放已淘汰条目中的 PhotoImage（需在 Tk 线程调用）"""
+        with self._lock:
+            photos, self._released_photos = self._released_photos, []
+        photos.clear()
+    
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            for entry in self._entries.values():
+                self._drop(entry)
+            self._entries.clear()
+            self._bytes = 0
+    
+    def stats(self):
+        """获取缓存统计
+        
+        Returns:
+            dict: 命中、未命中、淘汰次数，条目数，占用字节数（含 PhotoImage 的字节数）、
+                  待释放的 PhotoImage 数和预算
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'photo_bytes': sum(entry[1].width() * entry[1].height() * 4
+                                   for entry in self._entries.values() if entry[1] is not None),
+                'pending_photos': len(self._released_photos),
+                'budget_bytes': self.budget_bytes
+            }
+
+def process_rss():
+    """获取当前进程的常驻内存（字节），不支持的平台返回None"""
+    if sys.platform == 'win32':
+        import ctypes
+        from ctypes import wintypes
+        
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                        ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                        ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+        
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(),
+                                                 ctypes.byref(counters), counters.cb)
+        return counters.WorkingSetSize
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
+
+def preview_size(size, scale=4):
+    """长图分块显示时低分辨率预览图的尺寸
+
+    Args:
+        size: 分块显示的尺寸 (width, height)
+        scale: 缩小倍数
+    """
+    return max(1, size[0] // scale), max(1, size[1] // scale)
+
+def decode_scaled(image_path, max_size):
+    """按目标尺寸以降低分辨率的方式解码图片，再用高质量算法缩放到不超过 max_size
+    
+    JPEG 通过 draft 让解码器直接做 DCT 缩放（1/2、1/4、1/8），解码出的尺寸仍不小于目标尺寸；
+    其他格式无法降低解码分辨率，先用 reduce 按整数倍快速缩小，
+    最后一次 LANCZOS 重采样到按原图宽高比计算的显示尺寸。调色板（P）图片先转换为
+    RGB/RGBA，否则 Pillow 只能做最近邻缩放。
+    
+    Args:
+        image_path: 图片文件路径
+        max_size: 最大尺寸元组 (width, height)
+        
+    Returns:
+        PIL.Image对象
+    """
+    img = Image.open(image_path)
+    # 保持宽高比时最终的显示尺寸
+    ratio = min(max_size[0] / img.width, max_size[1] / img.height, 1)
+    target = (max(1, round(img.width * ratio)), max(1, round(img.height * ratio)))
+    
+    if img.format == 'JPEG':
+        img.draft(img.mode, target)
+    img.load()
+    # 调色板图片的 resize 只能用最近邻，先转换为真彩色再重采样
+    if img.mode == 'P':
+        img = img.convert('RGBA' if 'transparency' in img.info else 'RGB')
+    
+    # 整数倍缩小是简单的盒式滤波，保留至少两倍显示尺寸留给最后的 LANCZOS 重采样
+    factor = min(img.width // target[0], img.height // target[1]) // 2
+    if factor > 1 and img.mode in ('L', 'LA', 'RGB', 'RGBA'):
+        img = img.reduce(factor)
+    if img.size != target:
+        img = img.resize(target, Image.Resampling.LANCZOS)
+    return img
+
+def file_hash(path):
+    """计算文件内容哈希"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class DisplayCache:
+    """显示尺寸图片的磁盘缓存
+    
+    保存已经缩放到显示尺寸的图片，文件名由源文件哈希和目标尺寸组成。
+    不带透明通道的图片存为质量90的 JPEG，带透明通道的存为低压缩级别的 PNG，
+    体积小且解码远快于原图。源文件内容变化后哈希变化，显示分辨率变化后尺寸变化，
+    旧文件都不会再被命中，由 prune 清理。
+    """
+    
+    # 缓存文件的扩展名
+    EXTENSIONS = ('.jpg', '.png')
+    # prune 时一并清理的旧格式
+    LEGACY_EXTENSIONS = ('.ppm',)
+    # 临时文件超过该时间（秒）仍未被重命名，视为写入中断的残留
+    TMP_MAX_AGE = 3600
+    
+    def __init__(self, cache_dir):
+        """初始化缓存
+        
+        Args:
+            cache_dir: 缓存目录
+        """
+        self.cache_dir = cache_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+        
+        # 源文件哈希备忘：路径 -> [大小, 修改时间, 哈希]，避免每次都读取整个源文件
+        self.hashes_path = os.path.join(self.cache_dir, 'hashes.json')
+        self._lock = threading.Lock()
+        try:
+            with open(self.hashes_path, 'r', encoding='utf-8') as f:
+                self._hashes = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._hashes = {}
+    
+    def _save_hashes(self):
+        """写入哈希备忘（需持有锁）"""
+        tmp_path = f"{self.hashes_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._hashes, f, ensure_ascii=False)
+        os.replace(tmp_path, self.hashes_path)
+    
+    def source_hash(self, image_path):
+        """获取源文件哈希，大小和修改时间未变时直接使用备忘"""
+        st = os.stat(image_path)
+        with self._lock:
+            record = self._hashes.get(image_path)
+            if record and record[0] == st.st_size and record[1] == st.st_mtime_ns:
+                return record[2]
+        digest = file_hash(image_path)
+        with self._lock:
+            self._hashes[image_path] = [st.st_size, st.st_mtime_ns, digest]
+            self._save_hashes()
+        return digest
+    
+    @staticmethod
+    def _size_tag(max_size):
+        """目标尺寸在文件名中的表示"""
+        return f"{max_size[0]}x{max_size[1]}"
+    
+    def _find(self, digest, max_size):
+        """查找已缓存的文件路径，不存在返回None"""
+        stem = os.path.join(self.cache_dir, f"{digest}_{self._size_tag(max_size)}")
+        for ext in self.EXTENSIONS:
+            if os.path.exists(stem + ext):
+                return stem + ext
+        return None
+    
+    def contains(self, image_path, max_size):
+        """是否已缓存指定尺寸的图片（不读取图片内容）"""
+        return self._find(self.source_hash(image_path), max_size) is not None
+    
+    def load(self, image_path, max_size):
+        """读取缓存的显示尺寸图片
+        
+        Returns:
+            PIL.Image对象，未缓存时返回None
+        """
+        path = self._find(self.source_hash(image_path), max_size)
+        if path is None:
+            return None
+        try:
+            img = Image.open(path)
+            img.load()
+            return img
+        except OSError:
+            return None
+    
+    def store(self, image_path, max_size, img):
+        """保存缩放后的图片
+        
+        Args:
+            image_path: 源图片路径
+            max_size: 目标尺寸
+            img: 已缩放的 PIL.Image对象
+        """
+        if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+            img, ext, params = img.convert('RGBA'), '.png', {'format': 'PNG', 'compress_level': 1}
+        else:
+            img, ext, params = img.convert('RGB'), '.jpg', {'format': 'JPEG', 'quality': 90}
+        
+        stem = f"{self.source_hash(image_path)}_{self._size_tag(max_size)}"
+        path = os.path.join(self.cache_dir, stem + ext)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        img.save(tmp_path, **params)
+        os.replace(tmp_path, path)
+    
+    def prune(self, image_paths, max_size, extra_sizes=None):
+        """删除不再需要的缓存文件
+        
+        只保留哈希备忘中仍存在的源图片、且尺寸仍在使用的缓存，不为此重新计算哈希：
+        每张图片保留当前显示尺寸，以及 extra_sizes 返回的尺寸（长图的分块尺寸和预览尺寸），
+        其他分辨率的一律删除。写入中途中断留下的临时文件超过 TMP_MAX_AGE 秒后删除。
+        
+        Args:
+            image_paths: 当前所有源图片路径
+            max_size: 当前显示尺寸
+            extra_sizes: 可选，extra_sizes(源图片路径) 返回该图片额外使用的尺寸列表，
+                只对存在非显示尺寸缓存的图片调用
+        """
+        image_paths = set(image_paths)
+        with self._lock:
+            keep = {record[2]: path for path, record in self._hashes.items() if path in image_paths}
+        display_tag = self._size_tag(max_size)
+        # 各源图片额外使用的尺寸，按需计算
+        allowed = {}
+        now = time.time()
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                stem, ext = os.path.splitext(entry.name)
+                if ext == '.tmp':
+                    if now - entry.stat().st_mtime > self.TMP_MAX_AGE:
+                        os.remove(entry.path)
+                    continue
+                if ext in self.LEGACY_EXTENSIONS:
+                    os.remove(entry.path)
+                    continue
+                if ext not in self.EXTENSIONS:
+                    continue
+                digest, _, size_tag = stem.rpartition('_')
+                if digest not in keep:
+                    os.remove(entry.path)
+                    continue
+                if size_tag == display_tag:
+                    continue
+                if digest not in allowed:
+                    try:
+                        sizes = extra_sizes(keep[digest]) if extra_sizes else ()
+                    except OSError:
+                        sizes = ()
+                    allowed[digest] = {self._size_tag(size) for size in sizes}
+                if size_tag not in allowed[digest]:
+                    os.remove(entry.path)
+        with self._lock:
+            self._hashes = {path: record for path, record in self._hashes.items()
+                            if path in image_paths}
+            self._save_hashes()
+
 class ImageManager:
     """图片资源管理类
     
@@ -12,14 +393,22 @@ class ImageManager:
     1. 统一存储在用户数据目录
     2. 图片缓存机制
     3. 提供统一的访问接口
+    4. 增量同步源目录中的图片
     """
     
-    def __init__(self):
+    # 后台预先生成显示缓存的天数（从昨天起）
+    DISPLAY_CACHE_DAYS = 4
+    
+    def __init__(self, cache_budget=64 * 1024 * 1024, idle_timeout=300):
         """初始化图片管理器
         
         - 创建应用数据目录
         - 初始化图片缓存
         - 设置默认图片配置
+        
+        Args:
+            cache_budget: 解码图片缓存的内存预算（字节）
+            idle_timeout: 缓存条目超过该时间（秒）未使用即被淘汰
         """
         # 应用数据目录
         self.app_data_dir = os.path.join(os.getenv('APPDATA'), '每日主题')
@@ -28,33 +417,129 @@ class ImageManager:
         # 创建必要的目录
         os.makedirs(self.images_dir, exist_ok=True)
         
-        # 图片缓存
-        self._image_cache = {}
+        # 图片缓存，键为 (路径, 修改时间, 目标尺寸)
+        self._image_cache = ImageCache(cache_budget)
+        self.idle_timeout = idle_timeout
+        # 启动时的常驻内存，作为内存报告的基线
+        self._baseline_rss = process_rss()
         
         # 默认图片名称
         self.default_image = '每日主题.png'
+        
+        # 用户登记的图片文件夹，图片直接从原位置读取
+        self.sources_path = os.path.join(self.app_data_dir, 'image_sources.json')
+        
+        # 图片目录索引：合并所有来源，按月-日查找当天的图片
+        self.catalog = ImageCatalog(self.images_dir,
+                                    os.path.join(self.app_data_dir, 'image_catalog.json'),
+                                    self.default_image,
+                                    self.get_source_folders())
+        self._scanner_stop = threading.Event()
+        self._scanner_thread = None
+        
+        # 同步清单：记录已同步源文件的 (大小, 修改时间, 哈希)
+        self.manifest_path = os.path.join(self.app_data_dir, 'sync_manifest.json')
+        self._sync_lock = threading.Lock()
+        self._synced_dir_mtime = {}
+        self._sync_thread = None
+        # 同步进行中时登记的完成回调，保护它们的锁
+        self._syncing = False
+        self._sync_callbacks = []
+        self._sync_callbacks_lock = threading.Lock()
+        
+        # 显示尺寸图片的磁盘缓存：可随时重建，放在本地（不漫游）的应用数据目录
+        self.local_data_dir = os.path.join(os.getenv('LOCALAPPDATA') or os.getenv('APPDATA'), '每日主题')
+        self.display_cache = DisplayCache(os.path.join(self.local_data_dir, 'display_cache'))
+        # 旧版本放在漫游目录中的缓存，生成新缓存时删除
+        self._legacy_cache_dir = os.path.join(self.app_data_dir, 'display_cache')
+        if self._legacy_cache_dir == self.display_cache.cache_dir:
+            self._legacy_cache_dir = None
+        
+        # 预取线程：在后台把即将显示的图片解码进缓存
+        self._prefetch_executor = ThreadPoolExecutor(max_workers=1,
+                                                     thread_name_prefix='image-prefetch')
+        self._prefetching = set()
+        # 只保护 _prefetching，不能用同步期间一直持有的 _sync_lock，否则界面线程会被复制阻塞
+        self._prefetch_lock = threading.Lock()
     
-    def _get_today_image_names(self):
-        """获取今日图片的可能文件名列表"""
-        today = datetime.now().strftime('%m-%d')
+    def _get_today_image_names(self, date=None):
+        """获取今日（或指定日期）图片的可能文件名列表"""
+        today = (date or datetime.now()).strftime('%m-%d')
         return [
             f"{today}.png",
             f"{today}.jpg",
             self.default_image
         ]
         
-    def get_today_images(self):
+    def get_source_folders(self):
+        """获取用户登记的图片文件夹列表"""
+        return read_source_folders(self.sources_path)
+    
+    def _set_source_folders(self, folders):
+        """保存登记的图片文件夹，并在后台扫描新的来源"""
+        tmp_path = self.sources_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'folders': folders}, f, ensure_ascii=False, indent=4)
+        os.replace(tmp_path, self.sources_path)
+        self.catalog.set_sources(folders)
+        threading.Thread(target=self.catalog.refresh, daemon=True).start()
+    
+    def add_source_folder(self, folder):
+        """登记一个图片文件夹作为主题来源
+        
+        Args:
+            folder: 图片文件夹路径
+        """
+        folder = os.path.normpath(os.path.abspath(folder))
+        if not os.path.isdir(folder):
+            raise FileNotFoundError(f"文件夹不存在：{folder}")
+        folders = self.get_source_folders()
+        if folder not in folders:
+            self._set_source_folders(folders + [folder])
+    
+    def remove_source_folder(self, folder):
+        """取消登记一个图片文件夹
+        
+        Args:
+            folder: 图片文件夹路径
+        """
+        folders = self.get_source_folders()
+        if folder in folders:
+            folders.remove(folder)
+            self._set_source_folders(folders)
+    
+    def start_scanner(self, interval=30):
+        """启动后台扫描线程，定期按快照差异刷新图片索引
+        
+        Args:
+            interval: 扫描间隔（秒）
+        """
+        if self._scanner_thread and self._scanner_thread.is_alive():
+            return
+        
+        def _run():
+            while True:
+                try:
+                    self.catalog.refresh()
+                except Exception as e:
+                    print(f"扫描图片文件夹失败：{str(e)}")
+                if self._scanner_stop.wait(interval):
+                    break
+        
+        self._scanner_stop.clear()
+        self._scanner_thread = threading.Thread(target=_run, daemon=True)
+        self._scanner_thread.start()
+    
+    def get_today_images(self, date=None):
         """获取今日所有可用的图片路径列表
         
+        Args:
+            date: 指定日期（datetime），默认为今天
+            
         Returns:
             list: 图片文件路径列表
         """
-        image_paths = []
-        for name in self._get_today_image_names():
-            path = os.path.join(self.images_dir, name)
-            if os.path.exists(path):
-                image_paths.append(path)
-        return image_paths
+        return self.catalog.images_for((date or datetime.now()).strftime('%m-%d'))
     
     def _clear_cache(self):
         """清理图片缓存"""
@@ -71,11 +556,166 @@ class ImageManager:
             
         # 复制所有图片文件
         for filename in os.listdir(src_dir):
-            if filename.lower().endswith(('.png', '.jpg', '.jpeg')):
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
                 src_path = os.path.join(src_dir, filename)
                 dst_path = os.path.join(self.images_dir, filename)
                 shutil.copy2(src_path, dst_path)
     
+    def _load_manifest(self):
+        """读取同步清单，不存在或已损坏时返回空清单"""
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+    
+    def _save_manifest(self, manifest):
+        """原子地写入同步清单"""
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=4)
+        os.replace(tmp_path, self.manifest_path)
+    
+    @traced()
+    def sync_images_from(self, src_dir):
+        """增量同步源目录中的图片到应用数据目录
+        
+        根据清单中记录的 (大小, 修改时间, 哈希) 判断，只复制新增或内容变化的图片；
+        大小和修改时间都未变化时不读取文件内容。复制先写临时文件再重命名，
+        读取图片时不会看到写了一半的文件。源目录中已删除的图片，
+        若应用数据目录中的副本未被改动过，也一并删除。
+        
+        Args:
+            src_dir: 源图片目录路径
+            
+        Returns:
+            int: 本次复制和删除的图片数量
+        """
+        if not os.path.exists(src_dir):
+            raise FileNotFoundError(f"源目录不存在：{src_dir}")
+        
+        with self._sync_lock:
+            dir_mtime = os.stat(src_dir).st_mtime_ns
+            manifest = self._load_manifest()
+            entries = manifest.get(src_dir, {})
+            copied = 0
+            changed = False
+            seen = set()
+            
+            with os.scandir(src_dir) as it:
+                for entry in it:
+                    if not entry.is_file() or not entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                        continue
+                    seen.add(entry.name)
+                    st = entry.stat()
+                    dst_path = os.path.join(self.images_dir, entry.name)
+                    record = entries.get(entry.name)
+                    dst_exists = os.path.exists(dst_path)
+                    
+                    if record and dst_exists and record['size'] == st.st_size \
+                            and record['mtime'] == st.st_mtime_ns:
+                        continue
+                    
+                    digest = file_hash(entry.path)
+                    if not (record and dst_exists and record['hash'] == digest):
+                        tmp_path = dst_path + '.tmp'
+                        shutil.copy2(entry.path, tmp_path)
+                        os.replace(tmp_path, dst_path)
+                        copied += 1
+                    
+                    entries[entry.name] = {
+                        'size': st.st_size,
+                        'mtime': st.st_mtime_ns,
+                        'hash': digest
+                    }
+                    changed = True
+            
+            for name in set(entries) - seen:
+                dst_path = os.path.join(self.images_dir, name)
+                try:
+                    if file_hash(dst_path) == entries[name]['hash']:
+                        os.remove(dst_path)
+                        copied += 1
+                except FileNotFoundError:
+                    pass
+                del entries[name]
+                changed = True
+            
+            if changed:
+                manifest[src_dir] = entries
+                self._save_manifest(manifest)
+            self._synced_dir_mtime[src_dir] = dir_mtime
+        
+        if copied:
+            self._clear_cache()
+            self.catalog.refresh()
+        return copied
+    
+    def sync_async(self, src_dir, force=False):
+        """在后台线程中增量同步图片
+        
+        未指定 force 时，只有源目录的 mtime 与上次同步时不同（有文件增删）才会同步，
+        可以在打开主题窗口等频繁调用的地方作为变化检测使用。
+        
+        Args:
+            src_dir: 源图片目录路径
+            force: 是否忽略目录 mtime 强制同步
+        """
+        if not force:
+            try:
+                if os.stat(src_dir).st_mtime_ns == self._synced_dir_mtime.get(src_dir):
+                    return
+            except FileNotFoundError:
+                return
+        
+        def _run():
+            try:
+                self.sync_images_from(src_dir)
+            except Exception as e:
+                print(f"同步图片失败：{str(e)}")
+            finally:
+                with self._sync_callbacks_lock:
+                    self._syncing = False
+                    callbacks, self._sync_callbacks = self._sync_callbacks, []
+                for callback in callbacks:
+                    try:
+                        callback()
+                    except Exception as e:
+                        print(f"同步完成回调执行失败：{str(e)}")
+        
+        with self._sync_callbacks_lock:
+            self._syncing = True
+        self._sync_thread = threading.Thread(target=_run, daemon=True)
+        self._sync_thread.start()
+    
+    def on_sync_done(self, callback):
+        """后台同步进行中时登记完成回调
+        
+        回调在同步线程中执行，需要操作界面时应投递到 Tk 线程。
+        
+        Args:
+            callback: 同步完成后调用的函数（无参数）
+            
+        Returns:
+            bool: 是否已登记；没有进行中的同步时返回False，回调不会被调用
+        """
+        with self._sync_callbacks_lock:
+            if not self._syncing:
+                return False
+            self._sync_callbacks.append(callback)
+            return True
+    
+    @traced()
+    def wait_for_sync(self, timeout=None):
+        """等待后台同步完成
+        
+        Args:
+            timeout: 最长等待时间（秒），None表示一直等待
+        """
+        thread = self._sync_thread
+        if thread:
+            thread.join(timeout)
+    
     def get_image_path(self, index=0):
         """获取当前应显示的图片路径
         
@@ -92,59 +732,348 @@ class ImageManager:
         index = index % len(images) if images else 0
         return images[index]
     
-    def load_image(self, max_size=None):
+    @staticmethod
+    def _cache_key(image_path, max_size):
+        """生成缓存键，源文件被替换后修改时间变化，旧条目自然失效"""
+        return (image_path, os.stat(image_path).st_mtime_ns, max_size)
+    
+    def _decode(self, image_path, max_size):
+        """解码图片并缩放到不超过 max_size
+        
+        指定 max_size 时优先读取磁盘上已缩放好的图片，没有则降低分辨率解码、
+        缩放后写入磁盘缓存。
+        """
+        if not max_size:
+            with span('ImageManager.decode_full'):
+                img = Image.open(image_path)
+                img.load()
+            return img
+        
+        with span('ImageManager.cache_load'):
+            img = self.display_cache.load(image_path, max_size)
+        if img is not None:
+            return img
+        
+        with span('ImageManager.decode'):
+            img = decode_scaled(image_path, max_size)
+        try:
+            with span('ImageManager.cache_store'):
+                self.display_cache.store(image_path, max_size, img)
+        except OSError as e:
+            print(f"写入图片缓存失败：{str(e)}")
+        return img
+    
+    def list_images(self, source=None):
+        """获取所有来源（或指定来源）中的所有图片路径"""
+        return self.catalog.all_images(source)
+    
+    @traced()
+    def prepare_display_cache(self, max_size, days=None):
+        """为今天前后几天的图片生成显示尺寸缓存，并清理源文件已变化或尺寸不同的旧缓存
+        
+        其他日期的图片在首次显示时才生成缓存。
+        
+        Args:
+            max_size: 当前屏幕对应的显示尺寸 (width, height)
+            days: 从昨天起生成缓存的天数，默认为 DISPLAY_CACHE_DAYS
+        """
+        if self._legacy_cache_dir and os.path.isdir(self._legacy_cache_dir):
+            shutil.rmtree(self._legacy_cache_dir, ignore_errors=True)
+        
+        today = datetime.now()
+        image_paths = []
+        for offset in range(-1, (days or self.DISPLAY_CACHE_DAYS) - 1):
+            for image_path in self.get_today_images(today + timedelta(days=offset)):
+                if image_path not in image_paths:
+                    image_paths.append(image_path)
+        for image_path in image_paths:
+            try:
+                self._warm_display_cache(image_path, max_size)
+            except OSError as e:
+                print(f"生成图片缓存失败：{str(e)}")
+        self.display_cache.prune(self.list_images(), max_size,
+                                 lambda image_path: self._tiled_cache_sizes(image_path, max_size))
+    
+    def _tiled_cache_sizes(self, image_path, max_size):
+        """长图除显示尺寸外使用的缓存尺寸：分块尺寸和预览尺寸，普通图片为空"""
+        tiled_size = self.get_tiled_size(image_path, max_size)
+        return (tiled_size, preview_size(tiled_size)) if tiled_size else ()
+    
+    def _warm_display_cache(self, image_path, max_size):
+        """为一张图片生成显示时会用到的缓存：普通图片为显示尺寸，长图为分块尺寸和预览尺寸"""
+        tiled_size = self.get_tiled_size(image_path, max_size)
+        if tiled_size is None:
+            if not self.display_cache.contains(image_path, max_size):
+                self._decode(image_path, max_size)
+        elif not self.display_cache.contains(image_path, preview_size(tiled_size)):
+            img = self.display_cache.load(image_path, tiled_size) or self._decode(image_path, tiled_size)
+            self._store_preview(image_path, tiled_size, img)
+    
+    def _store_preview(self, image_path, size, img):
+        """把分块尺寸的图片缩小为预览图写入磁盘缓存，不再解码一次原图"""
+        small = preview_size(size)
+        if self.display_cache.contains(image_path, small):
+            return
+        try:
+            self.display_cache.store(image_path, small, img.resize(small, Image.Resampling.BILINEAR))
+        except OSError as e:
+            print(f"写入图片缓存失败：{str(e)}")
+    
+    def _load_tiled(self, image_path, size):
+        """加载长图的分块尺寸图片，并确保预览尺寸也已写入磁盘缓存"""
+        img = self.load_image_at(image_path, size)
+        self._store_preview(image_path, size, img)
+        return img
+    
+    def prepare_display_cache_async(self, max_size):
+        """等待图片同步完成后，在后台线程中生成显示尺寸缓存"""
+        def _run():
+            self.wait_for_sync()
+            self.prepare_display_cache(max_size)
+        
+        threading.Thread(target=_run, daemon=True).start()
+    
+    @traced()
+    def load_image_at(self, image_path, max_size=None):
+        """通过缓存加载指定路径的图片
+        
+        Args:
+            image_path: 图片文件路径
+            max_size: 最大尺寸元组 (width, height)，默认为None
+            
+        Returns:
+            PIL.Image对象
+        """
+        key = self._cache_key(image_path, max_size)
+        entry = self._image_cache.get(key)
+        if entry is not None:
+            return entry[0]
+        img = self._decode(image_path, max_size)
+        self._image_cache.put(key, img)
+        return img
+    
+    @traced()
+    def get_photo_image(self, image_path, max_size=None):
+        """通过缓存获取指定路径图片的 Tk PhotoImage（需在 Tk 线程调用）
+        
+        Args:
+            image_path: 图片文件路径
+            max_size: 最大尺寸元组 (width, height)，默认为None
+            
+        Returns:
+            ImageTk.PhotoImage对象
+        """
+        key = self._cache_key(image_path, max_size)
+        entry = self._image_cache.get(key)
+        if entry is not None and entry[1] is not None:
+            return entry[1]
+        
+        if entry is not None:
+            img = entry[0]
+        else:
+            img = self._decode(image_path, max_size)
+            self._image_cache.put(key, img)
+        with span('ImageManager.photo_image'):
+            photo = ImageTk.PhotoImage(img)
+        self._image_cache.set_photo(key, photo)
+        return photo
+    
+    def _prefetch_one(self, image_path, max_size):
+        """在预取线程中解码一张图片"""
+        try:
+            self.load_image_at(image_path, max_size)
+        except Exception as e:
+            print(f"预取图片失败：{str(e)}")
+        finally:
+            with self._prefetch_lock:
+                self._prefetching.discard((image_path, max_size))
+    
+    def prefetch(self, image_paths, max_size):
+        """在后台线程中把图片解码进缓存，已缓存或正在预取的图片跳过
+        
+        Args:
+            image_paths: 图片路径列表
+            max_size: 最大尺寸元组 (width, height)
+        """
+        for image_path in image_paths:
+            try:
+                # 长图按分块显示的尺寸预取
+                size = self.get_tiled_size(image_path, max_size) or max_size
+                key = self._cache_key(image_path, size)
+            except OSError:
+                continue
+            if self._image_cache.peek(key):
+                continue
+            with self._prefetch_lock:
+                if (image_path, size) in self._prefetching:
+                    continue
+                self._prefetching.add((image_path, size))
+            self._prefetch_executor.submit(self._prefetch_one, image_path, size)
+    
+    def load_cached(self, image_path, max_size):
+        """只从内存或磁盘缓存中读取图片，不解码原图
+        
+        Returns:
+            PIL.Image对象，未缓存时返回None
+        """
+        key = self._cache_key(image_path, max_size)
+        entry = self._image_cache.get(key)
+        if entry is not None:
+            return entry[0]
+        img = self.display_cache.load(image_path, max_size)
+        if img is not None:
+            self._image_cache.put(key, img)
+        return img
+    
+    def load_cached_async(self, image_path, max_size):
+        """在预取线程中只从缓存读取图片（见 load_cached）
+        
+        Returns:
+            concurrent.futures.Future: 结果为 PIL.Image对象，未缓存时为None
+        """
+        return self._prefetch_executor.submit(self.load_cached, image_path, max_size)
+    
+    def load_tiled_async(self, image_path, size):
+        """在预取线程中加载长图的分块尺寸图片（见 _load_tiled）
+        
+        Returns:
+            concurrent.futures.Future: 结果为 PIL.Image对象
+        """
+        return self._prefetch_executor.submit(self._load_tiled, image_path, size)
+    
+    def get_tiled_size(self, image_path, max_size, tall_ratio=1.5):
+        """判断图片是否应分块显示
+        
+        图片按显示宽度缩放（不放大）后，高度超过显示高度的 tall_ratio 倍时，
+        整张缩小到显示高度会看不清，改为按宽度缩放、分块滚动显示。
+        
+        Args:
+            image_path: 图片路径
+            max_size: 最大显示尺寸 (width, height)
+            tall_ratio: 判定为长图的高度倍数
+            
+        Returns:
+            tuple: 分块显示的尺寸 (width, height)，不需要分块时返回None
+        """
+        with Image.open(image_path) as img:
+            width, height = img.size
+        scale = min(1, max_size[0] / width)
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        return size if size[1] > max_size[1] * tall_ratio else None
+    
+    def prefetch_adjacent(self, index, max_size):
+        """预取今日图片中与当前图片相邻的上一张和下一张
+        
+        Args:
+            index: 当前显示的图片索引
+            max_size: 最大尺寸元组 (width, height)
+        """
+        images = self.get_today_images()
+        if len(images) < 2:
+            return
+        self.prefetch([images[(index + 1) % len(images)],
+                       images[(index - 1) % len(images)]], max_size)
+    
+    def prefetch_next_day(self, max_size):
+        """预取明天的图片（在午夜前调用）
+        
+        只在预取线程中生成磁盘显示缓存，不放入内存缓存：午夜前放进内存的图片
+        在被打开前就会被 evict_idle 淘汰。午夜后打开主题窗口时从磁盘缓存读取，只需几毫秒。
+        
+        Args:
+            max_size: 最大尺寸元组 (width, height)
+        """
+        for image_path in self.get_today_images(datetime.now() + timedelta(days=1)):
+            self._prefetch_executor.submit(self._warm_one, image_path, max_size)
+    
+    def _warm_one(self, image_path, max_size):
+        """在预取线程中为一张图片生成显示缓存"""
+        try:
+            self._warm_display_cache(image_path, max_size)
+        except Exception as e:
+            print(f"预取图片失败：{str(e)}")
+    
+    def cache_stats(self):
+        """获取图片缓存的命中、未命中、淘汰次数和内存占用"""
+        return self._image_cache.stats()
+    
+    def evict_idle(self):
+        """淘汰超过 idle_timeout 未使用的缓存图片（需在 Tk 线程调用）
+        
+        Returns:
+            int: 淘汰的条目数
+        """
+        evicted = self._image_cache.evict_idle(self.idle_timeout)
+        self._image_cache.release_photos()
+        return evicted
+    
+    @traced()
+    def release_memory(self):
+        """释放所有已解码的图片和 PhotoImage（需在 Tk 线程调用）
+        
+        主题窗口关闭后调用；再次打开时从磁盘缓存读取，只需几毫秒。
+        """
+        self._image_cache.clear()
+        self._image_cache.release_photos()
+        gc.collect()
+    
+    def memory_report(self):
+        """获取图片相关的内存占用报告
+        
+        Returns:
+            dict: 缓存条目数、解码图片字节数、PhotoImage 字节数、待释放的 PhotoImage 数，
+                  以及进程当前常驻内存和启动时的基线（不支持的平台为None）
+        """
+        stats = self._image_cache.stats()
+        return {
+            'entries': stats['entries'],
+            'image_bytes': stats['bytes'] - stats['photo_bytes'],
+            'photo_bytes': stats['photo_bytes'],
+            'pending_photos': stats['pending_photos'],
+            'rss': process_rss(),
+            'baseline_rss': self._baseline_rss
+        }
+    
+    def load_image(self, max_size=None, index=0):
         """加载并处理图片
         
         Args:
             max_size: 最大尺寸元组 (width, height)，默认为None
+            index: 图片索引，用于切换不同图片
             
         Returns:
             tuple: (PIL.Image对象, 图片路径)
             如果加载失败返回 (None, None)
         """
-        image_path = self.get_image_path()
+        image_path = self.get_image_path(index)
         if not image_path:
             return None, None
             
-        # 检查缓存
-        cache_key = f"{image_path}_{max_size}"
-        if cache_key in self._image_cache:
-            return self._image_cache[cache_key], image_path
-            
         try:
-            # 加载图片
-            img = Image.open(image_path)
-            
-            # 调整大小
-            if max_size:
-                img.thumbnail(max_size, Image.Resampling.LANCZOS)
-                
-            # 缓存处理后的图片
-            self._image_cache[cache_key] = img
-            return img, image_path
-            
+            return self.load_image_at(image_path, max_size), image_path
         except Exception as e:
             print(f"加载图片失败：{str(e)}")
             return None, None
     
-    def create_photo_image(self, window, max_size=None):
+    def create_photo_image(self, window, max_size=None, index=0):
         """创建Tkinter图片对象
         
         Args:
             window: Tkinter窗口对象
             max_size: 最大尺寸元组 (width, height)
+            index: 图片索引，用于切换不同图片
             
         Returns:
             tuple: (PhotoImage对象, 错误消息)
             成功时错误消息为None
         """
-        img, path = self.load_image(max_size)
+        img, path = self.load_image(max_size, index)
         if not img:
             error_msg = f"无法加载图片，请确保以下文件之一存在：\n{', '.join(self._get_today_image_names())}"
             return None, error_msg
             
         try:
-            photo = ImageTk.PhotoImage(img)
+            photo = self.get_photo_image(path, max_size)
             return photo, None
         except Exception as e:
             return None, f"创建图片对象失败：{str(e)}"
@@ -152,7 +1081,10 @@ class ImageManager:
     def cleanup(self):
         """清理资源
         
+        - 停止后台扫描
+        - 取消尚未开始的预取
         - 清空图片缓存
-        - 可以添加其他清理操作
         """
+        self._scanner_stop.set()
+        self._prefetch_executor.shutdown(wait=False, cancel_futures=True)
         self._clear_cache()
\ No newline at end of file
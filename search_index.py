@@ -0,0 +1,281 @@
+import os
+import re
+import json
+import heapq
+import threading
+from atomic_io import read_jsonl, repair_tail
+
+# 连续的文字/数字片段，对中文同样适用
+_RUN_PATTERN = re.compile(r'\w+')
+
+
+def _runs(text):
+    """将文本规范化（小写）后切分为连续片段"""
+    return _RUN_PATTERN.findall(text.lower())
+
+
+def tokenize(text):
+    """按字符二元组切分文本
+
+    中文没有空格分词，统一使用字符 n-gram：长度不小于2的片段取所有相邻二元组，
+    单字符片段保留为一元组。
+
+    Args:
+        text: 原始文本
+
+    Returns:
+        set: 词元集合
+    """
+    tokens = set()
+    for run in _runs(text):
+        if len(run) == 1:
+            tokens.add(run)
+        else:
+            tokens.update(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+class SearchIndex:
+    """
+    历史任务全文索引
+
+    倒排表以字符二元组为键，记录包含该词元的文档编号。
+    索引由快照（search_index.json）和增量日志（search_index.jsonl）组成：
+    任务写盘时只追加日志，首次搜索时加载快照并重放日志，关闭时合并。
+    """
+
+    VERSION = 1
+
+    def __init__(self, index_dir, writer, source, compact_bytes=1 << 20):
+        """
+        初始化索引
+
+        Args:
+            index_dir: 索引文件所在目录
+            writer: 文件写入器（DurableWriter）
+            source: 无快照时用于全量建立索引的函数，返回 (日期, 任务列表) 迭代器
+            compact_bytes: 未加载索引时，日志超过该大小（字节）也在关闭时合并
+        """
+        self.snapshot_path = os.path.join(index_dir, 'search_index.json')
+        self.journal_path = os.path.join(index_dir, 'search_index.jsonl')
+        self.writer = writer
+        self.source = source
+        self.compact_bytes = compact_bytes
+
+        self._lock = threading.RLock()
+        self._loaded = False
+        # 增量日志写入失败后置为True：下次加载时忽略快照和日志，从任务数据重建
+        self._rebuild = False
+        # 本次运行中是否已检查过日志末尾是否完整
+        self._tail_checked = False
+
+        # 文档：编号 -> [日期, 任务ID, 内容, 是否完成]，删除后置为None
+        self._docs = []
+        # (日期, 任务ID) -> 文档编号
+        self._keys = {}
+        # 词元 -> 文档编号集合
+        self._postings = {}
+
+    def _put(self, date, task_id, content, completed):
+        """新增或替换一条文档（需持有锁）"""
+        key = (date, task_id)
+        num = self._keys.get(key)
+        if num is not None:
+            old = self._docs[num]
+            if old[2] == content:
+                old[3] = completed
+                return
+            self._drop(num)
+        num = len(self._docs)
+        self._docs.append([date, task_id, content, completed])
+        self._keys[key] = num
+        for token in tokenize(content):
+            self._postings.setdefault(token, set()).add(num)
+
+    def _drop(self, num):
+        """删除一条文档（需持有锁）"""
+        date, task_id, content, _ = self._docs[num]
+        for token in tokenize(content):
+            nums = self._postings.get(token)
+            if nums:
+                nums.discard(num)
+                if not nums:
+                    del self._postings[token]
+        self._docs[num] = None
+        del self._keys[(date, task_id)]
+
+    def _apply(self, date, op):
+        """在内存索引上执行一条任务操作记录（需持有锁）"""
+        kind = op['op']
+        if kind == 'add':
+            task = op['task']
+            self._put(date, task['id'], task['content'], task['completed'])
+        elif kind == 'update':
+            num = self._keys.get((date, op['id']))
+            if num is None:
+                return
+            doc = self._docs[num]
+            self._put(date, op['id'],
+                      op['fields'].get('content', doc[2]),
+                      op['fields'].get('completed', doc[3]))
+        elif kind == 'delete':
+            num = self._keys.get((date, op['id']))
+            if num is not None:
+                self._drop(num)
+        elif kind == 'reset':
+            for num in [num for key, num in self._keys.items() if key[0] == date]:
+                self._drop(num)
+            for task in op['tasks']:
+                self._put(date, task['id'], task['content'], task['completed'])
+
+    def _read_snapshot(self):
+        """读取快照，成功返回True"""
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return False
+        if data.get('version') != self.VERSION:
+            return False
+        self._docs = data['docs']
+        self._keys = {(doc[0], doc[1]): num for num, doc in enumerate(self._docs) if doc}
+        self._postings = {token: set(nums) for token, nums in data['postings'].items()}
+        return True
+
+    def _ensure_loaded(self):
+        """首次使用时加载快照并重放日志（需持有锁）"""
+        if self._loaded:
+            return
+        rebuild, self._rebuild = self._rebuild, False
+        if rebuild or not self._read_snapshot():
+            for date, tasks in self.source():
+                for task in tasks:
+                    self._put(date, task['id'], task['content'], task['completed'])
+
+        # 重建时任务数据已包含所有写盘的修改，不再重放失效前的日志
+        if not rebuild:
+            for record in read_jsonl(self.journal_path):
+                self._apply(record['date'], record)
+        self._loaded = True
+
+    def load(self):
+        """加载索引（可在后台线程中预先调用）"""
+        with self._lock:
+            self._ensure_loaded()
+
+    def load_async(self):
+        """在后台线程中预先加载索引"""
+        threading.Thread(target=self.load, daemon=True).start()
+
+    def invalidate(self):
+        """丢弃索引，下次搜索时从任务数据全量重建
+
+        增量日志写入失败时调用，避免索引永久缺少这批记录。
+        同时尽量删除快照和日志，使下次启动也会重建。
+        """
+        with self._lock:
+            self._docs = []
+            self._keys = {}
+            self._postings = {}
+            self._loaded = False
+            self._rebuild = True
+            for path in (self.snapshot_path, self.journal_path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def apply(self, date, ops):
+        """记录一批已写盘的任务操作
+
+        Args:
+            date: 日期字符串（YYYY-MM-DD）
+            ops: TaskManager 的操作记录列表
+        """
+        lines = ''.join(json.dumps(dict(op, date=date), ensure_ascii=False) + '\n'
+                        for op in ops)
+        with self._lock:
+            if not self._tail_checked:
+                repair_tail(self.journal_path)
+                self._tail_checked = True
+            self.writer.append(self.journal_path, lines)
+            if self._loaded:
+                for op in ops:
+                    self._apply(date, op)
+
+    def search(self, query, limit=50):
+        """搜索任务内容
+
+        Args:
+            query: 查询文本，多个关键词用空格分隔时需同时命中
+            limit: 最多返回的结果数
+
+        Returns:
+            list: 命中的任务，按日期倒序，每项包含 date/id/content/completed
+        """
+        runs = _runs(query)
+        if not runs:
+            return []
+
+        with self._lock:
+            self._ensure_loaded()
+
+            # 用二元组倒排表求候选集，从最短的倒排表开始求交集
+            tokens = set()
+            for run in runs:
+                if len(run) > 1:
+                    tokens.update(run[i:i + 2] for i in range(len(run) - 1))
+            if tokens:
+                postings = sorted((self._postings.get(token, set()) for token in tokens), key=len)
+                candidates = set(postings[0])
+                for nums in postings[1:]:
+                    candidates &= nums
+                    if not candidates:
+                        break
+            else:
+                # 只有单字查询时逐条匹配
+                candidates = range(len(self._docs))
+
+            results = []
+            for num in candidates:
+                doc = self._docs[num]
+                if doc is None:
+                    continue
+                content = doc[2].lower()
+                if all(run in content for run in runs):
+                    results.append(doc)
+
+        results = heapq.nlargest(limit, results, key=lambda doc: (doc[0], doc[1]))
+        return [{'date': doc[0], 'id': doc[1], 'content': doc[2], 'completed': doc[3]}
+                for doc in results]
+
+    def compact(self):
+        """将内存索引写为快照并清空日志"""
+        with self._lock:
+            self._ensure_loaded()
+            # 去掉已删除的文档并重新编号
+            docs = [doc for doc in self._docs if doc]
+            renumber = {}
+            for num, doc in enumerate(self._docs):
+                if doc:
+                    renumber[num] = len(renumber)
+            self._docs = docs
+            self._keys = {(doc[0], doc[1]): num for num, doc in enumerate(docs)}
+            self._postings = {token: {renumber[num] for num in nums}
+                              for token, nums in self._postings.items()}
+
+            self.writer.write_atomic(self.snapshot_path, json.dumps({
+                'version': self.VERSION,
+                'docs': docs,
+                'postings': {token: sorted(nums) for token, nums in self._postings.items()}
+            }, ensure_ascii=False))
+            if os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+
+    def close(self):
+        """关闭索引，已加载或日志较大时合并为快照"""
+        with self._lock:
+            if not os.path.exists(self.journal_path):
+                return
+            if self._loaded or os.path.getsize(self.journal_path) >= self.compact_bytes:
+                self.compact()
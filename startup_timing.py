@@ -0,0 +1,55 @@
+import sys
+import time
+
+
+class StartupTimer:
+    """
+    启动阶段计时
+
+    从创建时开始计时，每个阶段结束时调用 mark 记录耗时，
+    report 汇总各阶段和总耗时，可以与预算比较。
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        # [(阶段名, 距开始的毫秒数)]
+        self.marks = []
+
+    def mark(self, name):
+        """记录一个阶段结束"""
+        self.marks.append((name, (time.perf_counter() - self.start) * 1000))
+
+    def elapsed(self, name):
+        """某阶段结束时距开始的毫秒数，尚未到达时返回None"""
+        for mark, at_ms in self.marks:
+            if mark == name:
+                return at_ms
+        return None
+
+    def report(self, modules=('PIL', 'image_manager', 'task_manager')):
+        """汇总启动耗时
+
+        Args:
+            modules: 需要报告是否已导入的模块
+
+        Returns:
+            dict: {
+                'phases': [{'name': 阶段名, 'ms': 阶段耗时, 'at_ms': 距开始的毫秒数}],
+                'total_ms': 最后一个阶段距开始的毫秒数,
+                'loaded': {模块名: 是否已导入}
+            }
+        """
+        phases = []
+        previous = 0.0
+        for name, at_ms in self.marks:
+            phases.append({'name': name, 'ms': round(at_ms - previous, 1), 'at_ms': round(at_ms, 1)})
+            previous = at_ms
+        return {
+            'phases': phases,
+            'total_ms': round(previous, 1),
+            'loaded': {module: module in sys.modules for module in modules}
+        }
+
+
+# 进程级的启动计时器，主程序导入时最先创建
+STARTUP = StartupTimer()
@@ -1,6 +1,12 @@
 import os
-import json
-from datetime import datetime
+import time
+import threading
+from datetime import datetime, timedelta
+from atomic_io import DurableWriter
+from history_index import HistoryIndex
+from search_index import SearchIndex
+from task_storage import JsonFileStorage, JournalStorage, SqliteStorage, WriteBehindFlusher
+from tracing import span, traced
 
 class TaskManager:
     """
@@ -10,14 +16,34 @@ class TaskManager:
     1. 按日期保存事务记录
     2. 提供事务的增删改查接口
     3. 统一的数据存储管理
+    
+    已加载日期的任务以 {任务ID: 任务} 的形式常驻内存，读取不再访问磁盘，
+    按ID修改和删除都是字典操作；修改先作用于内存，再由延迟写入器合并写盘。
+    任务ID按天单调递增，已删除任务的ID不会被复用。
+    进程跨越午夜时自动切换到新一天的任务文件。
     """
     
-    def __init__(self):
+    def __init__(self, storage_mode='file', flush_delay=1.0,
+                 fsync_policy='batch', fsync_interval_ms=200, carry_over=False):
         """
         初始化事务管理器
         
         - 创建应用数据目录
         - 初始化数据存储
+        
+        Args:
+            storage_mode: 存储模式
+                - 'file': 每次修改整体重写当天的JSON文件
+                - 'journal': 每次修改追加一行日志，后台合并为快照
+                - 'sqlite': 所有日期存放在单个SQLite数据库中，首次使用时导入已有JSON文件
+            flush_delay: 修改后延迟写盘的时间（秒），期间的修改合并为一次写入
+            fsync_policy: 落盘策略
+                - 'always': 每次写入都 fsync
+                - 'batch': 每隔 fsync_interval_ms 毫秒统一 fsync
+                - 'exit': 只在退出时 fsync
+            fsync_interval_ms: 'batch' 策略下的 fsync 间隔（毫秒）
+            carry_over: 是否把前一天未完成的任务转入新的一天：程序跨越午夜时转入，
+                启动时当天还没有任务也会从最近有任务的一天转入
         """
         # 应用数据目录
         self.app_data_dir = os.path.join(os.getenv('APPDATA'), '每日事务')
@@ -26,22 +52,216 @@ class TaskManager:
         # 创建必要的目录
         os.makedirs(self.tasks_dir, exist_ok=True)
         
-        # 当前日期的任务文件路径
-        self.current_date = datetime.now().strftime('%Y-%m-%d')
-        self.current_file = os.path.join(self.tasks_dir, f"{self.current_date}.json")
+        # 数据存储，所有文件写入共用同一个崩溃安全的写入器
+        self.writer = DurableWriter(fsync_policy, fsync_interval_ms)
+        if storage_mode == 'journal':
+            self.storage = JournalStorage(self.tasks_dir, self.writer)
+        elif storage_mode == 'sqlite':
+            self.storage = SqliteStorage(os.path.join(self.app_data_dir, 'tasks.db'), self.writer)
+            self.storage.import_json(self.tasks_dir)
+        elif storage_mode == 'file':
+            self.storage = JsonFileStorage(self.tasks_dir, self.writer)
+        else:
+            raise ValueError(f"未知的存储模式：{storage_mode}")
+        
+        # 当前日期及下一次跨天的时间戳
+        self.carry_over = carry_over
+        self._start_day(datetime.now())
+        
+        # 历史记录摘要索引，SQLite模式直接使用聚合查询
+        if storage_mode == 'sqlite':
+            self.history_index = None
+        else:
+            self.history_index = HistoryIndex(
+                os.path.join(self.app_data_dir, 'history_index.json'), self.storage, self.writer)
+        
+        # 历史任务全文索引，保存在任务目录旁
+        self.search_index = SearchIndex(self.app_data_dir, self.writer,
+                                        self.iter_tasks_by_date_range)
+        
+        # 内存中的任务模型：{日期: {任务ID: 任务}}，保持插入顺序
+        self._days = {}
+        # 各日期下一个可分配的任务ID
+        self._next_ids = {}
+        # 尚未写盘的操作记录：{日期: [操作记录]}
+        self._pending = {}
+        # 已跨天、写盘后可以从内存中释放的日期
+        self._retired = set()
+        # 保护内存模型与待写入记录
+        self._lock = threading.RLock()
+        # 保证写盘顺序
+        self._flush_lock = threading.Lock()
+        self._flusher = WriteBehindFlusher(self.flush, delay=flush_delay)
+        # close 之后写盘失败不再重新计时，避免计时线程阻止进程退出
+        self._closing = False
         
         # 确保当前日期的任务文件存在
-        if not os.path.exists(self.current_file):
-            self._create_empty_task_file()
+        self.storage.ensure_day(self._current_date)
+        
+        # 整理之前日期遗留的日志
+        self.storage.compact_stale(self._current_date)
+        
+        # 启动时当天还没有任务：转入最近一天未完成的任务
+        if self.carry_over:
+            with self._lock:
+                if not self._load_day(self._current_date):
+                    previous = self._last_date_with_tasks(self._current_date)
+                    if previous:
+                        self._carry_over_from(previous)
+                        self._retired.add(previous)
+    
+    def _start_day(self, now):
+        """切换当前日期，并预先计算下一次午夜的时间戳"""
+        self._current_date = now.strftime('%Y-%m-%d')
+        midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+        self._next_midnight = midnight.timestamp()
+    
+    @property
+    def current_date(self):
+        """当前日期（YYYY-MM-DD），跨越午夜后自动切换"""
+        if time.time() >= self._next_midnight:
+            self._rollover()
+        return self._current_date
+    
+    @property
+    def current_file(self):
+        """当前日期写入的文件路径（取决于存储模式：快照、日志或数据库文件）"""
+        return self.storage.day_path(self.current_date)
+    
+    def _rollover(self):
+        """跨天处理
+        
+        - 切换到新一天并创建任务文件
+        - 可选地把前一天未完成的任务一次性转入新的一天
+        - 前一天的内存数据在写盘后释放，日志在后台合并
+        """
+        with self._lock:
+            if time.time() < self._next_midnight:
+                return
+            previous = self._current_date
+            self._start_day(datetime.now())
+            if self._current_date == previous:
+                return
+            
+            self.storage.ensure_day(self._current_date)
+            
+            if self.carry_over:
+                self._carry_over_from(previous)
+            
+            self._retired.add(previous)
+            self._flusher.schedule()
+    
+    def _carry_over_from(self, previous):
+        """把指定日期未完成的任务转入当前日期（需持有锁）"""
+        unfinished = [task for task in self._load_day(previous).values()
+                      if not task['completed']]
+        tasks = self._load_day(self._current_date)
+        for task in unfinished:
+            carried = dict(task, id=self._allocate_id(self._current_date))
+            tasks[carried['id']] = carried
+            self._record(self._current_date, {'op': 'add', 'task': dict(carried)})
+    
+    def _last_date_with_tasks(self, before):
+        """获取早于 before 的最近一个有任务的日期，没有时返回None"""
+        for date in sorted(self.storage.list_dates(), reverse=True):
+            if date < before and self.storage.load_tasks(date):
+                return date
+        return None
+    
+    def _load_day(self, date):
+        """获取指定日期的内存任务字典，首次访问时从磁盘加载（需持有锁）
+        
+        旧版本按 len(tasks) + 1 分配ID，删除后可能产生重复ID；
+        加载时为重复的任务重新分配ID，并整体写回一次。
+        """
+        tasks = self._days.get(date)
+        if tasks is not None:
+            return tasks
+        
+        with span('TaskManager.load_day'):
+            task_list, next_id = self.storage.load_day(date)
+        tasks = {}
+        repaired = False
+        for task in task_list:
+            if task['id'] in tasks:
+                task['id'] = next_id
+                next_id += 1
+                repaired = True
+            tasks[task['id']] = task
+        
+        self._days[date] = tasks
+        self._next_ids[date] = next_id
+        if repaired:
+            self._record(date, {'op': 'reset', 'tasks': [dict(task) for task in tasks.values()]})
+        return tasks
     
-    def _create_empty_task_file(self):
-        """创建空的任务文件"""
-        with open(self.current_file, 'w', encoding='utf-8') as f:
-            json.dump({
-                'date': self.current_date,
-                'tasks': []
-            }, f, ensure_ascii=False, indent=4)
+    def _allocate_id(self, date):
+        """分配一个新的任务ID（需持有锁）"""
+        task_id = self._next_ids[date]
+        self._next_ids[date] = task_id + 1
+        return task_id
     
+    def _record(self, date, op):
+        """登记一条待写盘的操作记录（需持有锁）"""
+        self._pending.setdefault(date, []).append(op)
+        self._flusher.schedule()
+    
+    @traced()
+    def flush(self):
+        """将所有待写入的修改写盘
+        
+        存储写入失败时，尚未写入的操作记录放回待写入队列的最前面（排在期间新增的记录之前）
+        并重新计时，之后再抛出异常；已写入存储的记录不会重复写入。
+        索引更新失败只打印错误：历史索引下次刷新时重新扫描，全文索引下次搜索时重建。
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                snapshots = {date: [dict(task) for task in self._days[date].values()]
+                             for date in pending}
+                next_ids = {date: self._next_ids[date] for date in pending}
+            written = set()
+            try:
+                for date, ops in pending.items():
+                    in_sync = self.history_index.in_sync() if self.history_index else False
+                    self.storage.apply(date, ops, snapshots[date], next_ids[date])
+                    written.add(date)
+                    self._update_indexes(date, ops, snapshots[date], in_sync)
+            except Exception:
+                with self._lock:
+                    unwritten = {date: list(ops) for date, ops in pending.items()
+                                 if date not in written}
+                    for date, ops in self._pending.items():
+                        unwritten.setdefault(date, []).extend(ops)
+                    self._pending = unwritten
+                if not self._closing:
+                    self._flusher.schedule()
+                raise
+            
+            # 释放已跨天且全部写盘的日期
+            with self._lock:
+                retired = {date for date in self._retired if date not in self._pending}
+                for date in retired:
+                    self._days.pop(date, None)
+                    self._next_ids.pop(date, None)
+                self._retired -= retired
+            if retired:
+                self.storage.compact_stale(self._current_date)
+    
+    def _update_indexes(self, date, ops, tasks, in_sync):
+        """存储写入成功后更新历史索引和全文索引，失败时只打印错误"""
+        if self.history_index:
+            try:
+                self.history_index.update(date, ops, tasks, in_sync)
+            except Exception as e:
+                print(f"更新历史索引失败：{str(e)}")
+        try:
+            self.search_index.apply(date, ops)
+        except Exception as e:
+            print(f"更新搜索索引失败：{str(e)}")
+            self.search_index.invalidate()
+    
+    @traced()
     def add_task(self, content):
         """添加新任务
         
@@ -51,27 +271,27 @@ class TaskManager:
         Returns:
             dict: 新添加的任务信息
         """
-        # 读取当前任务文件
-        with open(self.current_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        # 创建新任务
-        task = {
-            'id': len(data['tasks']) + 1,
-            'content': content,
-            'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'completed': False
-        }
-        
-        # 添加到任务列表
-        data['tasks'].append(task)
-        
-        # 保存更新
-        with open(self.current_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
+        with self._lock:
+            date = self.current_date
+            tasks = self._load_day(date)
+            
+            # 创建新任务
+            task = {
+                'id': self._allocate_id(date),
+                'content': content,
+                'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'completed': False
+            }
+            
+            # 添加到任务列表
+            tasks[task['id']] = task
+            
+            # 登记写盘
+            self._record(date, {'op': 'add', 'task': dict(task)})
         
-        return task
+        return dict(task)
     
+    @traced()
     def get_tasks(self, date=None):
         """获取指定日期的任务列表
         
@@ -84,14 +304,12 @@ class TaskManager:
         if date is None:
             date = self.current_date
         
-        file_path = os.path.join(self.tasks_dir, f"{date}.json")
-        if not os.path.exists(file_path):
-            return []
-        
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            return data['tasks']
+        with self._lock:
+            if date == self.current_date or date in self._days:
+                return list(self._load_day(date).values())
+        return self.storage.load_tasks(date)
     
+    @traced()
     def update_task(self, task_id, completed=None, content=None):
         """更新任务状态
         
@@ -103,26 +321,25 @@ class TaskManager:
         Returns:
             bool: 更新是否成功
         """
-        with open(self.current_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        # 查找并更新任务
-        for task in data['tasks']:
-            if task['id'] == task_id:
-                if completed is not None:
-                    task['completed'] = completed
-                if content is not None:
-                    task['content'] = content
-                break
-        else:
-            return False
+        fields = {}
+        if completed is not None:
+            fields['completed'] = completed
+        if content is not None:
+            fields['content'] = content
         
-        # 保存更新
-        with open(self.current_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
+        with self._lock:
+            date = self.current_date
+            task = self._load_day(date).get(task_id)
+            if task is None:
+                return False
+            task.update(fields)
+            
+            # 登记写盘
+            self._record(date, {'op': 'update', 'id': task_id, 'fields': fields})
         
         return True
     
+    @traced()
     def delete_task(self, task_id):
         """删除任务
         
@@ -132,34 +349,77 @@ class TaskManager:
         Returns:
             bool: 删除是否成功
         """
-        with open(self.current_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        with self._lock:
+            date = self.current_date
+            if self._load_day(date).pop(task_id, None) is None:
+                return False
+            
+            # 登记写盘
+            self._record(date, {'op': 'delete', 'id': task_id})
         
-        # 查找并删除任务
-        original_length = len(data['tasks'])
-        data['tasks'] = [task for task in data['tasks'] if task['id'] != task_id]
+        return True
         
-        if len(data['tasks']) == original_length:
+    @staticmethod
+    def _in_range(date, start_date, end_date):
+        """判断日期是否在范围内，None表示不限"""
+        if start_date is not None and date < start_date:
             return False
+        if end_date is not None and date > end_date:
+            return False
+        return True
+    
+    @traced()
+    def get_history_summary(self):
+        """获取每个历史日期的任务数和完成数
         
-        # 保存更新
-        with open(self.current_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
+        只读取摘要索引，不打开各日期的任务文件。
         
-        return True
+        Returns:
+            dict: {日期: {'count': 任务数, 'completed': 完成数}}
+        """
+        if self.history_index:
+            # 任务目录有外部修改或后台合并时增量重建，未变化时只需一次 os.stat
+            self.history_index.refresh()
+            summary = self.history_index.summaries()
+        else:
+            summary = self.storage.summaries()
         
+        # 用内存中的数据覆盖尚未写盘的日期
+        with self._lock:
+            for date, tasks in self._days.items():
+                summary[date] = {
+                    'count': len(tasks),
+                    'completed': sum(1 for task in tasks.values() if task['completed'])
+                }
+        return summary
+    
     def get_history_dates(self):
         """获取所有历史记录的日期列表
         
         Returns:
             list: 日期列表，按时间倒序排序
         """
-        dates = []
-        for filename in os.listdir(self.tasks_dir):
-            if filename.endswith('.json'):
-                date = filename[:-5]  # 移除.json后缀
-                dates.append(date)
-        return sorted(dates, reverse=True)
+        return sorted(self.get_history_summary(), reverse=True)
+    
+    def iter_tasks_by_date_range(self, start_date=None, end_date=None):
+        """按日期倒序逐天迭代指定范围内的任务
+        
+        只有迭代到某一天时才读取该天的任务，调用方可以随时停止。
+        
+        Args:
+            start_date: 开始日期（YYYY-MM-DD），默认为最早日期
+            end_date: 结束日期（YYYY-MM-DD），默认为最新日期
+            
+        Yields:
+            tuple: (日期, 任务列表)，跳过没有任务的日期
+        """
+        summary = self.get_history_summary()
+        for date in sorted(summary, reverse=True):
+            if not summary[date]['count'] or not self._in_range(date, start_date, end_date):
+                continue
+            tasks = self.get_tasks(date)
+            if tasks:
+                yield date, tasks
     
     def get_tasks_by_date_range(self, start_date=None, end_date=None):
         """获取指定日期范围内的所有任务
@@ -171,21 +431,56 @@ class TaskManager:
         Returns:
             dict: 按日期分组的任务字典
         """
-        all_tasks = {}
-        dates = self.get_history_dates()
-        
-        if not dates:
-            return all_tasks
-            
-        if start_date is None:
-            start_date = dates[-1]  # 最早的日期
-        if end_date is None:
-            end_date = dates[0]    # 最新的日期
-            
-        for date in dates:
-            if start_date <= date <= end_date:
-                tasks = self.get_tasks(date)
-                if tasks:  # 只添加有任务的日期
-                    all_tasks[date] = tasks
-                    
-        return all_tasks
\ No newline at end of file
+        if self.history_index:
+            # 根据摘要跳过没有任务的日期，只打开需要的文件
+            all_tasks = {}
+            for date, entry in self.get_history_summary().items():
+                if entry['count'] and self._in_range(date, start_date, end_date):
+                    all_tasks[date] = self.storage.load_tasks(date)
+        else:
+            all_tasks = self.storage.load_range(start_date, end_date)
+        
+        # 用内存中的数据覆盖尚未写盘的日期
+        with self._lock:
+            for date, tasks in self._days.items():
+                if not self._in_range(date, start_date, end_date):
+                    continue
+                if tasks:
+                    all_tasks[date] = list(tasks.values())
+                else:
+                    all_tasks.pop(date, None)
+        
+        return {date: all_tasks[date] for date in sorted(all_tasks, reverse=True)}
+    
+    @traced()
+    def search(self, query, limit=50):
+        """全文搜索所有历史任务
+        
+        Args:
+            query: 查询文本，多个关键词用空格分隔时需同时命中
+            limit: 最多返回的结果数
+            
+        Returns:
+            list: 命中的任务，按日期倒序，每项包含 date/id/content/completed
+        """
+        # 先写盘，保证刚修改的任务也能被搜索到
+        self.flush()
+        return self.search_index.search(query, limit)
+    
+    @traced()
+    def close(self):
+        """关闭事务管理器，确保数据完整落盘
+        
+        最后一次写盘失败时不再重试，仍然关闭索引、存储和写入器，再抛出异常。
+        """
+        self._closing = True
+        try:
+            self._flusher.flush()
+        finally:
+            try:
+                if self.history_index:
+                    self.history_index.close()
+                self.search_index.close()
+            finally:
+                self.storage.close()
+                self.writer.close()
@@ -0,0 +1,635 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from atomic_io import DurableWriter, read_jsonl, repair_tail
+
+class JsonFileStorage:
+    """
+    整文件JSON存储
+
+    每天一个 tasks/<date>.json 文件，每次修改都整体重写，
+    与早期版本的文件格式完全一致。
+    """
+
+    def __init__(self, tasks_dir, writer=None):
+        """
+        初始化存储
+
+        Args:
+            tasks_dir: 任务文件所在目录
+            writer: 文件写入器（DurableWriter），默认每次写入都 fsync
+        """
+        self.tasks_dir = tasks_dir
+        self.writer = writer or DurableWriter('always')
+        os.makedirs(self.tasks_dir, exist_ok=True)
+
+    def _snapshot_path(self, date):
+        """获取指定日期的快照文件路径"""
+        return os.path.join(self.tasks_dir, f"{date}.json")
+
+    def day_path(self, date):
+        """指定日期的修改写入的文件路径"""
+        return self._snapshot_path(date)
+
+    def _read_snapshot(self, date):
+        """读取快照文件
+
+        快照不存在或无法解析时改读上一版本（<date>.json.bak），
+        两者都不可用时返回 ([], 1)。
+
+        Returns:
+            tuple: (任务列表, 下一个任务ID)
+        """
+        file_path = self._snapshot_path(date)
+        for path in (file_path, file_path + '.bak'):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                tasks = data['tasks']
+                return tasks, next_task_id(tasks, data.get('next_id', 1))
+            except FileNotFoundError:
+                continue
+            except (ValueError, KeyError, TypeError) as e:
+                print(f"读取任务文件失败：{path}，{str(e)}")
+        return [], 1
+
+    def _dump_snapshot(self, date, tasks, next_id):
+        """序列化快照文件内容"""
+        return json.dumps({
+            'date': date,
+            'tasks': tasks,
+            'next_id': next_id
+        }, ensure_ascii=False, indent=4)
+
+    def _write_snapshot(self, date, tasks, next_id):
+        """原子地整体写入快照文件"""
+        self.writer.write_atomic(self._snapshot_path(date),
+                                 self._dump_snapshot(date, tasks, next_id), backup=True)
+
+    def ensure_day(self, date):
+        """确保指定日期的任务文件存在"""
+        file_path = self._snapshot_path(date)
+        if not os.path.exists(file_path) and not os.path.exists(file_path + '.bak'):
+            self._write_snapshot(date, [], 1)
+
+    def load_day(self, date):
+        """读取指定日期的任务列表和ID高水位
+
+        Args:
+            date: 日期字符串（YYYY-MM-DD）
+
+        Returns:
+            tuple: (任务列表, 下一个可分配的任务ID)
+        """
+        return self._read_snapshot(date)
+
+    def load_tasks(self, date):
+        """读取指定日期的任务列表
+
+        Args:
+            date: 日期字符串（YYYY-MM-DD）
+
+        Returns:
+            list: 任务列表
+        """
+        return self.load_day(date)[0]
+
+    def apply(self, date, ops, tasks, next_id):
+        """持久化一次修改
+
+        Args:
+            date: 日期字符串（YYYY-MM-DD）
+            ops: 本次修改的操作记录列表
+            tasks: 修改后的完整任务列表
+            next_id: 下一个可分配的任务ID（已删除任务的ID不再复用）
+        """
+        self._write_snapshot(date, tasks, next_id)
+
+    def list_dates(self):
+        """获取所有有记录的日期（未排序）"""
+        dates = set()
+        for filename in os.listdir(self.tasks_dir):
+            if filename.endswith('.json'):
+                dates.add(filename[:-5])
+            elif filename.endswith('.json.bak'):
+                dates.add(filename[:-9])
+        return list(dates)
+
+    def load_range(self, start_date=None, end_date=None):
+        """读取日期范围内所有有任务的日期
+
+        Args:
+            start_date: 开始日期（YYYY-MM-DD），None表示不限
+            end_date: 结束日期（YYYY-MM-DD），None表示不限
+
+        Returns:
+            dict: {日期: 任务列表}，按日期倒序
+        """
+        all_tasks = {}
+        for date in sorted(self.list_dates(), reverse=True):
+            if start_date is not None and date < start_date:
+                continue
+            if end_date is not None and date > end_date:
+                continue
+            tasks = self.load_tasks(date)
+            if tasks:  # 只添加有任务的日期
+                all_tasks[date] = tasks
+        return all_tasks
+
+    def compact_stale(self, current_date):
+        """整理非当天的数据，整文件存储无需处理"""
+
+    def close(self):
+        """关闭存储，整文件存储无需处理"""
+
+
+def next_task_id(tasks, next_id=1):
+    """计算下一个可分配的任务ID：不小于记录的高水位，也不小于现有最大ID + 1"""
+    return max([next_id] + [task['id'] + 1 for task in tasks])
+
+
+def replay_ops(tasks, ops):
+    """在任务列表上重放操作记录
+
+    与 TaskManager 的增删改语义保持一致：
+    - add: 追加任务；ID已存在时跳过
+    - update: 修改第一个匹配ID的任务
+    - delete: 删除所有匹配ID的任务
+    - reset: 整体替换任务列表（修复重复ID时使用）
+
+    任务ID不复用，因此重放可以重复进行：合并在替换快照之后、删除 .compacting
+    之前崩溃时，下次加载会在已包含这些记录的快照上再重放一遍，结果不变。
+
+    Args:
+        tasks: 初始任务列表（会被修改）
+        ops: 操作记录列表
+
+    Returns:
+        list: 重放后的任务列表
+    """
+    ids = {task['id'] for task in tasks}
+    for op in ops:
+        kind = op['op']
+        if kind == 'add':
+            if op['task']['id'] not in ids:
+                tasks.append(op['task'])
+                ids.add(op['task']['id'])
+        elif kind == 'update':
+            for task in tasks:
+                if task['id'] == op['id']:
+                    task.update(op['fields'])
+                    break
+        elif kind == 'delete':
+            tasks = [task for task in tasks if task['id'] != op['id']]
+            ids.discard(op['id'])
+        elif kind == 'reset':
+            tasks = [dict(task) for task in op['tasks']]
+            ids = {task['id'] for task in tasks}
+    return tasks
+
+
+def ops_next_id(ops, next_id=1):
+    """根据操作记录中新增的任务推进ID高水位"""
+    for op in ops:
+        if op['op'] == 'add':
+            next_id = max(next_id, op['task']['id'] + 1)
+        elif op['op'] == 'reset':
+            next_id = next_task_id(op['tasks'], next_id)
+    return next_id
+
+
+class JournalStorage(JsonFileStorage):
+    """
+    追加写日志存储
+
+    每次修改只向 tasks/<date>.jsonl 追加一行操作记录，
+    写入开销与当天任务数量无关。读取时以 <date>.json 快照为基础重放日志。
+    日志达到阈值、或跨天后，在后台线程中合并回快照。
+    """
+
+    # 无锁读取遇到并发替换时最多重试的次数，超过后改为持锁读取
+    REPLAY_RETRIES = 100
+
+    def __init__(self, tasks_dir, writer=None, compact_threshold=200):
+        """
+        初始化日志存储
+
+        Args:
+            tasks_dir: 任务文件所在目录
+            writer: 文件写入器（DurableWriter），默认每次写入都 fsync
+            compact_threshold: 日志记录数达到该值时触发后台合并
+        """
+        super().__init__(tasks_dir, writer)
+        self.compact_threshold = compact_threshold
+
+        # 保护日志轮换与快照替换的锁
+        self._lock = threading.Lock()
+        # 同一时间只允许一个合并任务
+        self._compact_lock = threading.Lock()
+        # 顺序计数：日志轮换或快照替换前后各加一，奇数表示正在替换
+        self._generation = 0
+
+        # 各日期自上次合并以来的日志记录数
+        self._journal_counts = {}
+        # 本次运行中已检查过末尾是否完整的日期
+        self._tail_checked = set()
+
+    def _journal_path(self, date):
+        """获取指定日期的日志文件路径"""
+        return os.path.join(self.tasks_dir, f"{date}.jsonl")
+
+    def day_path(self, date):
+        """指定日期的修改写入的文件路径（日志文件）"""
+        return self._journal_path(date)
+
+    def _compacting_path(self, date):
+        """获取正在合并中的日志文件路径"""
+        return self._journal_path(date) + '.compacting'
+
+    def _read_journal(self, path):
+        """读取日志文件中的操作记录，跳过无法解析的行"""
+        return read_jsonl(path)
+
+    def _replay(self, date):
+        """从快照和日志重建任务列表
+
+        Returns:
+            tuple: (任务列表, 下一个任务ID, 日志记录数)
+        """
+        # 不持锁读取，以便多个日期可以并行加载；
+        # 期间若发生日志轮换或快照替换则重新读取
+        for _ in range(self.REPLAY_RETRIES):
+            generation = self._generation
+            if generation % 2:
+                time.sleep(0)
+                continue
+            tasks, next_id, ops = self._read_files(date)
+            if generation == self._generation:
+                return replay_ops(tasks, ops), ops_next_id(ops, next_id), len(ops)
+
+        # 替换持续进行中：持锁读取，保证看到一致的文件
+        with self._lock:
+            tasks, next_id, ops = self._read_files(date)
+        return replay_ops(tasks, ops), ops_next_id(ops, next_id), len(ops)
+
+    def _read_files(self, date):
+        """读取快照和（正在合并的与当前的）日志
+
+        Returns:
+            tuple: (快照任务列表, 快照中的下一个任务ID, 日志操作记录)
+        """
+        tasks, next_id = self._read_snapshot(date)
+        ops = self._read_journal(self._compacting_path(date))
+        ops += self._read_journal(self._journal_path(date))
+        return tasks, next_id, ops
+
+    def load_day(self, date):
+        """读取指定日期的任务列表和ID高水位（快照 + 日志重放）"""
+        tasks, next_id, count = self._replay(date)
+        self._journal_counts[date] = count
+        return tasks, next_id
+
+    def apply(self, date, ops, tasks, next_id):
+        """向日志追加操作记录，新增任务的ID已包含在记录中"""
+        if date not in self._journal_counts:
+            self._journal_counts[date] = self._replay(date)[2]
+
+        lines = ''.join(json.dumps(op, ensure_ascii=False) + '\n' for op in ops)
+        with self._lock:
+            if date not in self._tail_checked:
+                repair_tail(self._journal_path(date))
+                self._tail_checked.add(date)
+            self.writer.append(self._journal_path(date), lines)
+
+        self._journal_counts[date] += len(ops)
+        if self._journal_counts[date] >= self.compact_threshold:
+            self._journal_counts[date] = 0
+            self.compact_async(date)
+
+    def list_dates(self):
+        """获取所有有记录的日期（包括只有日志、尚未生成快照的日期）"""
+        dates = set()
+        for filename in os.listdir(self.tasks_dir):
+            if filename.endswith('.json'):
+                dates.add(filename[:-5])
+            elif filename.endswith('.json.bak'):
+                dates.add(filename[:-9])
+            elif filename.endswith('.jsonl'):
+                dates.add(filename[:-6])
+        return list(dates)
+
+    def compact(self, date):
+        """将日志合并回快照文件
+
+        先在锁内把日志重命名为 .compacting，后续修改写入新的日志文件；
+        重放和序列化在锁外进行，最后在锁内原子替换快照并删除旧日志。
+        """
+        with self._compact_lock:
+            journal_path = self._journal_path(date)
+            compacting_path = self._compacting_path(date)
+
+            with self._lock:
+                if not os.path.exists(compacting_path):
+                    if not os.path.exists(journal_path):
+                        return
+                    self._generation += 1
+                    try:
+                        os.replace(journal_path, compacting_path)
+                    finally:
+                        self._generation += 1
+                tasks, next_id = self._read_snapshot(date)
+
+            ops = self._read_journal(compacting_path)
+            tasks = replay_ops(tasks, ops)
+            text = self._dump_snapshot(date, tasks, ops_next_id(ops, next_id))
+
+            with self._lock:
+                self._generation += 1
+                try:
+                    self.writer.write_atomic(self._snapshot_path(date), text, backup=True)
+                    os.remove(compacting_path)
+                finally:
+                    self._generation += 1
+
+    def compact_async(self, date):
+        """在后台线程中合并指定日期的日志"""
+        threading.Thread(target=self.compact, args=(date,), daemon=True).start()
+
+    def compact_stale(self, current_date):
+        """在后台合并所有非当天的日志（跨天整理）"""
+        def _run():
+            for date in self.list_dates():
+                if date != current_date:
+                    self.compact(date)
+        threading.Thread(target=_run, daemon=True).start()
+
+    def close(self):
+        """关闭存储，同步合并所有已写入日期的日志"""
+        for date in list(self._journal_counts):
+            self.compact(date)
+
+
+class SqliteStorage:
+    """
+    单文件SQLite存储
+
+    所有日期的任务保存在同一个数据库中，按日期、完成状态和创建时间建立索引，
+    历史日期列表和日期范围查询都是一次索引查询。
+    任务在同一天内的顺序由 rowid（插入顺序）决定。
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS days (
+            date TEXT PRIMARY KEY,
+            next_id INTEGER NOT NULL DEFAULT 1
+        );
+        CREATE TABLE IF NOT EXISTS tasks (
+            date TEXT NOT NULL,
+            id INTEGER NOT NULL,
+            content TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            completed INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS idx_tasks_date ON tasks (date, id);
+        CREATE INDEX IF NOT EXISTS idx_tasks_completed ON tasks (completed);
+        CREATE INDEX IF NOT EXISTS idx_tasks_created_at ON tasks (created_at);
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """
+
+    # 落盘策略对应的 synchronous 级别
+    _SYNCHRONOUS = {
+        'always': 'FULL',
+        'batch': 'NORMAL',
+        'exit': 'OFF'
+    }
+
+    def __init__(self, db_path, writer=None):
+        """
+        初始化数据库
+
+        Args:
+            db_path: 数据库文件路径
+            writer: 文件写入器（DurableWriter），仅使用其落盘策略
+        """
+        self.db_path = db_path
+        self.writer = writer or DurableWriter('always')
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+
+        # 写盘在延迟写入器的线程中进行，连接需跨线程使用
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        if self.writer.policy != 'always':
+            self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute(f"PRAGMA synchronous = {self._SYNCHRONOUS[self.writer.policy]}")
+        self._conn.executescript(self._SCHEMA)
+
+        # 旧版本数据库的 days 表没有 next_id 列
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(days)")]
+        if 'next_id' not in columns:
+            with self._conn:
+                self._conn.execute(
+                    "ALTER TABLE days ADD COLUMN next_id INTEGER NOT NULL DEFAULT 1")
+
+    @staticmethod
+    def _row_to_task(row):
+        """将查询结果转换为任务字典"""
+        return {
+            'id': row[0],
+            'content': row[1],
+            'created_at': row[2],
+            'completed': bool(row[3])
+        }
+
+    def day_path(self, date):
+        """指定日期的修改写入的文件路径（所有日期共用的数据库文件）"""
+        return self.db_path
+
+    def ensure_day(self, date):
+        """确保指定日期出现在历史日期中"""
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR IGNORE INTO days (date) VALUES (?)", (date,))
+
+    def load_day(self, date):
+        """读取指定日期的任务列表和ID高水位"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, content, created_at, completed FROM tasks "
+                "WHERE date = ? ORDER BY rowid", (date,)).fetchall()
+            row = self._conn.execute(
+                "SELECT next_id FROM days WHERE date = ?", (date,)).fetchone()
+        tasks = [self._row_to_task(row) for row in rows]
+        return tasks, next_task_id(tasks, row[0] if row else 1)
+
+    def load_tasks(self, date):
+        """读取指定日期的任务列表"""
+        return self.load_day(date)[0]
+
+    def _insert(self, date, task):
+        """插入一条任务（需持有锁）"""
+        self._conn.execute(
+            "INSERT INTO tasks (date, id, content, created_at, completed) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (date, task['id'], task['content'], task['created_at'], int(task['completed'])))
+
+    def apply(self, date, ops, tasks, next_id):
+        """在一个事务中执行操作记录并更新ID高水位"""
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR IGNORE INTO days (date) VALUES (?)", (date,))
+            self._conn.execute("UPDATE days SET next_id = ? WHERE date = ?", (next_id, date))
+            for op in ops:
+                kind = op['op']
+                if kind == 'add':
+                    self._insert(date, op['task'])
+                elif kind == 'update':
+                    fields = {key: value for key, value in op['fields'].items()
+                              if key in ('content', 'completed')}
+                    if not fields:
+                        continue
+                    assignments = ', '.join(f"{key} = ?" for key in fields)
+                    self._conn.execute(
+                        f"UPDATE tasks SET {assignments} WHERE rowid = ("
+                        "SELECT rowid FROM tasks WHERE date = ? AND id = ? "
+                        "ORDER BY rowid LIMIT 1)",
+                        (*fields.values(), date, op['id']))
+                elif kind == 'delete':
+                    self._conn.execute(
+                        "DELETE FROM tasks WHERE date = ? AND id = ?", (date, op['id']))
+                elif kind == 'reset':
+                    self._conn.execute("DELETE FROM tasks WHERE date = ?", (date,))
+                    for task in op['tasks']:
+                        self._insert(date, task)
+
+    def list_dates(self):
+        """获取所有有记录的日期（未排序）"""
+        with self._lock:
+            rows = self._conn.execute("SELECT date FROM days").fetchall()
+        return [row[0] for row in rows]
+
+    def load_range(self, start_date=None, end_date=None):
+        """读取日期范围内所有有任务的日期（单次索引查询）"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT date, id, content, created_at, completed FROM tasks "
+                "WHERE date >= ? AND date <= ? ORDER BY date DESC, rowid",
+                (start_date or '', end_date or '9999-99-99')).fetchall()
+        all_tasks = {}
+        for row in rows:
+            all_tasks.setdefault(row[0], []).append(self._row_to_task(row[1:]))
+        return all_tasks
+
+    def summaries(self):
+        """获取所有日期的任务数和完成数（单次聚合查询）
+
+        Returns:
+            dict: {日期: {'count': 任务数, 'completed': 完成数}}
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT days.date, COUNT(tasks.id), COALESCE(SUM(tasks.completed), 0) "
+                "FROM days LEFT JOIN tasks ON tasks.date = days.date "
+                "GROUP BY days.date").fetchall()
+        return {row[0]: {'count': row[1], 'completed': row[2]} for row in rows}
+
+    def import_json(self, tasks_dir):
+        """一次性导入按日期存放的JSON任务文件
+
+        日志模式下尚未合并的 .jsonl 也会一并重放。导入完成后在 meta 表中记录，
+        之后再调用直接返回。
+
+        Args:
+            tasks_dir: JSON任务文件所在目录
+
+        Returns:
+            int: 导入的任务数量，已导入过时返回0
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM meta WHERE key = 'json_imported'").fetchone()
+        if row or not os.path.isdir(tasks_dir):
+            return 0
+
+        source = JournalStorage(tasks_dir)
+        count = 0
+        with self._lock, self._conn:
+            for date in sorted(source.list_dates()):
+                tasks, next_id = source.load_day(date)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO days (date, next_id) VALUES (?, ?)", (date, next_id))
+                for task in tasks:
+                    self._insert(date, task)
+                    count += 1
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('json_imported', ?)",
+                (time.strftime('%Y-%m-%d %H:%M:%S'),))
+        return count
+
+    def compact_stale(self, current_date):
+        """整理非当天的数据，数据库无需处理"""
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+
+class WriteBehindFlusher:
+    """
+    延迟合并写入器
+
+    修改发生时只登记一次待写入，在 delay 秒内没有新的修改才真正写盘；
+    持续修改时最迟 max_delay 秒也会写一次。计时线程不是守护线程，
+    进程正常退出前会等待最后一次写入完成。
+    """
+
+    def __init__(self, flush_func, delay=1.0, max_delay=5.0):
+        """
+        初始化写入器
+
+        Args:
+            flush_func: 实际执行写盘的函数
+            delay: 防抖延迟（秒）
+            max_delay: 首次修改到写盘的最长延迟（秒）
+        """
+        self.flush_func = flush_func
+        self.delay = delay
+        self.max_delay = max_delay
+
+        self._lock = threading.Lock()
+        self._timer = None
+        self._first_dirty = None
+
+    def schedule(self):
+        """登记一次修改，重新计时"""
+        with self._lock:
+            now = time.monotonic()
+            if self._first_dirty is None:
+                self._first_dirty = now
+            if self._timer:
+                self._timer.cancel()
+            wait = min(self.delay, max(0, self._first_dirty + self.max_delay - now))
+            self._timer = threading.Timer(wait, self._run)
+            self._timer.start()
+
+    def _reset(self):
+        """取消计时（需持有锁）"""
+        if self._timer:
+            self._timer.cancel()
+        self._timer = None
+        self._first_dirty = None
+
+    def _run(self):
+        """计时结束，执行写盘"""
+        with self._lock:
+            self._reset()
+        self.flush_func()
+
+    def flush(self):
+        """立即写盘并取消等待中的计时"""
+        with self._lock:
+            self._reset()
+        self.flush_func()
@@ -0,0 +1,80 @@
+from ball_state import BallStateMachine, BallView
+from timer_slots import TimerScheduler
+
+
+class FakeClock:
+    """模拟 root.after 的时钟，advance 时按到期顺序执行回调"""
+
+    def __init__(self):
+        self.now = 0
+        self._timers = {}
+        self._next_id = 0
+
+    def after(self, ms, func):
+        self._next_id += 1
+        self._timers[self._next_id] = (self.now + ms, func)
+        return self._next_id
+
+    def after_cancel(self, timer_id):
+        self._timers.pop(timer_id, None)
+
+    def advance(self, ms):
+        end = self.now + ms
+        while self._timers:
+            timer_id, (due, func) = min(self._timers.items(), key=lambda item: item[1][0])
+            if due > end:
+                break
+            del self._timers[timer_id]
+            self.now = due
+            func()
+        self.now = end
+
+
+class RecordingView(BallView):
+    def __init__(self):
+        self.x, self.y = 0, 0
+        self.alpha = 0.9
+
+    def position(self):
+        return self.x, self.y
+
+    def move_to(self, x, y):
+        self.x, self.y = x, y
+
+    def set_alpha(self, alpha):
+        self.alpha = alpha
+
+
+def _make_ball():
+    clock = FakeClock()
+    timers = TimerScheduler(clock.after, clock.after_cancel, clock=lambda: clock.now / 1000)
+    view = RecordingView()
+    return clock, view, BallStateMachine(view, timers, 1920, 1080)
+
+
+def test_semi_hide_then_full_hide():
+    clock, view, ball = _make_ball()
+    ball.start()
+    clock.advance(1000)
+    assert ball.state == ball.SEMI
+    assert view.x == 1920 - ball.peek_width
+    clock.advance(ball.full_hide_delay_ms)
+    assert ball.state == ball.HIDDEN
+    assert view.alpha == 0
+
+
+def test_hover_over_semi_hidden_ball_prevents_full_hide():
+    clock, view, ball = _make_ball()
+    ball.start()
+    clock.advance(1000)
+    assert ball.state == ball.SEMI
+
+    ball.enter()
+    clock.advance(ball.full_hide_delay_ms * 2)
+    assert ball.state == ball.SEMI
+    assert view.alpha == 0.9
+
+    # 鼠标离开后重新走半隐藏、完全隐藏流程
+    ball.leave()
+    clock.advance(ball.leave_delay_ms + ball.full_hide_delay_ms)
+    assert ball.state == ball.HIDDEN
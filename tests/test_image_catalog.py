@@ -0,0 +1,60 @@
+import os
+
+from image_catalog import ImageCatalog, _scan_tree, day_of, diff_snapshots
+
+
+def _write(path, data=b'x'):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def _catalog(tmp_path, folders=()):
+    return ImageCatalog(str(tmp_path / 'images'), str(tmp_path / 'image_catalog.json'),
+                        '每日主题.png', folders)
+
+
+def test_day_of():
+    assert day_of('02-27.png') == '02-27'
+    assert day_of('02-27_2.jpg') == '02-27'
+    assert day_of('02-271.png') is None
+
+
+def test_in_place_edit_is_detected_without_dir_change(tmp_path):
+    root = str(tmp_path / 'src')
+    path = os.path.join(root, '02-27.png')
+    _write(path)
+    old = _scan_tree(root, {})
+    dir_mtime = os.stat(root).st_mtime_ns
+
+    _write(path, b'longer content')
+    os.utime(root, ns=(dir_mtime, dir_mtime))
+    new = _scan_tree(root, old)
+    assert diff_snapshots(old, new) == (set(), set(), {path})
+
+
+def test_refresh_round_trip(tmp_path):
+    folder = tmp_path / 'photos'
+    _write(str(tmp_path / 'images' / '02-27.png'))
+    _write(str(folder / 'sub' / '02-27 海边.jpg'))
+    catalog = _catalog(tmp_path, [str(folder)])
+    assert catalog.images_for('02-27') == [
+        str(tmp_path / 'images' / '02-27.png'), str(folder / 'sub' / '02-27 海边.jpg')]
+
+    # 新实例从索引文件加载，删除的文件在刷新后移除
+    os.remove(str(folder / 'sub' / '02-27 海边.jpg'))
+    catalog = _catalog(tmp_path, [str(folder)])
+    assert catalog.refresh() == 1
+    assert catalog.images_for('02-27') == [str(tmp_path / 'images' / '02-27.png')]
+
+
+def test_lookup_does_not_wait_for_running_scan(tmp_path):
+    _write(str(tmp_path / 'images' / '02-27.png'))
+    catalog = _catalog(tmp_path)
+    catalog._scan_lock.acquire()
+    try:
+        assert catalog.images_for('02-27') == []
+    finally:
+        catalog._scan_lock.release()
+    catalog.refresh()
+    assert catalog.images_for('02-27') == [str(tmp_path / 'images' / '02-27.png')]
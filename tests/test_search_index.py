@@ -0,0 +1,62 @@
+import os
+
+from atomic_io import DurableWriter
+from search_index import SearchIndex, tokenize
+
+
+def _index(tmp_path, source=()):
+    return SearchIndex(str(tmp_path), DurableWriter('always'), lambda: iter(source))
+
+
+def _add(task_id, content, completed=False):
+    return {'op': 'add', 'task': {'id': task_id, 'content': content,
+                                  'created_at': '', 'completed': completed}}
+
+
+def _contents(hits):
+    return sorted(hit['content'] for hit in hits)
+
+
+def test_tokenize_uses_bigrams():
+    assert tokenize('周报 a') == {'周报', 'a'}
+    assert tokenize('写周报') == {'写周', '周报'}
+
+
+def test_journal_survives_torn_line(tmp_path):
+    index = _index(tmp_path)
+    index.apply('2026-01-05', [_add(1, '提交周报')])
+    # 模拟追加中途断电留下的半行
+    with open(index.journal_path, 'a', encoding='utf-8') as f:
+        f.write('{"op": "add", "ta')
+
+    index = _index(tmp_path)
+    index.apply('2026-01-05', [_add(2, '周报评审')])
+    assert _contents(index.search('周报')) == ['周报评审', '提交周报']
+
+    # 重启后仍能找到
+    assert _contents(_index(tmp_path).search('周报')) == ['周报评审', '提交周报']
+
+
+def test_bad_line_in_middle_is_skipped(tmp_path):
+    index = _index(tmp_path)
+    index.apply('2026-01-05', [_add(1, '提交周报')])
+    with open(index.journal_path, 'a', encoding='utf-8') as f:
+        f.write('garbage\n')
+    index.apply('2026-01-05', [_add(2, '周报评审')])
+    assert _contents(_index(tmp_path).search('周报')) == ['周报评审', '提交周报']
+
+
+def test_compact_round_trip(tmp_path):
+    index = _index(tmp_path, [('2026-01-04', [{'id': 1, 'content': '旧周报', 'completed': True}])])
+    index.apply('2026-01-05', [_add(1, '提交周报'), _add(2, '买菜'),
+                               {'op': 'update', 'id': 1, 'fields': {'content': '提交月报'}},
+                               {'op': 'delete', 'id': 2}])
+    # 已加载的索引在关闭时合并为快照，之后不再需要 source
+    index.load()
+    index.close()
+    assert not os.path.exists(index.journal_path)
+
+    reloaded = _index(tmp_path)
+    assert _contents(reloaded.search('周报')) == ['旧周报']
+    assert _contents(reloaded.search('月报')) == ['提交月报']
+    assert reloaded.search('买菜') == []
@@ -0,0 +1,110 @@
+import pytest
+
+from task_manager import TaskManager
+
+
+@pytest.fixture
+def app_data(tmp_path, monkeypatch):
+    """把应用数据目录指向临时目录"""
+    monkeypatch.setenv('APPDATA', str(tmp_path))
+    return tmp_path
+
+
+def _fail_once(monkeypatch, obj, name):
+    """让 obj.name 的下一次调用抛出 PermissionError，之后恢复正常"""
+    original = getattr(obj, name)
+    state = {'failed': False}
+
+    def wrapper(*args, **kwargs):
+        if not state['failed']:
+            state['failed'] = True
+            raise PermissionError('模拟写入失败')
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(obj, name, wrapper)
+
+
+@pytest.mark.parametrize('mode', ['file', 'journal', 'sqlite'])
+def test_flush_failure_keeps_pending_ops(app_data, monkeypatch, mode):
+    manager = TaskManager(storage_mode=mode, flush_delay=60)
+    task = manager.add_task('写周报')
+    _fail_once(monkeypatch, manager.storage, 'apply')
+    with pytest.raises(PermissionError):
+        manager.flush()
+
+    # 失败期间新增的修改排在放回的记录之后
+    manager.update_task(task['id'], completed=True)
+    manager.close()
+
+    manager = TaskManager(storage_mode=mode, flush_delay=60)
+    tasks = manager.get_tasks()
+    manager.close()
+    assert [(t['id'], t['content'], t['completed']) for t in tasks] == [
+        (task['id'], '写周报', True)]
+
+
+def test_journal_append_failure_is_retried(app_data, monkeypatch):
+    manager = TaskManager(storage_mode='journal', flush_delay=60)
+    _fail_once(monkeypatch, manager.writer, 'append')
+    task = manager.add_task('整理周报')
+    with pytest.raises(PermissionError):
+        manager.flush()
+    manager.update_task(task['id'], content='整理月报')
+    manager.close()
+
+    manager = TaskManager(storage_mode='journal', flush_delay=60)
+    assert [t['content'] for t in manager.get_tasks()] == ['整理月报']
+    next_task = manager.add_task('下一项')
+    manager.close()
+    assert next_task['id'] == task['id'] + 1
+
+
+def test_search_index_failure_rebuilds(app_data, monkeypatch):
+    manager = TaskManager(storage_mode='journal', flush_delay=60)
+    manager.add_task('提交周报')
+    manager.flush()
+    _fail_once(monkeypatch, manager.search_index, 'apply')
+    manager.add_task('周报评审')
+    manager.flush()
+    assert sorted(hit['content'] for hit in manager.search('周报')) == ['周报评审', '提交周报']
+    manager.close()
+
+
+def test_close_closes_storage_when_flush_fails(app_data, monkeypatch):
+    manager = TaskManager(storage_mode='sqlite', flush_delay=60)
+    manager.add_task('a')
+    monkeypatch.setattr(manager.storage, 'apply',
+                        lambda *args: (_ for _ in ()).throw(PermissionError('x')))
+    closed = []
+    original_close = manager.storage.close
+    monkeypatch.setattr(manager.storage, 'close', lambda: closed.append(original_close()))
+    with pytest.raises(PermissionError):
+        manager.close()
+    assert closed
+
+
+@pytest.mark.parametrize('mode', ['file', 'journal', 'sqlite'])
+def test_carry_over_on_startup(app_data, mode):
+    manager = TaskManager(storage_mode=mode)
+    tasks = [{'id': 1, 'content': '未完成', 'created_at': '', 'completed': False},
+             {'id': 2, 'content': '已完成', 'created_at': '', 'completed': True}]
+    manager.storage.apply('2000-01-01', [{'op': 'add', 'task': dict(task)} for task in tasks],
+                          tasks, 3)
+    manager.close()
+
+    manager = TaskManager(storage_mode=mode, carry_over=True)
+    assert [task['content'] for task in manager.get_tasks()] == ['未完成']
+    manager.close()
+
+    # 当天已有任务时不再重复转入
+    manager = TaskManager(storage_mode=mode, carry_over=True)
+    assert len(manager.get_tasks()) == 1
+    manager.close()
+
+
+@pytest.mark.parametrize('mode, suffix', [('file', '.json'), ('journal', '.jsonl'),
+                                          ('sqlite', 'tasks.db')])
+def test_current_file_follows_storage_mode(app_data, mode, suffix):
+    manager = TaskManager(storage_mode=mode)
+    assert manager.current_file.endswith(suffix)
+    manager.close()
@@ -0,0 +1,125 @@
+import os
+import json
+
+import pytest
+
+from atomic_io import DurableWriter
+from history_index import HistoryIndex
+from task_storage import JsonFileStorage, JournalStorage, SqliteStorage, replay_ops
+
+DATE = '2024-03-01'
+
+
+def _task(task_id, content, completed=False):
+    return {'id': task_id, 'content': content,
+            'created_at': '2024-03-01 09:00:00', 'completed': completed}
+
+
+def _add(task):
+    return {'op': 'add', 'task': dict(task)}
+
+
+def _make_storage(kind, tmp_path):
+    if kind == 'sqlite':
+        return SqliteStorage(str(tmp_path / 'tasks.db'))
+    cls = JournalStorage if kind == 'journal' else JsonFileStorage
+    return cls(str(tmp_path / 'tasks'))
+
+
+@pytest.mark.parametrize('kind', ['file', 'journal', 'sqlite'])
+def test_round_trip(tmp_path, kind):
+    storage = _make_storage(kind, tmp_path)
+    tasks = [_task(1, '写周报'), _task(2, '买菜')]
+    storage.apply(DATE, [_add(task) for task in tasks], tasks, 3)
+
+    tasks = [dict(tasks[0], completed=True)]
+    storage.apply(DATE, [{'op': 'update', 'id': 1, 'fields': {'completed': True}},
+                         {'op': 'delete', 'id': 2}], tasks, 3)
+    storage.close()
+
+    storage = _make_storage(kind, tmp_path)
+    # 删除的任务ID不再复用
+    assert storage.load_day(DATE) == ([_task(1, '写周报', True)], 3)
+    assert DATE in storage.list_dates()
+    storage.close()
+
+
+def test_replay_ops_is_idempotent():
+    ops = [_add(_task(1, '写周报')), _add(_task(2, '买菜')),
+           {'op': 'update', 'id': 1, 'fields': {'content': '写月报'}},
+           {'op': 'delete', 'id': 2}]
+    once = replay_ops([], ops)
+    assert replay_ops([dict(task) for task in once], ops) == once == [_task(1, '写月报')]
+
+
+def test_journal_compaction_writes_snapshot(tmp_path):
+    storage = JournalStorage(str(tmp_path))
+    storage.apply(DATE, [_add(_task(1, '写周报'))], None, 2)
+    storage.compact(DATE)
+
+    assert not os.path.exists(storage._journal_path(DATE))
+    with open(storage._snapshot_path(DATE), encoding='utf-8') as f:
+        data = json.load(f)
+    assert data['tasks'] == [_task(1, '写周报')]
+    assert data['next_id'] == 2
+
+
+def test_journal_torn_line_is_repaired_before_append(tmp_path):
+    storage = JournalStorage(str(tmp_path))
+    storage.apply(DATE, [_add(_task(1, '写周报'))], None, 2)
+    # 模拟追加到一半时断电
+    with open(storage._journal_path(DATE), 'a', encoding='utf-8') as f:
+        f.write('{"op": "add", "task": {"id": 2, "cont')
+
+    storage = JournalStorage(str(tmp_path))
+    assert storage.load_tasks(DATE) == [_task(1, '写周报')]
+    storage.apply(DATE, [_add(_task(2, '买菜'))], None, 3)
+    assert JournalStorage(str(tmp_path)).load_tasks(DATE) == [_task(1, '写周报'), _task(2, '买菜')]
+
+
+def test_journal_interrupted_compaction_is_replayed(tmp_path):
+    storage = JournalStorage(str(tmp_path))
+    ops = [_add(_task(1, '写周报')), {'op': 'update', 'id': 1, 'fields': {'completed': True}}]
+    storage.apply(DATE, ops, None, 2)
+    storage.compact(DATE)
+
+    # 快照已替换、.compacting 尚未删除时崩溃：重放已合并的记录结果不变
+    with open(storage._compacting_path(DATE), 'w', encoding='utf-8') as f:
+        f.write(''.join(json.dumps(op, ensure_ascii=False) + '\n' for op in ops))
+    storage.apply(DATE, [_add(_task(2, '买菜'))], None, 3)
+
+    storage = JournalStorage(str(tmp_path))
+    expected = [_task(1, '写周报', True), _task(2, '买菜')]
+    assert storage.load_day(DATE) == (expected, 3)
+    storage.compact(DATE)
+    assert not os.path.exists(storage._compacting_path(DATE))
+    assert storage.load_day(DATE) == (expected, 3)
+
+
+def test_corrupt_snapshot_falls_back_to_backup(tmp_path):
+    storage = JsonFileStorage(str(tmp_path))
+    storage.apply(DATE, [], [_task(1, '写周报')], 2)
+    storage.apply(DATE, [], [_task(1, '写周报'), _task(2, '买菜')], 3)
+    with open(storage._snapshot_path(DATE), 'w', encoding='utf-8') as f:
+        f.write('{"date": "2024-03-01", "tas')
+
+    # 只丢失最后一次写入
+    assert storage.load_day(DATE) == ([_task(1, '写周报')], 2)
+
+
+def test_history_index_picks_up_external_files(tmp_path):
+    storage = JsonFileStorage(str(tmp_path / 'tasks'))
+    writer = DurableWriter('exit')
+    index = HistoryIndex(str(tmp_path / 'history_index.json'), storage, writer)
+    storage.apply(DATE, [], [_task(1, '写周报', True)], 2)
+    assert index.summaries() == {DATE: {'count': 1, 'completed': 1}}
+    index.close()
+
+    # 其他设备同步来的文件：目录 mtime 变化，下次打开时只解析新文件
+    other = JsonFileStorage(storage.tasks_dir)
+    other.apply('2024-03-02', [], [_task(1, '买菜'), _task(2, '跑步')], 3)
+
+    index = HistoryIndex(str(tmp_path / 'history_index.json'), storage, writer)
+    assert index.summaries() == {DATE: {'count': 1, 'completed': 1},
+                                 '2024-03-02': {'count': 2, 'completed': 0}}
+    index.close()
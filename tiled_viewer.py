@@ -0,0 +1,139 @@
+from PIL import Image, ImageTk
+from image_manager import preview_size
+
+
+class TiledImageViewer:
+    """
+    长图分块显示
+
+    在 Canvas 上把按宽度缩放后的长图切成固定高度的横条，只为可见区域
+    （上下各多留 margin 块）的横条创建 PhotoImage，滚出范围的横条随即释放。
+    打开时先显示占位底色，预览图和完整分辨率的图片都在后台线程加载：
+    磁盘缓存中有低分辨率预览图时先用它放大填充（界面线程不解码原图），
+    完整图片解码完成后逐块替换可见的预览块。
+    """
+
+    def __init__(self, canvas, image_manager, image_path, size,
+                 tile_height=256, preview_scale=4, margin=2, poll_ms=50, placeholder='#e0e0e0'):
+        """
+        初始化分块显示
+
+        Args:
+            canvas: 显示图片的 Canvas
+            image_manager: 图片管理器，用于加载预览图和完整图片
+            image_path: 图片路径
+            size: 显示尺寸 (width, height)
+            tile_height: 每块的高度（像素）
+            preview_scale: 预览图相对显示尺寸的缩小倍数
+            margin: 可见区域上下额外保留的块数
+            poll_ms: 检查后台解码是否完成的间隔（毫秒）
+            placeholder: 图片加载完成前的占位底色
+        """
+        self.canvas = canvas
+        self.width, self.height = size
+        self.tile_height = tile_height
+        self.margin = margin
+        self.poll_ms = poll_ms
+
+        # 块序号 -> [canvas 图片项, PhotoImage, 是否为完整分辨率]
+        self._tiles = {}
+        self._preview = None
+        self._full = None
+        self._poll_id = None
+
+        # 预览图只从缓存读取（后台预生成或上次打开时生成），先于完整图片在后台线程中完成
+        self._preview_future = image_manager.load_cached_async(
+            image_path, preview_size(size, preview_scale))
+        self._future = image_manager.load_tiled_async(image_path, size)
+
+        self.canvas.configure(scrollregion=(0, 0, self.width, self.height))
+        self.canvas.yview_moveto(0)
+        self._placeholder = self.canvas.create_rectangle(
+            0, 0, self.width, self.height, fill=placeholder, outline='')
+        self._poll()
+
+    @property
+    def tile_count(self):
+        """横条总数"""
+        return (self.height + self.tile_height - 1) // self.tile_height
+
+    def _visible_range(self):
+        """当前需要显示的块序号范围"""
+        top = self.canvas.canvasy(0)
+        bottom = self.canvas.canvasy(max(self.canvas.winfo_height(), 1))
+        first = max(0, int(top) // self.tile_height - self.margin)
+        last = min(self.tile_count - 1, int(bottom) // self.tile_height + self.margin)
+        return range(first, last + 1)
+
+    def _tile_image(self, index):
+        """生成指定块的图片，完整图片未解码完成时由预览图放大得到
+
+        Returns:
+            tuple: (PIL.Image对象, 是否为完整分辨率)
+        """
+        top = index * self.tile_height
+        bottom = min(top + self.tile_height, self.height)
+        if self._full is not None:
+            return self._full.crop((0, top, self.width, bottom)), True
+
+        scale_y = self._preview.height / self.height
+        region = self._preview.crop((0, top * scale_y, self._preview.width, bottom * scale_y))
+        return region.resize((self.width, bottom - top), Image.Resampling.BILINEAR), False
+
+    def render_visible(self):
+        """为可见区域创建或更新图片块，释放远离可见区域的块"""
+        if self._full is None and self._preview is None:
+            return
+        visible = self._visible_range()
+        for index in list(self._tiles):
+            if index not in visible:
+                self.canvas.delete(self._tiles.pop(index)[0])
+
+        for index in visible:
+            tile = self._tiles.get(index)
+            if tile and (tile[2] or self._full is None):
+                continue
+            img, full = self._tile_image(index)
+            photo = ImageTk.PhotoImage(img)
+            if tile:
+                self.canvas.itemconfigure(tile[0], image=photo)
+                tile[1], tile[2] = photo, full
+            else:
+                item = self.canvas.create_image(0, index * self.tile_height, image=photo, anchor='nw')
+                self._tiles[index] = [item, photo, full]
+
+    def _poll(self):
+        """检查后台加载是否完成：预览图先填充，完整图片完成后替换可见的预览块"""
+        self._poll_id = None
+        if self._preview_future is not None and self._preview_future.done():
+            future, self._preview_future = self._preview_future, None
+            if not future.cancelled() and future.exception() is None:
+                self._preview = future.result()
+            if self._preview is not None and not self._future.done():
+                self.render_visible()
+        if not self._future.done():
+            self._poll_id = self.canvas.after(self.poll_ms, self._poll)
+            return
+        try:
+            self._full = self._future.result()
+        except Exception as e:
+            print(f"加载图片失败：{str(e)}")
+            return
+        # 解码结果的尺寸可能因取整与预期相差一个像素
+        self.width, self.height = min(self.width, self._full.width), min(self.height, self._full.height)
+        self.canvas.configure(scrollregion=(0, 0, self.width, self.height))
+        self.render_visible()
+
+    def destroy(self):
+        """删除所有图片块并停止等待后台解码"""
+        if self._poll_id:
+            self.canvas.after_cancel(self._poll_id)
+            self._poll_id = None
+        if self._preview_future is not None:
+            self._preview_future.cancel()
+        self._future.cancel()
+        for item, _, _ in self._tiles.values():
+            self.canvas.delete(item)
+        self._tiles.clear()
+        self.canvas.delete(self._placeholder)
+        self._preview = self._full = None
@@ -0,0 +1,131 @@
+import time
+
+
+class TimerScheduler:
+    """
+    命名定时器调度器
+
+    每种延迟动作占用一个命名槽位，同名槽位重复安排时替换原来的定时，
+    同一种动作最多只有一个待执行的回调。所有槽位共用一个底层定时器，
+    它总是只为最早到期的槽位设置，待执行的底层回调始终不超过一个。
+    底层定时函数和时钟都通过注入提供（如 root.after），可以用模拟时钟测试。
+    """
+
+    def __init__(self, after, after_cancel, clock=time.monotonic):
+        """
+        初始化调度器
+
+        Args:
+            after: 底层定时函数 after(毫秒, 回调)，返回定时器ID（如 root.after）
+            after_cancel: 取消底层定时器的函数（如 root.after_cancel）
+            clock: 返回当前时间（秒）的函数
+        """
+        self.after = after
+        self.after_cancel = after_cancel
+        self.clock = clock
+
+        # 槽位名 -> (到期时间, 回调)
+        self._slots = {}
+        self._timer = None
+        self._timer_deadline = None
+
+        self.scheduled = 0
+        self.replaced = 0
+        self.cancelled = 0
+        self.fired = 0
+
+    def schedule(self, name, delay_ms, func):
+        """安排（或重新安排）一个命名槽位
+
+        Args:
+            name: 槽位名，同名的待执行回调会被替换
+            delay_ms: 延迟（毫秒）
+            func: 到期时调用的函数
+
+        Returns:
+            str: 槽位名，可传给 cancel
+        """
+        if name in self._slots:
+            self.replaced += 1
+        self.scheduled += 1
+        self._slots[name] = (self.clock() + delay_ms / 1000, func)
+        self._rearm()
+        return name
+
+    def cancel(self, name):
+        """取消一个槽位，槽位不存在时忽略"""
+        if self._slots.pop(name, None) is not None:
+            self.cancelled += 1
+            self._rearm()
+
+    def cancel_all(self):
+        """取消所有槽位"""
+        self.cancelled += len(self._slots)
+        self._slots.clear()
+        self._rearm()
+
+    def is_pending(self, name):
+        """槽位是否在等待执行"""
+        return name in self._slots
+
+    def _rearm(self):
+        """让底层定时器对准最早到期的槽位"""
+        deadline = min((slot[0] for slot in self._slots.values()), default=None)
+        if deadline == self._timer_deadline:
+            return
+        if self._timer is not None:
+            self.after_cancel(self._timer)
+            self._timer = None
+        self._timer_deadline = deadline
+        if deadline is not None:
+            delay_ms = max(0, int((deadline - self.clock()) * 1000 + 0.5))
+            self._timer = self.after(delay_ms, self._fire)
+
+    def _fire(self):
+        """底层定时器到期：按到期顺序执行所有已到期的槽位
+
+        单个回调出错只打印错误，不影响同一批的其他槽位，底层定时器也总会重新设置。
+        """
+        self._timer = None
+        self._timer_deadline = None
+        now = self.clock()
+        due = sorted((slot[0], name) for name, slot in self._slots.items() if slot[0] <= now)
+        try:
+            for _, name in due:
+                slot = self._slots.get(name)
+                # 前面的回调可能已经取消或重新安排了这个槽位
+                if slot is None or slot[0] > now:
+                    continue
+                del self._slots[name]
+                self.fired += 1
+                try:
+                    slot[1]()
+                except Exception as e:
+                    print(f"定时任务 {name} 执行失败：{str(e)}")
+        finally:
+            self._rearm()
+
+    def pending(self):
+        """获取待执行的槽位
+
+        Returns:
+            dict: {槽位名: 剩余毫秒数}
+        """
+        now = self.clock()
+        return {name: max(0, int((slot[0] - now) * 1000))
+                for name, slot in sorted(self._slots.items(), key=lambda item: item[1][0])}
+
+    def stats(self):
+        """获取调度统计
+
+        Returns:
+            dict: 待执行槽位数、底层待执行回调数，以及累计安排、替换、取消、执行次数
+        """
+        return {
+            'pending': len(self._slots),
+            'underlying': 1 if self._timer is not None else 0,
+            'scheduled': self.scheduled,
+            'replaced': self.replaced,
+            'cancelled': self.cancelled,
+            'fired': self.fired
+        }
@@ -0,0 +1,108 @@
+"""耗时追踪汇总工具
+
+读取 tracing 写入的 JSON-lines 追踪文件（含滚动出的历史文件），
+按操作名统计次数、p50、p95、最大值和总耗时。
+
+用法：
+    python trace_summary.py [追踪文件 ...] [--name 操作名前缀] [--sort total|p95|count]
+
+不指定文件时按环境变量 DAILY_REMINDER_TRACE 查找追踪文件（与 tracing 相同），
+未设置时读取应用数据目录下的 trace.jsonl。
+"""
+import os
+import json
+import math
+import argparse
+import tracing
+
+
+def load_records(paths):
+    """读取追踪记录，跳过无法解析的行（如写了一半的最后一行）
+
+    Args:
+        paths: 追踪文件路径列表
+
+    Returns:
+        list: 记录字典列表
+    """
+    records = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    return records
+
+
+def percentile(sorted_values, fraction):
+    """最近秩法求百分位数
+
+    Args:
+        sorted_values: 升序排列的数值列表
+        fraction: 百分位（0-1）
+    """
+    rank = max(1, math.ceil(len(sorted_values) * fraction))
+    return sorted_values[rank - 1]
+
+
+def summarize(records, prefix=None):
+    """按操作名汇总耗时
+
+    Args:
+        records: 追踪记录列表
+        prefix: 只统计以此开头的操作名
+
+    Returns:
+        dict: {操作名: {'count', 'p50', 'p95', 'max', 'total'}}，耗时单位为毫秒
+    """
+    durations = {}
+    for record in records:
+        name = record.get('name')
+        if name is None or 'ms' not in record:
+            continue
+        if prefix and not name.startswith(prefix):
+            continue
+        durations.setdefault(name, []).append(record['ms'])
+
+    summary = {}
+    for name, values in durations.items():
+        values.sort()
+        summary[name] = {
+            'count': len(values),
+            'p50': percentile(values, 0.5),
+            'p95': percentile(values, 0.95),
+            'max': values[-1],
+            'total': sum(values)
+        }
+    return summary
+
+
+def main():
+    """主函数"""
+    # 与程序写入时相同：优先使用环境变量指定的文件
+    path = tracing.path_from_env() or tracing.default_path()
+    parser = argparse.ArgumentParser(description='汇总耗时追踪文件中各操作的 p50/p95')
+    parser.add_argument('files', nargs='*', help=f'追踪文件，默认为 {tracing.ENV_VAR} 指定的文件或应用数据目录下的 trace.jsonl，及其滚动文件')
+    parser.add_argument('--name', help='只统计以此开头的操作名，如 ImageManager.')
+    parser.add_argument('--sort', choices=('total', 'p95', 'count'), default='total', help='排序方式')
+    args = parser.parse_args()
+
+    files = args.files or [candidate for candidate in (f"{path}.1", path) if os.path.exists(candidate)]
+    if not files:
+        print(f"没有找到追踪文件：{path}")
+        print(f"设置环境变量 {tracing.ENV_VAR}=1 或加 --trace 参数运行程序以记录耗时")
+        return
+
+    summary = summarize(load_records(files), args.name)
+    rows = sorted(summary.items(), key=lambda item: item[1][args.sort], reverse=True)
+    width = max([len('操作')] + [len(name) for name in summary])
+    print(f"{'操作':<{width}}  {'次数':>6}  {'p50(ms)':>9}  {'p95(ms)':>9}  {'最大(ms)':>9}  {'总计(ms)':>10}")
+    for name, stats in rows:
+        print(f"{name:<{width}}  {stats['count']:>6}  {stats['p50']:>9.2f}  {stats['p95']:>9.2f}  "
+              f"{stats['max']:>9.2f}  {stats['total']:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
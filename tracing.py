@@ -0,0 +1,233 @@
+"""耗时追踪
+
+用 span 上下文管理器或 traced 装饰器记录操作耗时，每条记录作为一行 JSON
+追加到追踪文件，文件超过大小上限时滚动为 <文件名>.1、<文件名>.2 ...
+未启用时 span 返回共享的空对象，traced 只多一次全局变量判断。
+
+启用方式：设置环境变量 DAILY_REMINDER_TRACE（为 1 时写入默认文件，否则为文件路径），
+或主程序加 --trace [文件] 参数。用 python trace_summary.py 汇总各操作的 p50/p95。
+"""
+import os
+import json
+import time
+import atexit
+import threading
+import functools
+
+# 启用追踪的环境变量
+ENV_VAR = 'DAILY_REMINDER_TRACE'
+
+# 单个追踪文件的大小上限
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+
+# 当前的追踪文件，None 表示未启用
+_writer = None
+
+
+def default_path():
+    """默认的追踪文件路径（应用数据目录下的 trace.jsonl）"""
+    return os.path.join(os.getenv('APPDATA') or '.', '每日主题', 'trace.jsonl')
+
+
+class TraceWriter:
+    """
+    滚动的 JSON-lines 追踪文件
+
+    写入线程安全，每条记录写入后立即 flush，程序崩溃时不丢失已记录的耗时。
+    """
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES, backups=1):
+        """
+        初始化追踪文件
+
+        Args:
+            path: 追踪文件路径
+            max_bytes: 单个文件的大小上限
+            backups: 保留的历史文件个数
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._lock = threading.Lock()
+        self._file = open(path, 'a', encoding='utf-8')
+        self._size = self._file.tell()
+
+    def _roll(self):
+        """把当前文件滚动为 .1，原有的历史文件依次后移（需持有锁）"""
+        self._file.close()
+        for index in range(self.backups, 0, -1):
+            src = f"{self.path}.{index - 1}" if index > 1 else self.path
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{index}")
+        if self.backups == 0:
+            os.remove(self.path)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._size = 0
+
+    def write(self, record):
+        """追加一条记录"""
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        size = len(line.encode('utf-8'))
+        with self._lock:
+            if self._file is None:
+                return
+            if self._size and self._size + size > self.max_bytes:
+                self._roll()
+            self._file.write(line)
+            self._file.flush()
+            self._size += size
+
+    def close(self):
+        """关闭文件"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def record(name, ms, **fields):
+    """直接写入一条已测得的耗时（未启用时忽略）
+
+    Args:
+        name: 操作名
+        ms: 耗时（毫秒）
+        fields: 附加字段
+    """
+    writer = _writer
+    if writer is None:
+        return
+    entry = {'ts': round(time.time(), 3), 'name': name, 'ms': round(ms, 3),
+             'thread': threading.current_thread().name}
+    entry.update(fields)
+    writer.write(entry)
+
+
+class _Span:
+    """计时并在结束时写入一条记录"""
+
+    __slots__ = ('name', 'fields', 'start')
+
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = fields
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        ms = (time.perf_counter() - self.start) * 1000
+        if exc_type is not None:
+            self.fields['error'] = exc_type.__name__
+        record(self.name, ms, **self.fields)
+        return False
+
+
+class _NullSpan:
+    """未启用追踪时的空对象"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name, **fields):
+    """记录一段代码的耗时
+
+    用法：
+        with span('ImageManager.decode', path=image_path):
+            ...
+
+    Args:
+        name: 操作名
+        fields: 附加字段
+
+    Returns:
+        上下文管理器，未启用时为共享的空对象
+    """
+    if _writer is None:
+        return _NULL_SPAN
+    return _Span(name, fields)
+
+
+def traced(name=None):
+    """记录函数每次调用耗时的装饰器
+
+    Args:
+        name: 操作名，默认为函数的限定名（如 TaskManager.add_task）
+    """
+    def decorate(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _writer is None:
+                return func(*args, **kwargs)
+            with _Span(label, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def enabled():
+    """是否已启用追踪"""
+    return _writer is not None
+
+
+def enable(path, max_bytes=DEFAULT_MAX_BYTES, backups=1):
+    """启用追踪，写入指定文件
+
+    Args:
+        path: 追踪文件路径
+        max_bytes: 单个文件的大小上限
+        backups: 滚动保留的历史文件个数
+    """
+    global _writer
+    disable()
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    _writer = TraceWriter(path, max_bytes, backups)
+
+
+def path_from_env():
+    """环境变量 DAILY_REMINDER_TRACE 指定的追踪文件路径
+
+    Returns:
+        str: 为 1 时为默认文件，否则为变量的值；未设置或为 0 时返回None
+    """
+    value = os.getenv(ENV_VAR, '').strip()
+    if not value or value == '0':
+        return None
+    return default_path() if value == '1' else value
+
+
+def enable_from_env():
+    """按环境变量 DAILY_REMINDER_TRACE 启用追踪（为 1 时写入默认文件，否则为文件路径）
+
+    Returns:
+        bool: 是否已启用
+    """
+    path = path_from_env()
+    if path is None:
+        return False
+    enable(path)
+    return True
+
+
+def disable():
+    """停止追踪并关闭文件"""
+    global _writer
+    writer, _writer = _writer, None
+    if writer is not None:
+        writer.close()
+
+
+atexit.register(disable)